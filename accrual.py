@@ -1,45 +1,222 @@
-from datetime import date
-from msd.database.connection import get_conn
-import math
-
-def run_monthly_accrual():
-    today = date.today()
-    y, m = today.year, today.month
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS accrual_runs(
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              year INTEGER,
-              month INTEGER,
-              run_at TEXT DEFAULT CURRENT_TIMESTAMP,
-              UNIQUE(year, month)
-            )
-        """)
-        try:
-            cur.execute("INSERT INTO accrual_runs(year, month) VALUES (?, ?)", (y, m))
-        except Exception:
-            # تم التراكم لهذا الشهر
-            return
-        # حساب التراكم
-        cur.execute("SELECT id, hiring_date FROM employees")
-        rows = cur.fetchall()
-        for r in rows:
-            emp_id, hiring = r["hiring_date"], 
-            # hiring_date محفوظ كنص
-            try:
-                cur.execute("SELECT hiring_date FROM employees WHERE id=?", (r["id"],))
-                hd = cur.fetchone()["hiring_date"]
-                if not hd:
-                    continue
-                yy, mm, dd = map(int, hd.split("-"))
-                years = y - yy - (1 if m < mm else 0)
-                if years < 0:
-                    continue
-                annual_cap = 45 if years >= 20 else 30
-                monthly = annual_cap / 12.0
-                cur.execute("UPDATE employees SET annual_balance = annual_balance + ? WHERE id=?",
-                            (monthly, r["id"]))
-            except Exception:
-                continue
-        conn.commit()
\ No newline at end of file
+"""
+محرك التراكم الشهري للأرصدة (التنفيذ الوحيد؛ msd.vacations.accrual_service يستدعيه).
+
+- القواعد من جدول accrual_policies (v022) لكل سياسة: العمود الهدف، حدّ سنوات الخدمة،
+  السقفان السنويان (قبل الحد / بعده)، النشطون فقط، وتناسب شهر التعيين
+  (من عُيّن في منتصف الشهر يأخذ نسبة أيامه المتبقية).
+- سنوات الخدمة في الشهر (y, m) = y - سنة التعيين - (m < شهر التعيين)، في SQL من hiring_date.
+- الأشهر الفائتة: كل شهر بعد آخر تشغيل للسياسة (accrual_policy_runs) حتى until؛
+  أول تشغيل (لا سجل) = شهر until فقط.
+- كل شهر يُنفَّذ على دفعات من الموظفين (نطاقات id)، لكل دفعة وحدة عمل قصيرة:
+  الإضافة عبر سجل الأرصدة (ledger.apply_bulk) + تقدّم التشغيل (last_employee_id) معاً،
+  فالموافقات لا تنتظر الشهر كاملاً، والتشغيل المنقطع يُستأنف من آخر دفعة.
+"""
+import calendar
+import logging
+import time
+from datetime import date, datetime
+
+from msd.database.connection import get_conn, transaction
+from msd.balances import ledger
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+
+RUNNING = "running"
+DONE = "done"
+
+_HIRE_YEAR = "CAST(hiring_date AS INTEGER)"
+_HIRE_MONTH = "CAST(substr(hiring_date, 6) AS INTEGER)"
+_HIRE_DAY = "CAST(substr(hiring_date, instr(substr(hiring_date, 6), '-') + 6) AS INTEGER)"
+# hiring_date بصيغة YYYY-M[M]-D[D]؛ غيرها لا يُراكَم
+_VALID_HIRING = "hiring_date GLOB '[0-9][0-9][0-9][0-9]-[0-9]*-[0-9]*'"
+
+
+class AccrualConflict(RuntimeError):
+    """تشغيل آخر يعالج السياسة والشهر نفسيهما."""
+
+
+def _now():
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _parse_month(value):
+    try:
+        y, m = (int(p) for p in str(value).split("-"))
+        return date(y, m, 1)
+    except (TypeError, ValueError):
+        raise ValueError("تنسيق شهر غير صالح (YYYY-MM)")
+
+
+def _next_month(d):
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def load_policies(conn, codes=None):
+    """السياسات المفعّلة (أو codes المحددة منها) التي يوجد عمودها الهدف."""
+    sql = """
+        SELECT id, code, target_column, senior_years, junior_cap, senior_cap,
+               prorate_hire_month, active_only
+          FROM accrual_policies WHERE enabled = 1
+    """
+    params = []
+    if codes:
+        sql += f" AND code IN ({', '.join('?' * len(codes))})"
+        params.extend(codes)
+    columns = set(ledger.tracked_columns())
+    policies = []
+    for r in conn.execute(sql + " ORDER BY id", params).fetchall():
+        policy = dict(r)
+        if policy["target_column"] not in columns:
+            logger.warning("سياسة التراكم %s: العمود %s غير موجود", policy["code"], policy["target_column"])
+            continue
+        policies.append(policy)
+    return policies
+
+
+def policy_sql(policy, month):
+    """(where, where_params, delta_sql, delta_params) لسياسة في شهر."""
+    years = f"(? - {_HIRE_YEAR} - (CASE WHEN ? < {_HIRE_MONTH} THEN 1 ELSE 0 END))"
+    ym = (month.year, month.month)
+    where = f"{_VALID_HIRING} AND {years} >= 0"
+    if policy["active_only"]:
+        where += " AND status = 'active'"
+    delta = (f"(CASE WHEN {years} >= {int(policy['senior_years'])} "
+             f"THEN {float(policy['senior_cap'])} ELSE {float(policy['junior_cap'])} END) / 12.0")
+    delta_params = ym
+    if policy["prorate_hire_month"]:
+        dim = calendar.monthrange(month.year, month.month)[1]
+        delta += (f" * (CASE WHEN {_HIRE_YEAR} = ? AND {_HIRE_MONTH} = ?"
+                  f" THEN MAX({dim} - {_HIRE_DAY} + 1, 0) / {float(dim)} ELSE 1 END)")
+        delta_params += ym
+    return where, ym, delta, delta_params
+
+
+def _totals(conn, where, params, delta, delta_params):
+    row = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM({delta}), 0) FROM employees WHERE {where}
+    """, (*delta_params, *params)).fetchone()
+    return row[0], row[1]
+
+
+def _last_run(conn, policy_id):
+    return conn.execute("""
+        SELECT id, year, month, status, last_employee_id FROM accrual_policy_runs
+         WHERE policy_id = ? ORDER BY year DESC, month DESC LIMIT 1
+    """, (policy_id,)).fetchone()
+
+
+def pending_months(conn, policy, until):
+    """الأشهر التي لم يكتمل تراكمها للسياسة حتى until (date أول الشهر)، بالترتيب."""
+    row = _last_run(conn, policy["id"])
+    if row is None:
+        month = until
+    elif row["status"] == DONE:
+        month = _next_month(date(row["year"], row["month"], 1))
+    else:
+        month = date(row["year"], row["month"], 1)   # تشغيل منقطع: يُستأنف
+    months = []
+    while month <= until:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _chunk_bounds(conn, after_id, chunk_size):
+    """حدود الدفعات العليا بعد after_id؛ الأخيرة None (مفتوحة لمن يُضاف أثناء التشغيل)."""
+    ids = [r[0] for r in conn.execute("SELECT id FROM employees WHERE id > ? ORDER BY id", (after_id,))]
+    bounds = ids[chunk_size - 1:-1:chunk_size] if chunk_size else []
+    return bounds + [None], len(ids)
+
+
+def _run_month(policy, month, chunk_size, progress):
+    where, params, delta, delta_params = policy_sql(policy, month)
+    ref = f"accrual:{policy['code']}:{month:%Y-%m}"
+    started = time.perf_counter()
+    with get_conn() as conn:
+        with transaction(conn):
+            conn.execute("""
+                INSERT OR IGNORE INTO accrual_policy_runs(policy_id, year, month, status, started_at)
+                VALUES (?,?,?,?,?)
+            """, (policy["id"], month.year, month.month, RUNNING, _now()))
+            run = conn.execute("""
+                SELECT id, status, last_employee_id FROM accrual_policy_runs
+                 WHERE policy_id=? AND year=? AND month=?
+            """, (policy["id"], month.year, month.month)).fetchone()
+        if run["status"] == DONE:
+            return None
+        run_id, lo = run["id"], run["last_employee_id"]
+        bounds, total = _chunk_bounds(conn, lo, chunk_size)
+        for i, hi in enumerate(bounds):
+            chunk_started = time.perf_counter()
+            if hi is None:
+                chunk_where, chunk_params = f"id > ? AND {where}", (lo, *params)
+            else:
+                chunk_where, chunk_params = f"id > ? AND id <= ? AND {where}", (lo, hi, *params)
+            with transaction(conn):
+                current = conn.execute("SELECT last_employee_id FROM accrual_policy_runs WHERE id=?",
+                                       (run_id,)).fetchone()[0]
+                if current != lo:
+                    raise AccrualConflict(f"{policy['code']} {month:%Y-%m}: تشغيل آخر قيد التنفيذ")
+                count, days = _totals(conn, chunk_where, chunk_params, delta, delta_params)
+                ledger.apply_bulk(conn, policy["target_column"], "accrual",
+                                  where=chunk_where, params=chunk_params,
+                                  delta_sql=delta, delta_params=delta_params,
+                                  ref=ref, effective=month)
+                if hi is None:
+                    hi = conn.execute("SELECT COALESCE(MAX(id), ?) FROM employees", (lo,)).fetchone()[0]
+                conn.execute("""
+                    UPDATE accrual_policy_runs
+                       SET last_employee_id=?, employees=employees+?, days=days+?
+                     WHERE id=?
+                """, (hi, count, days, run_id))
+            lo = hi
+            if progress:
+                done = total if i == len(bounds) - 1 else (i + 1) * chunk_size
+                progress({"policy": policy["code"], "year": month.year, "month": month.month,
+                          "done": done, "total": total,
+                          "chunk_ms": round((time.perf_counter() - chunk_started) * 1000, 1)})
+        duration = round((time.perf_counter() - started) * 1000, 1)
+        with transaction(conn):
+            conn.execute("""
+                UPDATE accrual_policy_runs SET status=?, finished_at=?, duration_ms=? WHERE id=?
+            """, (DONE, _now(), duration, run_id))
+            row = conn.execute("SELECT employees, days FROM accrual_policy_runs WHERE id=?",
+                               (run_id,)).fetchone()
+    return {"policy": policy["code"], "year": month.year, "month": month.month,
+            "employees": row[0], "days": round(row[1], 4),
+            "chunks": len(bounds), "ms": duration}
+
+
+def run_monthly_accrual(until=None, dry_run=False, policies=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    يراكم كل شهر فائت لكل سياسة مفعّلة (أو policies: رموزها) حتى until ("YYYY-MM"،
+    افتراضياً الشهر الحالي). يعيد [{"policy", "year", "month", "employees", "days", ...}];
+    dry_run: الأعداد دون كتابة. progress(dict) يُستدعى بعد كل دفعة.
+    """
+    current = date.today().replace(day=1)
+    until = _parse_month(until) if until else current
+    if until > current:
+        raise ValueError("لا تراكم لشهر لم يبدأ بعد")
+    chunk_size = max(int(chunk_size or 0), 0)
+    results = []
+    with get_conn() as conn:
+        selected = load_policies(conn, policies)
+        plan = [(p, pending_months(conn, p, until)) for p in selected]
+        if dry_run:
+            for policy, months in plan:
+                for month in months:
+                    where, params, delta, delta_params = policy_sql(policy, month)
+                    count, days = _totals(conn, where, params, delta, delta_params)
+                    results.append({"policy": policy["code"], "year": month.year, "month": month.month,
+                                    "employees": count, "days": round(days, 4)})
+            return results
+    for policy, months in plan:
+        for month in months:
+            res = _run_month(policy, month, chunk_size, progress)
+            if res:
+                logger.info("تراكم %s %s: %s موظفاً، %s يوماً (%sms)", res["policy"],
+                            f"{month:%Y-%m}", res["employees"], res["days"], res["ms"])
+                results.append(res)
+    return results
\ No newline at end of file
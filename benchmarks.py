@@ -0,0 +1,229 @@
+"""
+قياسات أداء تُشغَّل من manage.py على قاعدة تجريبية مؤقتة (لا تلمس employees.db).
+"""
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+from msd.database import fixtures, tracing, schema_registry
+from msd.database.connection import get_conn, dispose_pools
+from msd.database.migrations.v017_hot_path_indexes import apply_indexes
+
+
+@contextmanager
+def scratch_app_db(**seed_kwargs):
+    """يوجّه get_conn مؤقتاً إلى ملف قاعدة تجريبية مُعبّأة (مع تفعيل التتبّع)."""
+    tmpdir = tempfile.mkdtemp(prefix="msd-bench-")
+    path = os.path.join(tmpdir, "bench.db")
+    conn = fixtures.scratch_db(path, **seed_kwargs)
+    apply_indexes(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.commit()
+    conn.close()
+    cfg = current_app.config
+    saved = {k: cfg.get(k) for k in ("DATABASE_PATH", "DB_TRACE")}
+    cfg["DATABASE_PATH"] = path
+    cfg["DB_TRACE"] = True
+    schema_registry.invalidate()
+    try:
+        yield path
+    finally:
+        cfg.update(saved)
+        schema_registry.invalidate()
+        dispose_pools(path)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _timed_runs(ids, fn, synchronous):
+    commits = deferred = 0
+    started = time.perf_counter()
+    for rid in ids:
+        with current_app.app_context():
+            with get_conn() as conn:
+                conn.execute(f"PRAGMA synchronous={synchronous}")
+            tracing.begin("bench")
+            try:
+                fn(rid)
+            finally:
+                trace = tracing.end()
+            commits += trace.commits
+            deferred += trace.deferred_commits
+    elapsed = (time.perf_counter() - started) * 1000
+    n = len(ids) or 1
+    return {
+        "commits_per_approval": round(commits / n, 2),
+        "deferred_commits_per_approval": round(deferred / n, 2),
+        "ms_per_approval": round(elapsed / n, 3),
+    }
+
+
+def _legacy_approve(rid):
+    """نفس جمل الكتابة قبل وحدة العمل: commit بعد التحديث، وبعد السجل، وبعد التدقيق، وبعد الرصيد."""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for current, target, field in (("pending_dept", "pending_manager", "dept_decision_at"),
+                                       ("pending_manager", "approved", "manager_decision_at")):
+            cur.execute("SELECT employee_id, type_code, requested_days, status FROM vacation_requests WHERE id=?", (rid,))
+            emp_id, _, days, _ = cur.fetchone()
+            if target == "approved":
+                cur.execute("SELECT annual_balance FROM employees WHERE id=?", (emp_id,))
+                cur.fetchone()
+                cur.execute("UPDATE employees SET annual_balance = annual_balance - ? WHERE id=?", (days, emp_id))
+                conn.commit()
+            cur.execute(f"UPDATE vacation_requests SET status=?, {field}=? WHERE id=?",
+                        (target, time.strftime("%Y-%m-%dT%H:%M:%S"), rid))
+            conn.commit()
+            cur.execute("""
+                INSERT INTO vacation_request_history
+                (vacation_request_id, action, from_status, to_status, actor_role, actor_user_id, note)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (rid, "approve", current, target, None, None, None))
+            conn.commit()
+            cur.execute("""
+                INSERT INTO audit_log (action, table_name, record_id, changes, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, ("TRANSITION", "vacation_requests", rid, f"{current}->{target}"))
+            conn.commit()
+
+
+def _uow_approve(rid):
+    from msd.vacations import service
+    service.approve(rid, "department_head")
+    service.approve(rid, "manager")
+
+
+def bench_approvals(n=200, synchronous="FULL"):
+    """
+    موافقة كاملة (رئيس القسم ثم المدير) لعدد n من الطلبات:
+      legacy: commit بعد كل جملة كتابة (السلوك السابق)
+      uow:    service.approve الحالي (transaction واحدة لكل قرار)
+    """
+    with scratch_app_db(employees=max(n, 50), requests_per_employee=1, absences_per_employee=0):
+        with current_app.app_context():
+            with get_conn() as conn:
+                conn.execute("UPDATE employees SET annual_balance=1000")
+                cur = conn.cursor()
+                ids = []
+                for i in range(2 * n):
+                    cur.execute("""
+                        INSERT INTO vacation_requests(employee_id, type_code, start_date, end_date,
+                                                      requested_days, status, created_at)
+                        VALUES (?, 'ANNUAL', '2030-01-01', '2030-01-01', 1, 'pending_dept', CURRENT_TIMESTAMP)
+                    """, (i % max(n, 50) + 1,))
+                    ids.append(cur.lastrowid)
+                conn.commit()
+        return {
+            "approvals": n,
+            "synchronous": synchronous,
+            "legacy": _timed_runs(ids[:n], _legacy_approve, synchronous),
+            "uow": _timed_runs(ids[n:], _uow_approve, synchronous),
+        }
+
+def _best_of(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1), result
+
+
+def bench_absence_report(rows=1_000_000, employees=5000, repeat=3):
+    """
+    تقرير الغياب بمسارات التجميع (python صفاً صفاً / sql داخل SQLite / numpy متجه إن وُجد /
+    summary من absence_monthly_summary للأشهر الكاملة) على `rows` سجل غياب.
+    يتحقق أن المسارات تعطي النتيجة نفسها لكل حالة، بما فيها سجلات بنهاية قبل بدايتها
+    (تُتخطى في كل المسارات، حتى late / early_leave).
+    """
+    from msd.absences import reporting
+    from msd.database.migrations import v019_absence_monthly_summary
+    per_employee = max(rows // employees, 1)
+    cases = [
+        ("month", dict(report_type="month", year=2024, month=3)),
+        ("range-year", dict(report_type="range", start_date="2024-01-01", end_date="2024-12-31")),
+        ("employee-all", dict(report_type="employee", employee_id=employees // 2)),
+    ]
+    out = {"rows": per_employee * employees, "cases": {}}
+    with scratch_app_db(employees=employees, requests_per_employee=0,
+                        absences_per_employee=per_employee):
+        with current_app.app_context():
+            current_app.config["DB_TRACE"] = False
+            with get_conn() as conn:
+                # فترات مقلوبة داخل نوافذ الحالات: مرشح SQL يقبلها والتداخل <= 0
+                conn.executemany("""
+                    INSERT INTO absences(employee_id, date, type, duration, start_date, end_date)
+                    VALUES (?, ?, ?, 1, ?, ?)
+                """, [(1, "2024-03-20", t, "2024-03-20", "2024-03-10")
+                      for t in ("early_leave", "late", "absence")])
+                started = time.perf_counter()
+                v019_absence_monthly_summary.apply(conn)
+                conn.commit()
+                out["summary_build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            schema_registry.invalidate()
+            for name, kwargs in cases:
+                py_ms, py_res = _best_of(lambda: reporting.generate_report(engine="python", **kwargs), repeat)
+                sql_ms, sql_res = _best_of(lambda: reporting.generate_report(engine="sql", **kwargs), repeat)
+                np_ms, np_res = None, sql_res
+                if reporting.np is not None:
+                    np_ms, np_res = _best_of(lambda: reporting.generate_report(engine="numpy", **kwargs), repeat)
+                # الملخص إن كانت النافذة أشهراً كاملة، وإلا sql (engine صريح = بلا report_cache)
+                sum_ms, sum_res = _best_of(lambda: reporting.generate_report(engine="summary", **kwargs), repeat)
+                out["cases"][name] = {
+                    "python_ms": py_ms,
+                    "sql_ms": sql_ms,
+                    "numpy_ms": np_ms,
+                    "default_ms": sum_ms,
+                    "items": len(sql_res["items"]),
+                    "same_result": py_res == sql_res == np_res == sum_res,
+                }
+    return out
+
+def bench_accrual(employees=100_000, months=1, chunk_size=5000, window_seconds=300):
+    """
+    محرك التراكم على `employees` موظف: `months` أشهر فائتة لكل سياسة مفعّلة، على دفعات.
+    يعيد الزمن الكلي وأطول دفعة (= أطول قفل كتابة) ومطابقة سجل الأرصدة للأعمدة.
+    """
+    from datetime import date
+    from msd.balances import accrual, ledger
+    from msd.database.migrations import v021_balance_ledger, v022_accrual_policies
+    with scratch_app_db(employees=employees, requests_per_employee=0, absences_per_employee=0):
+        with current_app.app_context():
+            current_app.config["DB_TRACE"] = False
+            with get_conn() as conn:
+                v021_balance_ledger.apply(conn)
+                v022_accrual_policies.apply(conn)
+                # آخر تشغيل منتهٍ قبل `months` شهراً => التشغيل يلحق بها كلها
+                last = date.today().replace(day=1)
+                for _ in range(months):
+                    last = date(last.year - (last.month == 1), (last.month - 2) % 12 + 1, 1)
+                conn.execute("""
+                    INSERT INTO accrual_policy_runs(policy_id, year, month, status)
+                    SELECT id, ?, ?, 'done' FROM accrual_policies
+                """, (last.year, last.month))
+                conn.commit()
+            schema_registry.invalidate()
+            chunks = []
+            started = time.perf_counter()
+            results = accrual.run_monthly_accrual(chunk_size=chunk_size,
+                                                  progress=lambda p: chunks.append(p["chunk_ms"]))
+            total_ms = (time.perf_counter() - started) * 1000
+            with get_conn() as conn:
+                ledger_ok = not ledger.reconcile(conn)
+    chunks.sort()
+    return {
+        "employees": employees,
+        "runs": [{k: r[k] for k in ("policy", "year", "month", "employees", "ms")} for r in results],
+        "total_ms": round(total_ms, 1),
+        "chunks": len(chunks),
+        "chunk_p50_ms": chunks[len(chunks) // 2] if chunks else None,
+        "chunk_max_ms": chunks[-1] if chunks else None,
+        "window_seconds": window_seconds,
+        "within_window": total_ms < window_seconds * 1000,
+        "ledger_ok": ledger_ok,
+    }
\ No newline at end of file
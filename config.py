@@ -1,8 +1,31 @@
-import os
-
-class Config:
-    SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
-    DATABASE_PATH = os.getenv("DATABASE_PATH", "employees.db")
-    SESSION_COOKIE_HTTPONLY = True
-    REMEMBER_COOKIE_HTTPONLY = True
+import os
+
+class Config:
+    SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
+    DATABASE_PATH = os.getenv("DATABASE_PATH", "employees.db")
+    SESSION_COOKIE_HTTPONLY = True
+    REMEMBER_COOKIE_HTTPONLY = True
+    # مجمّع اتصالات قاعدة البيانات
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", "512"))
+    # تتبّع الاستعلامات لكل طلب (الترويسات X-DB-Queries / X-DB-Time)
+    DB_TRACE = os.getenv("DB_TRACE", "1") == "1"
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+    # ذاكرة تقارير الغياب (0 = تعطيل)
+    REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "64"))
+    REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "60"))
+    # محرك تجميع تقارير الغياب: sql (داخل SQLite) أو numpy (يتطلب numpy)
+    REPORT_ENGINE = os.getenv("REPORT_ENGINE", "sql")
+    # مهام التصدير في الخلفية (المجلد الافتراضي: instance/exports)
+    EXPORT_JOB_DIR = os.getenv("EXPORT_JOB_DIR")
+    EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+    EXPORT_JOB_RETENTION_HOURS = float(os.getenv("EXPORT_JOB_RETENTION_HOURS", "24"))
+    # المجدول الداخلي (التراكم الشهري، إعادة الضبط السنوية، اللقطات، التنظيف)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+    SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+    SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "90"))
+    SCHEDULER_HISTORY_DAYS = int(os.getenv("SCHEDULER_HISTORY_DAYS", "90"))
     # يمكن إضافة إعدادات أخرى لاحقاً
\ No newline at end of file
@@ -1,45 +1,159 @@
-import sqlite3
-from flask import current_app, g
-from contextlib import contextmanager
-import os
-
-def _get_db_path():
-    return current_app.config.get("DATABASE_PATH", "employees.db")
-
-def _init_conn(conn: sqlite3.Connection):
-    conn.row_factory = sqlite3.Row
-    # إعدادات تقلل التعارض
-    try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-    except Exception:
-        pass
-    conn.execute("PRAGMA busy_timeout=5000;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    return conn
-
-def get_db():
-    if 'db_conn' not in g:
-        path = _get_db_path()
-        need_dir = os.path.dirname(os.path.abspath(path))
-        os.makedirs(need_dir, exist_ok=True)
-        conn = sqlite3.connect(path, timeout=10)
-        _init_conn(conn)
-        g.db_conn = conn
-    return g.db_conn
-
-@contextmanager
-def get_conn():
-    conn = get_db()
-    try:
-        yield conn
-    finally:
-        # لا نغلق هنا، الإغلاق في teardown
-        pass
-
-def close_db(e=None):
-    conn = g.pop('db_conn', None)
-    if conn is not None:
-        try:
-            conn.close()
-        except Exception:
-            pass
\ No newline at end of file
+import sqlite3
+import threading
+from functools import wraps
+from flask import current_app, g, request
+from contextlib import contextmanager
+import os
+
+from msd.database.pool import ConnectionPool, PooledConnection
+from msd.database.tracing import TracingConnection
+
+# مجمّع لكل (مسار قاعدة بيانات، قراءة فقط؟) – يُعاد إنشاؤه بعد fork
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def _get_db_path():
+    return current_app.config.get("DATABASE_PATH", "employees.db")
+
+def _init_conn(conn: sqlite3.Connection):
+    conn.row_factory = sqlite3.Row
+    # إعدادات تقلل التعارض
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+    except Exception:
+        pass
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+def _init_ro_conn(conn: sqlite3.Connection):
+    # لا journal_mode هنا: اتصال القراءة لا يغيّر وضع الملف
+    conn.execute("PRAGMA busy_timeout=5000;")
+    return conn
+
+def _get_pool(readonly=False):
+    path = os.path.abspath(_get_db_path())
+    key = (path, readonly)
+    pool = _POOLS.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.pid != os.getpid():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cfg = current_app.config
+            pool = ConnectionPool(
+                path,
+                size=cfg.get("DB_READ_POOL_SIZE" if readonly else "DB_POOL_SIZE", 8),
+                timeout=cfg.get("DB_POOL_TIMEOUT", 10),
+                cached_statements=cfg.get("DB_CACHED_STATEMENTS", 512),
+                init_conn=_init_ro_conn if readonly else _init_conn,
+                readonly=readonly,
+                factory=TracingConnection if cfg.get("DB_TRACE", True) else PooledConnection
+            )
+            _POOLS[key] = pool
+    return pool
+
+def get_db(readonly=False):
+    attr = 'db_conn_ro' if readonly else 'db_conn'
+    if attr not in g:
+        pool = _get_pool(readonly)
+        setattr(g, attr, pool.acquire())
+        setattr(g, attr + '_pool', pool)
+    return getattr(g, attr)
+
+@contextmanager
+def get_conn(readonly=None):
+    """
+    readonly=None: يتبع اختيار المسار (readonly_route) إن وُجد، وإلا اتصال القراءة/الكتابة.
+    readonly=True: اتصال من مجمّع القراءة فقط (mode=ro + query_only).
+    """
+    if readonly is None:
+        readonly = g.get('db_prefer_readonly', False)
+    conn = get_db(readonly)
+    try:
+        yield conn
+    finally:
+        # لا نغلق هنا، الإرجاع للمجمّع في teardown
+        pass
+
+@contextmanager
+def transaction(conn):
+    """
+    وحدة عمل: BEGIN IMMEDIATE ثم commit واحد عند الخروج، وrollback عند أي استثناء.
+    - الاستدعاء المتداخل ينضم للوحدة الخارجية.
+    - conn.commit() داخل الوحدة (السجل / التدقيق / msd.balances.service) يُؤجَّل
+      لاتصالات المجمّع (PooledConnection).
+    """
+    pooled = isinstance(conn, PooledConnection)
+    if conn.uow_depth if pooled else conn.in_transaction:
+        # متداخلة: لا BEGIN ولا commit هنا
+        if pooled:
+            conn.uow_depth += 1
+        try:
+            yield conn
+        finally:
+            if pooled:
+                conn.uow_depth -= 1
+        return
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    if pooled:
+        conn.uow_depth = 1
+    try:
+        yield conn
+    except BaseException:
+        if pooled:
+            conn.uow_depth = 0
+        conn.rollback()
+        raise
+    if pooled:
+        conn.uow_depth = 0
+    conn.commit()
+
+def readonly_route(view_func):
+    """
+    لمسارات القراءة (قوائم / تقارير): طلبات GET/HEAD/OPTIONS تستخدم مجمّع القراءة فقط
+    كي لا تتزاحم مع اتصال الكتابة (الموافقات/الرفض).
+    """
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view_func(*args, **kwargs)
+        g.db_prefer_readonly = True
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            g.pop('db_prefer_readonly', None)
+    return wrapper
+
+def close_db(e=None):
+    for attr in ('db_conn', 'db_conn_ro'):
+        conn = g.pop(attr, None)
+        pool = g.pop(attr + '_pool', None)
+        if conn is None:
+            continue
+        if pool is not None:
+            pool.release(conn)
+        else:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+def dispose_pools(path):
+    """إغلاق مجمّعات مسار معيّن (قواعد القياس المؤقتة)."""
+    path = os.path.abspath(path)
+    with _POOLS_LOCK:
+        for key in [k for k in _POOLS if k[0] == path]:
+            _POOLS.pop(key).close()
+
+def pool_stats():
+    """إحصاءات كل المجمّعات في هذه العملية (hits / waits / زمن الحجز)."""
+    out = {}
+    for (path, readonly), p in list(_POOLS.items()):
+        if p.pid == os.getpid():
+            out[f"{path} (ro)" if readonly else path] = p.stats()
+    return out
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+أختام إصدار البيانات (v025): عدّاد لكل مجموعة بيانات يرفعه مشغّل SQL عند تغيّرها.
+
+- data_versions(name, version): ensure() تنشئ المشغّلات على الجدول؛ INSERT و DELETE
+  وتحديث أي من الأعمدة المراقَبة (بقيمة مختلفة فعلاً) يرفع version بواحد لكل صف.
+- المشغّلات في SQLite نفسها: أي كاتب (الواجهة، البوت، الاستيراد، سكربت) يرفع الختم.
+- الذواكر داخل العملية (msd.employees.lookup ...) تقارن ختمها بـ get() وتعيد البناء عند
+  الاختلاف، فلا تحتاج عمليات العمّال الأخرى إلى إشعار.
+"""
+import sqlite3
+
+from msd.database.connection import get_conn
+
+
+def ensure(conn, name, table, columns=None, when=None):
+    """
+    ينشئ data_versions (إن لزم) وصف name ومشغّلات {table} التي ترفعه.
+    columns: الأعمدة المراقَبة عند UPDATE؛ None = أي تحديث.
+    when: {"insert" / "delete" / "update": شرط WHEN إضافي أو None}؛ الحدث الغائب بلا مشغّل.
+    None = الأحداث الثلاثة بلا شرط. آمنة للتكرار.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions(
+          name TEXT PRIMARY KEY,
+          version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_versions(name, version) VALUES (?, 0)", (name,))
+    bump = f"UPDATE data_versions SET version = version + 1 WHERE name = '{name}';"
+    prefix = f"{table}_ver_{name}"
+    if when is None:
+        when = {"insert": None, "delete": None, "update": None}
+
+    def create(suffix, event, conditions):
+        clause = ("WHEN " + " AND ".join(f"({c})" for c in conditions)) if conditions else ""
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {prefix}_{suffix} AFTER {event} ON {table}
+            {clause} BEGIN {bump} END
+        """)
+
+    if "insert" in when:
+        create("ai", "INSERT", [when["insert"]] if when["insert"] else [])
+    if "delete" in when:
+        create("ad", "DELETE", [when["delete"]] if when["delete"] else [])
+    if "update" in when:
+        conditions = [when["update"]] if when["update"] else []
+        if columns:
+            conditions.insert(0, " OR ".join(f"old.{c} IS NOT new.{c}" for c in columns))
+            create("au", f"UPDATE OF {', '.join(columns)}", conditions)
+        else:
+            create("au", "UPDATE", conditions)
+
+
+def get(name, conn=None):
+    """الإصدار الحالي لـ name؛ None إن لم يُنشأ الجدول أو الصف (قاعدة قبل v025)."""
+    if conn is None:
+        with get_conn() as c:
+            return get(name, c)
+    try:
+        row = conn.execute("SELECT version FROM data_versions WHERE name=?", (name,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
\ No newline at end of file
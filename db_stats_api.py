@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from msd.database.connection import pool_stats
+from msd.database import tracing
+from msd.absences import report_cache
+from msd.employees import lookup
+from msd.vacations import type_cache
+from msd.departments import directory
+
+db_stats_api_bp = Blueprint("db_stats_api_bp", __name__, url_prefix="/api/v1/admin/db")
+
+def _is_admin():
+    return getattr(current_user, "role", "") in ("manager", "admin")
+
+@db_stats_api_bp.get("/stats")
+@login_required
+def db_stats():
+    """
+    إجماليات تتبّع الاستعلامات + آخر الطلبات (limit) + إحصاءات المجمّعات وذاكرة التقارير وفهرس البحث الفوري وذاكرة أنواع الإجازات ودليل الأقسام.
+    """
+    if not _is_admin():
+        return jsonify({"error":"forbidden"}), 403
+    limit = min(max(request.args.get("limit", 50, type=int), 0), 200)
+    data = tracing.stats(limit)
+    data["pools"] = pool_stats()
+    data["report_cache"] = report_cache.stats()
+    data["employee_lookup"] = lookup.stats()
+    data["vacation_types"] = type_cache.stats()
+    data["departments"] = directory.stats()
+    return jsonify(data)
\ No newline at end of file
@@ -1,27 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from msd.database.connection import get_conn
+from msd.departments import directory
 
 departments_api_bp = Blueprint("departments_api_bp", __name__, url_prefix="/api/v1")
 
-def as_row_dict(cur, row):
-    return {d[0]: row[i] for i, d in enumerate(cur.description)}
-
 @departments_api_bp.get("/departments")
 @login_required
 def list_departments():
-    with get_conn() as conn:
-        conn.row_factory = as_row_dict
-        rows = conn.execute("""
-            SELECT d.id, d.name,
-                   d.department_head_employee_id,
-                   e.name AS head_employee_name,
-                   d.head_password
-              FROM departments d
-              LEFT JOIN employees e ON e.id=d.department_head_employee_id
-              ORDER BY d.name
-        """).fetchall()
-    return jsonify(rows)
+    return jsonify([{
+        "id": d["id"],
+        "name": d["name"],
+        "department_head_employee_id": d["head_employee_id"],
+        "head_employee_name": d["head_employee_name"],
+        "head_password": d["head_password"],
+    } for d in directory.all()])
 
 @departments_api_bp.post("/departments/<int:dept_id>/head")
 @login_required
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from msd.database.connection import get_conn
+from msd.departments import directory
 
 departments_bp = Blueprint("departments_bp", __name__)
 
@@ -12,21 +13,13 @@ def manager_only():
 def list_departments():
     if not manager_only():
         return jsonify(success=False, error="غير مسموح"), 403
-    with get_conn() as conn:
-        rows = conn.execute("""
-            SELECT d.id, d.name, d.department_head_id,
-                   e.name AS head_name
-              FROM departments d
-              LEFT JOIN employees e ON e.id = d.department_head_id
-             ORDER BY d.id
-        """).fetchall()
     items = []
-    for r in rows:
+    for d in directory.all(order="id"):
         items.append({
-            "id": r["id"],
-            "name": r["name"],
-            "head_id": r["department_head_id"],
-            "head_name": r["head_name"]
+            "id": d["id"],
+            "name": d["name"],
+            "head_id": d["head_id"],
+            "head_name": d["head_name"]
         })
     return jsonify(success=True, items=items)
 
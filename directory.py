@@ -0,0 +1,152 @@
+"""
+دليل الأقسام داخل العملية: id / الاسم / رئيس القسم، مشترك بين قوائم الأقسام
+(service_manager و departments_api و departments_page) ومحلّلات الاستيراد (الاسم -> id).
+
+- لقطة واحدة لكل العملية تُحمَّل بثلاثة استعلامات صغيرة: الأقسام، أسماء الموظفين الرؤساء،
+  ومستخدمو department_head. كل قسم يحمل صيغ الرئيس الثلاث الموجودة في القاعدة:
+  department_head_id و department_head_employee_id (مع اسم الموظف) و head_username
+  (users.role='department_head' و users.department_id).
+- مرتبطة بختم "departments" (msd.database.data_versions، v027): يُرفع عند أي تغيير في
+  departments، وعند تغيّر اسم موظف رئيس قسم أو حذفه، وعند تغيّر مستخدم رئيس قسم (الاسم /
+  الدور / القسم)؛ أي كاتب من أي عملية يجعل القراءة التالية تعيد التحميل. إضافة موظفين
+  (الاستيراد) لا تمسّ الختم.
+- قاعدة بلا الختم (قبل v027): إعادة تحميل كل FALLBACK_TTL ثانية.
+- العناصر نسخ (dict)؛ تعديلها لا يمسّ الذاكرة.
+"""
+import sqlite3
+import threading
+import time
+
+from msd.database import data_versions
+from msd.database.connection import get_conn
+
+FALLBACK_TTL = 60.0
+
+# أعمدة الرئيس الاختيارية في departments (تختلف بين القواعد القديمة والمُهاجَرة)
+HEAD_COLUMNS = ("department_head_id", "department_head_employee_id", "head_password")
+
+_lock = threading.Lock()
+_snapshot = None
+_STATS = {"loads": 0, "hits": 0}
+
+
+class Snapshot:
+    def __init__(self, version, departments, employee_names, head_users):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_id = {}
+        for d in departments:
+            head_id = d.get("department_head_id")
+            head_employee_id = d.get("department_head_employee_id")
+            self.by_id[d["id"]] = {
+                "id": d["id"],
+                "name": d["name"],
+                "head_id": head_id,
+                "head_name": employee_names.get(head_id),
+                "head_employee_id": head_employee_id,
+                "head_employee_name": employee_names.get(head_employee_id),
+                "head_username": head_users.get(d["id"]),
+                "head_password": d.get("head_password"),
+            }
+        self.by_name = {d["name"].strip(): d for d in self.by_id.values() if d["name"]}
+        self.ordered = {
+            "id": sorted(self.by_id.values(), key=lambda d: d["id"]),
+            "name": sorted(self.by_id.values(), key=lambda d: (d["name"] or "", d["id"])),
+        }
+
+
+def _load(conn, version):
+    try:
+        existing = {r[1] for r in conn.execute("PRAGMA table_info(departments)").fetchall()}
+        cols = ["id", "name"] + [c for c in HEAD_COLUMNS if c in existing]
+        departments = [dict(zip(cols, r)) for r in
+                       conn.execute(f"SELECT {', '.join(cols)} FROM departments").fetchall()]
+    except sqlite3.OperationalError:
+        # الجدول لم يُنشأ بعد
+        departments = []
+    head_ids = sorted({d[c] for d in departments
+                       for c in ("department_head_id", "department_head_employee_id") if d.get(c)})
+    employee_names = {}
+    if head_ids:
+        marks = ",".join("?" * len(head_ids))
+        employee_names = {r[0]: r[1] for r in conn.execute(
+            f"SELECT id, name FROM employees WHERE id IN ({marks})", head_ids).fetchall()}
+    head_users = {}
+    try:
+        for dept_id, username in conn.execute("""
+            SELECT department_id, username FROM users
+             WHERE role='department_head' AND department_id IS NOT NULL
+             ORDER BY id
+        """).fetchall():
+            head_users.setdefault(dept_id, username)
+    except sqlite3.OperationalError:
+        pass
+    return Snapshot(version, departments, employee_names, head_users)
+
+
+def current(conn=None):
+    """اللقطة الحالية؛ يعيد التحميل إن تغيّر الختم (أو انتهت FALLBACK_TTL بلا ختم)."""
+    global _snapshot
+    if conn is None:
+        with get_conn() as c:
+            return current(c)
+    version = data_versions.get("departments", conn)
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        if version is not None or time.monotonic() - snap.loaded_at < FALLBACK_TTL:
+            _STATS["hits"] += 1
+            return snap
+    snap = _load(conn, version)
+    with _lock:
+        _snapshot = snap
+        _STATS["loads"] += 1
+    return snap
+
+
+def all(order="name", conn=None):
+    """كل الأقسام مرتبة بالاسم (order="name") أو بالرقم (order="id")."""
+    return [dict(d) for d in current(conn).ordered[order]]
+
+
+def get(dept_id, conn=None):
+    try:
+        item = current(conn).by_id.get(int(dept_id))
+    except (TypeError, ValueError):
+        return None
+    return dict(item) if item else None
+
+
+def by_name(name, conn=None):
+    item = current(conn).by_name.get(str(name or "").strip())
+    return dict(item) if item else None
+
+
+def resolve(name_or_id, conn=None):
+    """
+    رقم قسم موجود أو اسمه -> id؛ None إن لم يوجد. الرقم يُجرَّب أولاً
+    (بقاعدة employees_page.ensure_department).
+    """
+    if name_or_id in (None, ""):
+        return None
+    snap = current(conn)
+    text = str(name_or_id).strip()
+    try:
+        dept_id = int(text)
+    except ValueError:
+        dept_id = None
+    if dept_id is not None and dept_id in snap.by_id:
+        return dept_id
+    item = snap.by_name.get(text)
+    return item["id"] if item else None
+
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def stats():
+    snap = _snapshot
+    return {**_STATS, "departments": len(snap.by_id) if snap else None,
+            "version": snap.version if snap else None}
\ No newline at end of file
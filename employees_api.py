@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from msd.database.connection import get_conn
+from msd.utils import search as search_index
+from msd.employees import lookup
 
 employees_api_bp = Blueprint("employees_api_bp", __name__, url_prefix="/api/v1")
 
@@ -17,6 +19,22 @@ def _row_to_emp(r):
         "status": r.get("status")
     }
 
+@employees_api_bp.get("/employees/lookup")
+@login_required
+def lookup_employees():
+    """
+    بحث فوري أثناء الكتابة من فهرس الذاكرة (msd.employees.lookup)، للموظفين النشطين:
+      q= بادئة الاسم أو إحدى كلماته أو الرقم الوظيفي أو ID
+      department_id= داخل قسم؛ dept_only=1 لرئيس القسم (قسمه فقط)
+      limit= حتى lookup.MAX_LIMIT
+    """
+    args = request.args
+    department_id = args.get("department_id", type=int)
+    if args.get("dept_only") == "1" and getattr(current_user, "department_id", None):
+        department_id = current_user.department_id
+    limit = args.get("limit", lookup.DEFAULT_LIMIT, type=int)
+    return jsonify(lookup.lookup(args.get("q", ""), department_id, limit))
+
 @employees_api_bp.get("/employees")
 @login_required
 def list_employees():
@@ -40,10 +58,10 @@ def list_employees():
         filters.append("(e.department_id = ? OR (e.department_id IS NULL AND e.department = (SELECT name FROM departments WHERE id=?)))")
         params.extend([current_user.department_id, current_user.department_id])
 
-    if search:
-        filters.append("(e.name LIKE ? OR e.serial_number LIKE ?)")
-        s = f"%{search}%"
-        params.extend([s, s])
+    found = search_index.match_clause("employees", search, "e.id", ("e.name", "e.serial_number"))
+    if found:
+        filters.append(found[0])
+        params.extend(found[1])
 
     where = "WHERE " + " AND ".join(filters) if filters else ""
     sql = f"""
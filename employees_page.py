@@ -4,10 +4,17 @@ from typing import List, Dict, Any, Optional
 
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, send_file, jsonify
+    url_for, flash, jsonify
 )
 from flask_login import login_required, current_user
 from msd.database.connection import get_conn
+from msd.balances import ledger
+from msd.utils.export_stream import (
+    iter_query, csv_stream, xlsx_stream, streaming_download, XLSX_MIMETYPE
+)
+from msd.utils import export_jobs
+from msd.employees import lookup
+from msd.departments import directory
 
 try:
     import openpyxl
@@ -72,9 +79,7 @@ def decode_work_days(raw: Optional[str]) -> str:
 
 
 def fetch_departments() -> List[Dict[str, Any]]:
-    with get_conn() as conn:
-        rows = conn.execute("SELECT id,name FROM departments ORDER BY name").fetchall()
-    return [{"id": r["id"], "name": r["name"]} for r in rows]
+    return [{"id": d["id"], "name": d["name"]} for d in directory.all()]
 
 
 def count_on_vacation() -> int:
@@ -130,6 +135,19 @@ def fetch_employees(limit=10000):
     return out
 
 
+# نفس أعمدة EXCEL_EXPECTED_ORDER (القسم بالاسم) – تُقرأ بالمؤشر دون حد أقصى
+EXPORT_SQL = """
+SELECT e.serial_number, e.name, e.national_id, e.hiring_date, e.job_grade, e.bonus,
+       e.grade_date,
+       COALESCE(e.annual_balance, e.vacation_balance, 0) AS vacation_balance,
+       d.name AS dept_name,
+       e.work_days
+  FROM employees e
+  LEFT JOIN departments d ON d.id = e.department_id
+ ORDER BY e.id DESC
+"""
+
+
 def ensure_department(name_or_id) -> Optional[int]:
     """
     يحاول تفسير القيمة إما رقم (id موجود مسبقاً) أو اسم قسم.
@@ -138,21 +156,13 @@ def ensure_department(name_or_id) -> Optional[int]:
     """
     if name_or_id in (None, ""):
         return None
+    # رقم أو اسم من دليل الأقسام (بلا استعلام لكل صف مستورد)
+    did = directory.resolve(name_or_id)
+    if did is not None:
+        return did
     with get_conn() as conn:
         cur = conn.cursor()
-        # رقم؟
-        try:
-            did = int(str(name_or_id).strip())
-            row = cur.execute("SELECT id FROM departments WHERE id=?", (did,)).fetchone()
-            if row:
-                return did
-        except Exception:
-            pass
-        # اسم
         dep_name = str(name_or_id).strip()
-        row = cur.execute("SELECT id FROM departments WHERE name=?", (dep_name,)).fetchone()
-        if row:
-            return row[0]
         if CREATE_DEPARTMENT_IF_MISSING:
             cur.execute("INSERT INTO departments (name) VALUES (?)", (dep_name,))
             conn.commit()
@@ -216,6 +226,7 @@ def employees_import():
 
         inserted = 0
         skipped = 0
+        new_ids = []
         with get_conn() as conn:
             cur = conn.cursor()
             for r in rows[start_index:]:
@@ -255,9 +266,12 @@ def employees_import():
                         hiring_date, grade_date, bonus, vacation_balance, "active",
                         work_days
                     ))
+                    new_ids.append(cur.lastrowid)
                     inserted += 1
                 except Exception:
                     skipped += 1
+            # الرصيد الافتتاحي في سجل الأرصدة
+            ledger.sync(conn, new_ids, "import", actor_id=current_user.id)
             conn.commit()
         flash(f"تم الاستيراد: {inserted} / تخطي: {skipped}", "success")
     except Exception as e:
@@ -270,46 +284,19 @@ def employees_import():
 def employees_export():
     if not validate_manager():
         return "غير مسموح", 403
-    employees = fetch_employees()
+    filename, mimetype, body = _console_export()
+    return streaming_download(body, filename, mimetype)
+
+
+@export_jobs.exporter("employees_console", roles=("manager", "admin"))
+def _console_export(params=None):
+    rows = iter_query(EXPORT_SQL)
     if openpyxl is None:
         # تصدير CSV بسيط
-        import csv
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(EXCEL_EXPECTED_ORDER)
-        for e in employees:
-            writer.writerow([
-                e["serial_number"], e["name"], e["national_id"],
-                e["hiring_date"], e["job_grade"], e["bonus"], e.get("grade_date"),
-                e["vacation_balance"], e["dept_name"], e["work_days"]
-            ])
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode("utf-8-sig")),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name="employees_export.csv"
-        )
-    # XLSX
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Employees"
-    ws.append(EXCEL_EXPECTED_ORDER)
-    for e in employees:
-        ws.append([
-            e["serial_number"], e["name"], e["national_id"],
-            e["hiring_date"], e["job_grade"], e["bonus"], e.get("grade_date"),
-            e["vacation_balance"], e["dept_name"], e["work_days"]
-        ])
-    f = io.BytesIO()
-    wb.save(f)
-    f.seek(0)
-    return send_file(
-        f,
-        as_attachment=True,
-        download_name="employees_export.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+        return "employees_export.csv", "text/csv", csv_stream(EXCEL_EXPECTED_ORDER, rows)
+    # XLSX (write_only)
+    return ("employees_export.xlsx", XLSX_MIMETYPE,
+            xlsx_stream(EXCEL_EXPECTED_ORDER, rows, title="Employees"))
 
 
 @employees_console_bp.post("/manager/employees/add")
@@ -340,7 +327,10 @@ def employees_add():
                 "active",
                 data.get("work_days")
             ))
+            emp_id = cur.lastrowid
+            ledger.sync(conn, [emp_id], "opening", actor_id=current_user.id)
             conn.commit()
+        lookup.refresh([emp_id])
         return jsonify(success=True, message="تمت الإضافة")
     except Exception as e:
         return jsonify(success=False, error=str(e)), 400
@@ -374,7 +364,9 @@ def employees_update(emp_id):
                 data.get("status") or "active",
                 emp_id
             ))
+            ledger.sync(conn, [emp_id], "manual", actor_id=current_user.id)
             conn.commit()
+        lookup.refresh([emp_id])
         return jsonify(success=True, message="تم التحديث")
     except Exception as e:
         return jsonify(success=False, error=str(e)), 400
@@ -392,6 +384,7 @@ def employees_delete(emp_id):
             if cur.rowcount == 0:
                 return jsonify(success=False, error="الموظف غير موجود"), 404
             conn.commit()
+        lookup.refresh([emp_id])
         return jsonify(success=True, message="تم الحذف")
     except Exception as e:
         return jsonify(success=False, error=str(e)), 400
@@ -0,0 +1,192 @@
+"""
+مهام التصدير في الخلفية: المصنفات الثقيلة تُبنى في مجمّع خيوط محلي إلى ملفات على القرص
+بدل بنائها داخل خيط الطلب.
+
+- المُصدِّرات تُسجَّل بنوعها بجوار مساراتها المتزامنة (@export_jobs.exporter("absences_report"))؛
+  يستقبل المُصدِّر معاملات المهمة ويعيد (filename, mimetype, chunks).
+- صف المهمة (export_jobs، الهجرة v020) ينتقل queued -> running -> done/failed؛ الملف يُكتب
+  تحت EXPORT_JOB_DIR ويُعاد تسميته إلى مكانه عند اكتماله.
+- cleanup() تحذف الملفات والصفوف الأقدم من EXPORT_JOB_RETENTION_HOURS وتُفشل المهام العالقة
+  في queued/running أكثر من EXPORT_JOB_TIMEOUT (كإعادة تشغيل العملية أثناء التصدير)؛
+  تُستدعى بعد كل مهمة وعبر manage.py cleanup-export-jobs.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from msd.database.connection import get_conn, transaction
+from msd.database.migrations import v020_export_jobs
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# kind -> (fn, roles) ؛ roles=None: أي مستخدم مسجّل
+EXPORTERS = {}
+
+_settings = {
+    "dir": None,
+    "workers": 2,
+    "retention_hours": 24.0,
+    "timeout": 3600.0,
+}
+
+_lock = threading.Lock()
+_executor = None
+_app = None
+
+_COLUMNS = ("id, kind, params, status, requested_by, filename, mimetype, path, size, "
+            "error, created_at, started_at, finished_at")
+
+
+def exporter(kind, roles=None):
+    def decorator(fn):
+        EXPORTERS[kind] = (fn, tuple(roles) if roles else None)
+        return fn
+    return decorator
+
+
+def allowed(kind, role):
+    if kind not in EXPORTERS:
+        return False
+    roles = EXPORTERS[kind][1]
+    return roles is None or role in roles
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_settings["workers"],
+                                               thread_name_prefix="export-job")
+    return _executor
+
+
+def _job_dict(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"] or "{}")
+    return job
+
+
+def submit(kind, params=None, requested_by=None):
+    """يسجّل المهمة ويضعها في طابور العمّال؛ يعيد معرّفها."""
+    if kind not in EXPORTERS:
+        raise ValueError("نوع تصدير غير معروف")
+    job_id = uuid.uuid4().hex
+    with get_conn() as conn, transaction(conn):
+        conn.execute("""
+            INSERT INTO export_jobs(id, kind, params, status, requested_by, created_at)
+            VALUES (?,?,?,?,?,?)
+        """, (job_id, kind, json.dumps(params or {}, ensure_ascii=False), QUEUED,
+              requested_by, _now()))
+    _get_executor().submit(_run, job_id)
+    return job_id
+
+
+def get_job(job_id):
+    with get_conn() as conn:
+        row = conn.execute(f"SELECT {_COLUMNS} FROM export_jobs WHERE id=?", (job_id,)).fetchone()
+    return _job_dict(row)
+
+
+def list_jobs(requested_by=None, limit=20):
+    sql = f"SELECT {_COLUMNS} FROM export_jobs"
+    params = []
+    if requested_by is not None:
+        sql += " WHERE requested_by=?"
+        params.append(requested_by)
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    with get_conn() as conn:
+        return [_job_dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def _set(job_id, **fields):
+    cols = ", ".join(f"{k}=?" for k in fields)
+    with get_conn() as conn, transaction(conn):
+        conn.execute(f"UPDATE export_jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+
+
+def _run(job_id):
+    with _app.app_context():
+        job = get_job(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        _set(job_id, status=RUNNING, started_at=_now())
+        path = os.path.join(_settings["dir"], job_id)
+        tmp = path + ".part"
+        try:
+            fn = EXPORTERS[job["kind"]][0]
+            filename, mimetype, chunks = fn(job["params"])
+            size = 0
+            with open(tmp, "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+            _set(job_id, status=DONE, filename=filename, mimetype=mimetype,
+                 path=path, size=size, finished_at=_now())
+        except Exception as e:
+            if isinstance(e, ValueError):
+                # بارامترات غير صالحة (نفس رسائل المسار المتزامن)
+                logger.warning("مهمة التصدير %s (%s): %s", job_id, job["kind"], e)
+            else:
+                logger.exception("فشل مهمة التصدير %s (%s)", job_id, job["kind"])
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            _set(job_id, status=FAILED, error=str(e), finished_at=_now())
+        try:
+            cleanup()
+        except Exception:
+            logger.exception("فشل تنظيف مهام التصدير")
+
+
+def cleanup(now=None):
+    """يحذف المهام المنتهية (وملفاتها) الأقدم من مدة الاحتفاظ؛ يعيد عدد المحذوف."""
+    now = now or datetime.utcnow()
+    expired = (now - timedelta(hours=_settings["retention_hours"])).isoformat()
+    stuck = (now - timedelta(seconds=_settings["timeout"])).isoformat()
+    with get_conn() as conn, transaction(conn):
+        conn.execute("""
+            UPDATE export_jobs SET status=?, error=?, finished_at=?
+             WHERE status IN (?, ?) AND created_at < ?
+        """, (FAILED, "انتهت مهلة المهمة", now.isoformat(), QUEUED, RUNNING, stuck))
+        rows = conn.execute("""
+            SELECT id, path FROM export_jobs
+             WHERE created_at < ? AND status IN (?, ?)
+        """, (expired, DONE, FAILED)).fetchall()
+        for job_id, path in rows:
+            if path and os.path.exists(path):
+                os.remove(path)
+        conn.executemany("DELETE FROM export_jobs WHERE id=?", [(r[0],) for r in rows])
+    return len(rows)
+
+
+def init_app(app):
+    global _app
+    _app = app
+    cfg = app.config
+    _settings["dir"] = cfg.get("EXPORT_JOB_DIR") or os.path.join(app.instance_path, "exports")
+    _settings["workers"] = int(cfg.get("EXPORT_JOB_WORKERS", _settings["workers"]))
+    _settings["retention_hours"] = float(cfg.get("EXPORT_JOB_RETENTION_HOURS", _settings["retention_hours"]))
+    _settings["timeout"] = float(cfg.get("EXPORT_JOB_TIMEOUT", _settings["timeout"]))
+    os.makedirs(_settings["dir"], exist_ok=True)
+    with app.app_context():
+        with get_conn() as conn:
+            v020_export_jobs.apply(conn)
+            conn.commit()
\ No newline at end of file
@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify, send_file, url_for
+from flask_login import login_required, current_user
+from msd.utils import export_jobs
+
+export_jobs_api_bp = Blueprint("export_jobs_api_bp", __name__, url_prefix="/api/v1/exports")
+
+def _is_admin():
+    return getattr(current_user, "role", "") in ("manager", "admin")
+
+def _visible_job(job_id):
+    job = export_jobs.get_job(job_id)
+    if not job:
+        return None
+    if job["requested_by"] != current_user.id and not _is_admin():
+        return None
+    return job
+
+def _public(job):
+    out = {k: job[k] for k in ("id", "kind", "params", "status", "filename",
+                               "size", "error", "created_at", "started_at", "finished_at")}
+    out["status_url"] = url_for("export_jobs_api_bp.job_status", job_id=job["id"])
+    if job["status"] == export_jobs.DONE:
+        out["download_url"] = url_for("export_jobs_api_bp.job_download", job_id=job["id"])
+    return out
+
+@export_jobs_api_bp.post("")
+@login_required
+def submit_job():
+    """
+    {"kind": "absences_report" | "employees" | "employees_console", "params": {...}}
+    -> 202 {"id", "status_url"}
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind")
+    if not export_jobs.allowed(kind, getattr(current_user, "role", "")):
+        return jsonify({"error": "forbidden"}), 403
+    params = data.get("params") or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "params يجب أن يكون كائناً"}), 400
+    job_id = export_jobs.submit(kind, params, requested_by=current_user.id)
+    return jsonify(_public(export_jobs.get_job(job_id))), 202
+
+@export_jobs_api_bp.get("")
+@login_required
+def list_jobs():
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    return jsonify([_public(j) for j in export_jobs.list_jobs(current_user.id, limit)])
+
+@export_jobs_api_bp.get("/<job_id>")
+@login_required
+def job_status(job_id):
+    job = _visible_job(job_id)
+    if not job:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(_public(job))
+
+@export_jobs_api_bp.get("/<job_id>/download")
+@login_required
+def job_download(job_id):
+    job = _visible_job(job_id)
+    if not job:
+        return jsonify({"error": "not found"}), 404
+    if job["status"] != export_jobs.DONE or not job["path"]:
+        return jsonify({"error": "الملف غير جاهز", "status": job["status"]}), 409
+    try:
+        return send_file(job["path"], as_attachment=True,
+                         download_name=job["filename"], mimetype=job["mimetype"])
+    except FileNotFoundError:
+        return jsonify({"error": "انتهت صلاحية الملف"}), 410
\ No newline at end of file
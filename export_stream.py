@@ -0,0 +1,81 @@
+"""
+تصدير متدفّق: الصفوف تُقرأ من المؤشر على دفعات وتُكتب مباشرة في استجابة HTTP،
+فتبقى الذاكرة ثابتة مهما كان عدد الصفوف.
+"""
+
+import csv
+import io
+import tempfile
+
+from flask import Response, stream_with_context
+
+from msd.database.connection import get_conn
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+FETCH_CHUNK = 500
+FILE_CHUNK = 64 * 1024
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def iter_query(sql, params=(), chunk=FETCH_CHUNK):
+    """
+    صفوف استعلام قراءة عبر fetchmany(chunk).
+    يُستهلك داخل سياق الطلب/التطبيق (stream_with_context).
+    """
+    with get_conn(readonly=True) as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield from rows
+
+
+def csv_stream(header, rows, chunk=FETCH_CHUNK):
+    """CSV (utf-8 مع BOM لأجل Excel) دفعة بعد دفعة."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(header)
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % chunk == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def xlsx_stream(header, rows, title="Sheet"):
+    """
+    مصنف openpyxl بوضع write_only: الصفوف تُكتب إلى ملف مؤقت عند إضافتها،
+    ثم يُرسل الملف المكتمل على قطع بحجم FILE_CHUNK.
+    """
+    if openpyxl is None:
+        raise RuntimeError("openpyxl غير مثبت")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(list(header))
+    for row in rows:
+        ws.append(list(row))
+    with tempfile.TemporaryFile() as fh:
+        wb.save(fh)
+        fh.seek(0)
+        while True:
+            data = fh.read(FILE_CHUNK)
+            if not data:
+                break
+            yield data
+
+
+def streaming_download(body, filename, mimetype):
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
\ No newline at end of file
@@ -1,3 +1,3 @@
-from flask_login import LoginManager
-login_manager = LoginManager()
+from flask_login import LoginManager
+login_manager = LoginManager()
 login_manager.login_view = "auth.login"
\ No newline at end of file
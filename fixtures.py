@@ -0,0 +1,251 @@
+"""
+قاعدة بيانات تجريبية (scratch) بمخطط مطابق لقاعدة مُهاجَرة + بيانات عشوائية ثابتة البذرة.
+
+تُستخدم في فحص خطط الاستعلام (query_plans) وفي أوامر القياس (benchmarks)
+بدلاً من لمس employees.db الحقيقية.
+"""
+import random
+import sqlite3
+from datetime import date, timedelta
+
+# المخطط بعد تطبيق الهجرات v001..v016 (اتحاد الأعمدة القديمة والجديدة)
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS departments(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT UNIQUE NOT NULL,
+  head_user_id INTEGER,
+  head_password TEXT,
+  department_head_id INTEGER,
+  department_head_employee_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS users(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  username TEXT UNIQUE NOT NULL,
+  password_hash TEXT NOT NULL DEFAULT '',
+  role TEXT NOT NULL DEFAULT 'employee',
+  department_id INTEGER,
+  telegram_chat_id TEXT,
+  employee_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS employees(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  serial_number TEXT,
+  name TEXT NOT NULL,
+  national_id TEXT,
+  department TEXT,
+  department_id INTEGER,
+  job_grade TEXT,
+  job_title TEXT,
+  hiring_date TEXT,
+  grade_date TEXT,
+  bonus REAL DEFAULT 0,
+  annual_balance REAL DEFAULT 0,
+  emergency_balance REAL DEFAULT 12,
+  vacation_balance REAL DEFAULT 0,
+  emergency_vacation_balance REAL,
+  work_days TEXT,
+  status TEXT DEFAULT 'active',
+  gender TEXT,
+  user_id INTEGER,
+  tg_chat_id TEXT,
+  created_at TEXT,
+  updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS vacation_types(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  code TEXT UNIQUE NOT NULL,
+  name_ar TEXT NOT NULL,
+  fixed_duration INTEGER,
+  max_per_request INTEGER,
+  affects_annual_balance INTEGER DEFAULT 0,
+  affects_emergency_balance INTEGER DEFAULT 0,
+  approval_flow TEXT DEFAULT 'dept_then_manager',
+  requires_relation INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS vacation_requests(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  employee_id INTEGER NOT NULL,
+  type_code TEXT NOT NULL,
+  relation TEXT,
+  start_date TEXT NOT NULL,
+  end_date TEXT NOT NULL,
+  requested_days INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  dept_decision_at TEXT,
+  dept_decision_by INTEGER,
+  manager_decision_at TEXT,
+  manager_decision_by INTEGER,
+  notes TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  rejection_reason TEXT
+);
+CREATE TABLE IF NOT EXISTS vacation_request_history(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  vacation_request_id INTEGER NOT NULL,
+  action TEXT NOT NULL,
+  from_status TEXT,
+  to_status TEXT,
+  actor_role TEXT,
+  actor_user_id INTEGER,
+  note TEXT,
+  created_at TEXT DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS vacation_history(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  vacation_id INTEGER NOT NULL,
+  action TEXT,
+  from_status TEXT,
+  to_status TEXT,
+  actor_id INTEGER,
+  actor_role TEXT,
+  note TEXT,
+  created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS absences(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  employee_id INTEGER NOT NULL,
+  date TEXT,
+  type TEXT NOT NULL,
+  duration INTEGER DEFAULT 1,
+  notes TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  start_date TEXT,
+  end_date TEXT
+);
+CREATE TABLE IF NOT EXISTS audit_log(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  action TEXT,
+  table_name TEXT,
+  record_id INTEGER,
+  changes TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS service_requests(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  employee_id INTEGER NOT NULL,
+  request_type TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'new',
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  notes TEXT
+);
+CREATE TABLE IF NOT EXISTS migration_meta(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT UNIQUE NOT NULL,
+  applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- فهارس الهجرات السابقة (v002, v005, v008..v016)
+CREATE INDEX IF NOT EXISTS idx_vreq_emp ON vacation_requests(employee_id);
+CREATE INDEX IF NOT EXISTS idx_vac_hist_req ON vacation_request_history(vacation_request_id);
+CREATE INDEX IF NOT EXISTS idx_absences_date ON absences(date);
+CREATE INDEX IF NOT EXISTS idx_absences_emp_date ON absences(employee_id, date);
+CREATE INDEX IF NOT EXISTS idx_users_role_dept ON users(role, department_id);
+CREATE INDEX IF NOT EXISTS idx_employees_user_id ON employees(user_id);
+CREATE INDEX IF NOT EXISTS idx_audit_table_record ON audit_log(table_name, record_id);
+CREATE INDEX IF NOT EXISTS idx_departments_head_user ON departments(head_user_id);
+CREATE INDEX IF NOT EXISTS idx_absences_employee_start ON absences(employee_id, start_date);
+CREATE INDEX IF NOT EXISTS idx_absences_range ON absences(start_date, end_date);
+CREATE INDEX IF NOT EXISTS idx_absences_type ON absences(type);
+CREATE INDEX IF NOT EXISTS idx_service_requests_status ON service_requests(status);
+"""
+
+VACATION_STATUSES = [
+    "pending_dept", "pending_manager", "approved",
+    "rejected_dept", "rejected_manager", "cancelled"
+]
+VACATION_CODES = ["ANNUAL", "EMERGENCY", "SICK", "MARRIAGE", "DEATH"]
+ABSENCE_TYPES = ["absence", "late", "early_leave"]
+
+
+def connect(path=":memory:"):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def create_schema(conn):
+    conn.executescript(SCHEMA_SQL)
+    conn.commit()
+
+
+def seed(conn, employees=500, departments=20, requests_per_employee=8,
+         absences_per_employee=12, start=date(2023, 1, 1), days=730, rnd_seed=1):
+    """
+    يملأ الجداول ببيانات واقعية الشكل (حالات متنوعة، فترات متداخلة).
+    البذرة ثابتة حتى تكون النتائج قابلة للمقارنة بين تشغيلين.
+    """
+    rnd = random.Random(rnd_seed)
+    now = "2024-01-01 00:00:00"
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO departments(name) VALUES(?)",
+        [(f"قسم {i}",) for i in range(1, departments + 1)]
+    )
+    cur.executemany("""
+        INSERT INTO vacation_types(code, name_ar, max_per_request, affects_annual_balance, affects_emergency_balance)
+        VALUES (?,?,?,?,?)
+    """, [(c, c, 30, int(c == "ANNUAL"), int(c == "EMERGENCY")) for c in VACATION_CODES])
+
+    emp_rows = []
+    for i in range(1, employees + 1):
+        dept = rnd.randint(1, departments)
+        emp_rows.append((
+            f"S{i:06d}", f"موظف {i}", f"{rnd.randint(10**11, 10**12 - 1)}",
+            dept, f"الدرجة {rnd.randint(1, 15)}",
+            (start - timedelta(days=rnd.randint(0, 7000))).isoformat(),
+            rnd.randint(0, 60), rnd.randint(0, 12), now, now
+        ))
+    cur.executemany("""
+        INSERT INTO employees(serial_number, name, national_id, department_id, job_grade,
+                              hiring_date, vacation_balance, emergency_balance, created_at, updated_at)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+    """, emp_rows)
+
+    req_rows = []
+    abs_rows = []
+    for emp_id in range(1, employees + 1):
+        for _ in range(requests_per_employee):
+            s = start + timedelta(days=rnd.randint(0, days))
+            n = rnd.randint(1, 15)
+            req_rows.append((
+                emp_id, rnd.choice(VACATION_CODES), s.isoformat(),
+                (s + timedelta(days=n - 1)).isoformat(), n,
+                rnd.choice(VACATION_STATUSES), now
+            ))
+        for _ in range(absences_per_employee):
+            s = start + timedelta(days=rnd.randint(0, days))
+            n = rnd.randint(1, 3)
+            type_code = rnd.choice(ABSENCE_TYPES)
+            if type_code != "absence":
+                # مثل service_absences.create_absence: تأخير / انصراف مبكر = يوم واحد
+                n = 1
+            abs_rows.append((
+                emp_id, s.isoformat(), type_code, n,
+                s.isoformat(), (s + timedelta(days=n - 1)).isoformat(), now
+            ))
+    cur.executemany("""
+        INSERT INTO vacation_requests(employee_id, type_code, start_date, end_date,
+                                      requested_days, status, created_at)
+        VALUES (?,?,?,?,?,?,?)
+    """, req_rows)
+    cur.executemany("""
+        INSERT INTO vacation_request_history(vacation_request_id, action, to_status, created_at)
+        VALUES (?, 'create', ?, ?)
+    """, [(i, r[5], now) for i, r in enumerate(req_rows, start=1)])
+    cur.executemany("""
+        INSERT INTO absences(employee_id, date, type, duration, start_date, end_date, created_at)
+        VALUES (?,?,?,?,?,?,?)
+    """, abs_rows)
+    conn.commit()
+
+
+def scratch_db(path=":memory:", analyze=True, **seed_kwargs):
+    """اتصال بقاعدة تجريبية جاهزة (مخطط + بيانات). analyze يحاكي قاعدة إنتاج بعد PRAGMA optimize."""
+    conn = connect(path)
+    create_schema(conn)
+    seed(conn, **seed_kwargs)
+    if analyze:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return conn
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""
+سجل الأرصدة: balance_ledger (حركات موقّعة، إضافة فقط) + balance_snapshots (لقطات دورية).
+
+- كل تغيير على عمود رصيد في employees يمرّ من هنا داخل وحدة عمل المستدعي:
+  post() يطبّق الفرق ذرّياً (col = COALESCE(col,0) + ?) ويسجّل الحركة في وحدة العمل نفسها
+  (لا قراءة ثم كتابة => لا تحديثات ضائعة بين طلبين متزامنين).
+  set_balance() / apply_bulk() للقيم المطلقة (تعديل المدير، تصفير الطارئ) تسجّل الفرق الفعلي.
+- balance = اسم العمود نفسه (vacation_balance / annual_balance / emergency_balance /
+  emergency_vacation_balance)؛ عمود employees يبقى القيمة الحالية للمسارات الساخنة،
+  والسجل هو التاريخ: balance_at() = آخر لقطة <= التاريخ + مجموع الحركات بعدها (استعلامان مفهرسان).
+- اللقطة (take_snapshot، manage.py snapshot-balances) لكل موظف/رصيد حتى تاريخ ما؛
+  حركة بتاريخ سابق لِلقطة تحذف اللقطات المتأثرة لذلك الرصيد فيرجع balance_at إلى لقطة أقدم.
+- reconcile() يقارن مجموع السجل بالأعمدة (manage.py reconcile-balances [--fix]):
+  أي كتابة لا تمرّ من هنا (تعديل مباشر في القاعدة، سكربت قديم) تظهر هنا؛
+  المسارات التي تكتب الأعمدة جماعياً (إنشاء/استيراد موظفين) تسجّل الفرق بعدها عبر sync().
+- قبل الهجرة v021 (لا جدول balance_ledger): التحديث الذرّي فقط دون تسجيل.
+"""
+from datetime import date, datetime
+
+from msd.database import schema_registry
+
+LEDGER = "balance_ledger"
+SNAPSHOTS = "balance_snapshots"
+
+BALANCE_COLUMNS = ("vacation_balance", "annual_balance",
+                   "emergency_balance", "emergency_vacation_balance")
+
+# تقريب مجموع الحركات العشرية (تراكم 2.5 / 3.75 يوم شهرياً)
+TOLERANCE = 1e-6
+
+
+def _check(column):
+    if column not in BALANCE_COLUMNS:
+        raise ValueError(f"عمود رصيد غير معروف: {column}")
+
+
+def _now():
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _day(value):
+    if value is None:
+        return date.today().isoformat()
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+
+def tracked_columns():
+    """أعمدة الرصيد الموجودة فعلاً في employees لهذه القاعدة."""
+    schema = schema_registry.get()
+    return [c for c in BALANCE_COLUMNS if schema.has("employees", c)]
+
+
+def create_tables(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LEDGER}(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          employee_id INTEGER NOT NULL,
+          balance TEXT NOT NULL,
+          delta REAL NOT NULL,
+          kind TEXT NOT NULL,
+          ref TEXT,
+          effective_date TEXT NOT NULL,
+          actor_id INTEGER,
+          created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_balance_ledger_emp
+          ON {LEDGER}(employee_id, balance, effective_date)
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SNAPSHOTS}(
+          employee_id INTEGER NOT NULL,
+          balance TEXT NOT NULL,
+          as_of TEXT NOT NULL,
+          amount REAL NOT NULL,
+          created_at TEXT NOT NULL,
+          PRIMARY KEY(employee_id, balance, as_of)
+        )
+    """)
+
+
+def seed_opening(conn, columns, effective=None):
+    """حركة 'opening' = القيمة الحالية لكل موظف/عمود غير صفري (عند إنشاء السجل أول مرة)."""
+    day, now = _day(effective), _now()
+    for column in columns:
+        _check(column)
+        conn.execute(f"""
+            INSERT INTO {LEDGER}(employee_id, balance, delta, kind, effective_date, created_at)
+            SELECT id, ?, {column}, 'opening', ?, ?
+              FROM employees WHERE COALESCE({column}, 0) <> 0
+        """, (column, day, now))
+
+
+def _ledger_enabled():
+    return schema_registry.get().balance_ledger
+
+
+def _drop_stale_snapshots(conn, column, day, employee_id=None):
+    sql = f"DELETE FROM {SNAPSHOTS} WHERE balance=? AND as_of >= ?"
+    params = [column, day]
+    if employee_id is not None:
+        sql += " AND employee_id=?"
+        params.append(employee_id)
+    conn.execute(sql, params)
+
+
+def post(conn, employee_id, column, delta, kind, ref=None, actor_id=None, effective=None):
+    """يضيف delta (موجباً أو سالباً) إلى الرصيد ويسجّله؛ يعيد False إن لم يوجد الموظف."""
+    _check(column)
+    cur = conn.execute(f"UPDATE employees SET {column} = COALESCE({column}, 0) + ? WHERE id=?",
+                       (delta, employee_id))
+    if cur.rowcount == 0:
+        return False
+    if delta and _ledger_enabled():
+        day = _day(effective)
+        conn.execute(f"""
+            INSERT INTO {LEDGER}(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, (employee_id, column, delta, kind, ref, day, actor_id, _now()))
+        _drop_stale_snapshots(conn, column, day, employee_id)
+    return True
+
+
+def set_balance(conn, employee_id, column, value, kind, ref=None, actor_id=None, effective=None):
+    """يضبط الرصيد على value ويسجّل الفرق عن القيمة الحالية (لا شيء إن لم تتغيّر)."""
+    _check(column)
+    if _ledger_enabled():
+        day = _day(effective)
+        cur = conn.execute(f"""
+            INSERT INTO {LEDGER}(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+            SELECT id, ?, COALESCE(CAST(? AS REAL), 0) - COALESCE({column}, 0), ?, ?, ?, ?, ?
+              FROM employees WHERE id=? AND COALESCE({column}, 0) <> COALESCE(CAST(? AS REAL), 0)
+        """, (column, value, kind, ref, day, actor_id, _now(), employee_id, value))
+        if cur.rowcount:
+            _drop_stale_snapshots(conn, column, day, employee_id)
+    conn.execute(f"UPDATE employees SET {column}=? WHERE id=?", (value, employee_id))
+
+
+def apply_bulk(conn, column, kind, where="1=1", params=(), delta_sql=None, value=None,
+               ref=None, actor_id=None, effective=None, delta_params=()):
+    """
+    نسخة جماعية (استعلامان لكل العمود بدل حلقة لكل موظف):
+    delta_sql: تعبير SQL على صف employees (مثل تراكم شهري، معاملاته delta_params)
+    أو value: قيمة مطلقة (تصفير). يعيد عدد الموظفين المطابقين لـ where.
+    """
+    _check(column)
+    if (delta_sql is None) == (value is None):
+        raise ValueError("حدد delta_sql أو value")
+    params = tuple(params)
+    if value is not None:
+        delta_expr, delta_params = f"? - COALESCE({column}, 0)", (value,)
+    else:
+        delta_expr, delta_params = f"({delta_sql})", tuple(delta_params)
+    if _ledger_enabled():
+        day = _day(effective)
+        cur = conn.execute(f"""
+            INSERT INTO {LEDGER}(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+            SELECT id, ?, d, ?, ?, ?, ?, ?
+              FROM (SELECT id, {delta_expr} AS d FROM employees WHERE {where})
+             WHERE d IS NOT NULL AND d <> 0
+        """, (column, kind, ref, day, actor_id, _now(), *delta_params, *params))
+        if cur.rowcount:
+            _drop_stale_snapshots(conn, column, day)
+    if value is not None:
+        cur = conn.execute(f"UPDATE employees SET {column}=? WHERE {where}", (value, *params))
+    else:
+        cur = conn.execute(f"""
+            UPDATE employees SET {column} = COALESCE({column}, 0) + COALESCE({delta_expr}, 0)
+             WHERE {where}
+        """, (*delta_params, *params))
+    return cur.rowcount
+
+
+# رموز أنواع الإجازة في service_requests -> عمود الرصيد (كما في msd.balances.service)
+TYPE_COLUMNS = {"ANNUAL": "annual_balance", "EMERGENCY": "emergency_balance"}
+
+
+def consume(conn, employee_id, type_code, days, ref=None, actor_id=None):
+    """
+    بديل consume_balance على اتصال المستدعي وداخل وحدة عمله (BEGIN IMMEDIATE يضمن
+    أن الرصيد المقروء لا يتغيّر قبل الخصم)؛ ValueError إن كان الرصيد غير كافٍ.
+    """
+    column = TYPE_COLUMNS.get(type_code)
+    if column is None:
+        return
+    row = conn.execute(f"SELECT {column} FROM employees WHERE id=?", (employee_id,)).fetchone()
+    if not row or (row[0] or 0) < days:
+        raise ValueError("رصيد سنوي غير كافٍ" if type_code == "ANNUAL" else "رصيد طارئ غير كافٍ")
+    post(conn, employee_id, column, -days, "consume", ref=ref, actor_id=actor_id)
+
+
+def restore(conn, employee_id, type_code, days, ref=None, actor_id=None):
+    column = TYPE_COLUMNS.get(type_code)
+    if column is not None:
+        post(conn, employee_id, column, days, "restore", ref=ref, actor_id=actor_id)
+
+
+# ============= القراءة ==============
+
+def balance_at(conn, employee_id, column, as_of=None):
+    """الرصيد كما كان في نهاية يوم as_of (افتراضياً اليوم) من السجل."""
+    _check(column)
+    day = _day(as_of)
+    snap = conn.execute(f"""
+        SELECT as_of, amount FROM {SNAPSHOTS}
+         WHERE employee_id=? AND balance=? AND as_of <= ?
+         ORDER BY as_of DESC LIMIT 1
+    """, (employee_id, column, day)).fetchone()
+    base_day, base = (snap[0], snap[1]) if snap else ("", 0.0)
+    tail = conn.execute(f"""
+        SELECT COALESCE(SUM(delta), 0) FROM {LEDGER}
+         WHERE employee_id=? AND balance=? AND effective_date > ? AND effective_date <= ?
+    """, (employee_id, column, base_day, day)).fetchone()[0]
+    return base + tail
+
+
+def history(conn, employee_id, column=None, limit=100):
+    sql = f"""
+        SELECT id, balance, delta, kind, ref, effective_date, actor_id, created_at
+          FROM {LEDGER} WHERE employee_id=?
+    """
+    params = [employee_id]
+    if column:
+        _check(column)
+        sql += " AND balance=?"
+        params.append(column)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+# ============= الصيانة ==============
+
+def take_snapshot(conn, as_of):
+    """
+    لقطة لكل موظف/رصيد له حركات حتى as_of؛ تُبنى تزايدياً من آخر لقطة أقدم
+    (مجموع الحركات بعدها فقط) لا من السجل كاملاً. يعيد عدد اللقطات.
+    """
+    day = _day(as_of)
+    cur = conn.execute(f"""
+        INSERT OR REPLACE INTO {SNAPSHOTS}(employee_id, balance, as_of, amount, created_at)
+        SELECT k.employee_id, k.balance, ?,
+               COALESCE(s.amount, 0) + COALESCE((
+                 SELECT SUM(l.delta) FROM {LEDGER} l
+                  WHERE l.employee_id = k.employee_id AND l.balance = k.balance
+                    AND l.effective_date > COALESCE(s.as_of, '') AND l.effective_date <= ?
+               ), 0),
+               ?
+          FROM (SELECT DISTINCT employee_id, balance FROM {LEDGER} WHERE effective_date <= ?) k
+          LEFT JOIN {SNAPSHOTS} s
+            ON s.employee_id = k.employee_id AND s.balance = k.balance
+           AND s.as_of = (SELECT MAX(s2.as_of) FROM {SNAPSHOTS} s2
+                           WHERE s2.employee_id = k.employee_id AND s2.balance = k.balance
+                             AND s2.as_of < ?)
+    """, (day, day, _now(), day, day))
+    return cur.rowcount
+
+
+def reconcile(conn, fix=False, employee_ids=None, kind="reconcile", ref=None, actor_id=None):
+    """
+    [{"employee_id", "balance", "column_value", "ledger_value", "diff"}] لكل اختلاف
+    بين عمود employees ومجموع حركاته (كل الموظفين أو employee_ids فقط).
+    fix=True: حركة kind بالفرق؛ عمود employees هو المرجع.
+    """
+    if employee_ids is None:
+        id_chunks = [None]
+    else:
+        ids = list(employee_ids)
+        id_chunks = [ids[i:i + 500] for i in range(0, len(ids), 500)]
+    mismatches, fixes = [], []
+    for column in tracked_columns():
+        for chunk in id_chunks:
+            sql = f"""
+                SELECT e.id, CAST(COALESCE(e.{column}, 0) AS REAL) AS actual,
+                       (SELECT COALESCE(SUM(l.delta), 0) FROM {LEDGER} l
+                         WHERE l.employee_id = e.id AND l.balance = ?) AS total
+                  FROM employees e
+            """
+            params = [column]
+            if chunk is not None:
+                if not chunk:
+                    continue
+                sql += f" WHERE e.id IN ({', '.join('?' * len(chunk))})"
+                params.extend(chunk)
+            for emp_id, actual, total in conn.execute(sql + " ORDER BY e.id", params):
+                if abs(actual - total) <= TOLERANCE:
+                    continue
+                fixes.append((emp_id, column, actual - total))
+                mismatches.append({
+                    "employee_id": emp_id,
+                    "balance": column,
+                    "column_value": actual,
+                    "ledger_value": round(total, 6),
+                    "diff": round(actual - total, 6),
+                })
+    if fix and fixes:
+        day, now = _day(None), _now()
+        conn.executemany(f"""
+            INSERT INTO {LEDGER}(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, [(emp_id, column, diff, kind, ref, day, actor_id, now) for emp_id, column, diff in fixes])
+        for emp_id, column, _ in fixes:
+            _drop_stale_snapshots(conn, column, day, emp_id)
+    return mismatches
+
+
+def sync(conn, employee_ids, kind, ref=None, actor_id=None):
+    """
+    يسجّل ما كتبه مسار جماعي مباشرةً في أعمدة الرصيد (إنشاء موظف، استيراد Excel) كحركة
+    واحدة لكل موظف/عمود تغيّر؛ لا شيء قبل الهجرة v021.
+    """
+    if not _ledger_enabled():
+        return []
+    return reconcile(conn, fix=True, employee_ids=employee_ids, kind=kind, ref=ref, actor_id=actor_id)
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+بحث الموظفين أثناء الكتابة من الذاكرة (GET /api/v1/employees/lookup).
+
+- الموظفون النشطون فقط، بمفاتيح: الاسم المطبَّع (قواعد msd.utils.search: توحيد الألف والتاء
+  المربوطة والألف المقصورة، بلا تشكيل) والرقم الوظيفي و id. لكل نطاق (كل الموظفين، وكل قسم)
+  قائمتان مرتبتان من (مفتاح، id): بدايات الاسم (الاسم كاملاً، الرقم الوظيفي، id) والكلمات
+  الداخلية ("محمد الزهراني" لـ "احمد محمد الزهراني"). البادئة = bisect ثم مشي يتوقف بعد
+  limit معرّفاً مختلفاً، فالكلفة لا تتبع عدد الموظفين.
+- يُبنى عند الإقلاع (init_app) ويُعاد بناؤه عند أول بحث بعد تغيّر ختم "employees"
+  (msd.database.data_versions، v025): المشغّلات ترفعه عند أي كتابة من أي عملية. كتابات هذه
+  العملية تستدعي refresh(ids) بعد commit فيُرقَّع الفهرس بدل إعادة بنائه.
+- الفهرس المنشور لا يُعدَّل أبداً: الترقيع ينسخ القاموس وقوائم النطاقات المتأثرة فقط ثم
+  يستبدل _index تحت _lock، فالبحث الجاري (بلا قفل) يمشي دائماً على قوائم ثابتة.
+- بلا data_versions (قاعدة قبل v025) يُعاد البناء كل FALLBACK_TTL ثانية.
+"""
+import bisect
+import sqlite3
+import threading
+import time
+
+from msd.database import data_versions
+from msd.database.connection import get_conn
+from msd.utils import search
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+FALLBACK_TTL = 60.0
+
+_lock = threading.Lock()
+_index = None
+_STATS = {"builds": 0, "patches": 0, "build_ms": None}
+
+_SELECT = "SELECT id, name, serial_number, department_id FROM employees WHERE status='active'"
+
+
+def _keys(eid, name, serial):
+    names = search.words(name)
+    starts = [" ".join(names)] if names else []
+    serial_words = search.words(serial)
+    if serial_words:
+        starts.append(" ".join(serial_words))
+    starts.append(str(eid))
+    inner = [" ".join(names[i:]) for i in range(1, len(names))]
+    return [(k, eid) for k in starts], [(k, eid) for k in inner]
+
+
+class _Index:
+    def __init__(self, version, rows):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.employees = {}   # id -> (name, serial_number, department_id)
+        self.scopes = {}      # None (الكل) / department_id -> (starts, inner)
+        for eid, name, serial, dept in rows:
+            self.employees[eid] = (name, serial, dept)
+            starts, inner = _keys(eid, name, serial)
+            for scope in {None, dept}:
+                lists = self.scopes.setdefault(scope, ([], []))
+                lists[0].extend(starts)
+                lists[1].extend(inner)
+        for lists in self.scopes.values():
+            lists[0].sort()
+            lists[1].sort()
+        self._owned = set(self.scopes)
+
+    def copy(self, version):
+        """نسخة للترقيع: القاموس منسوخ، والقوائم مشتركة حتى أول تعديل لنطاقها (_writable)."""
+        clone = _Index.__new__(_Index)
+        clone.version = version
+        clone.built_at = self.built_at
+        clone.employees = dict(self.employees)
+        clone.scopes = dict(self.scopes)
+        clone._owned = set()
+        return clone
+
+    def _writable(self, scope):
+        if scope not in self._owned:
+            starts, inner = self.scopes.get(scope, ([], []))
+            self.scopes[scope] = (list(starts), list(inner))
+            self._owned.add(scope)
+        return self.scopes[scope]
+
+    def add(self, eid, name, serial, dept):
+        self.employees[eid] = (name, serial, dept)
+        starts, inner = _keys(eid, name, serial)
+        for scope in {None, dept}:
+            lists = self._writable(scope)
+            for lst, entries in zip(lists, (starts, inner)):
+                for entry in entries:
+                    bisect.insort(lst, entry)
+
+    def remove(self, eid):
+        row = self.employees.pop(eid, None)
+        if row is None:
+            return
+        name, serial, dept = row
+        starts, inner = _keys(eid, name, serial)
+        for scope in {None, dept}:
+            if scope not in self.scopes:
+                continue
+            lists = self._writable(scope)
+            for lst, entries in zip(lists, (starts, inner)):
+                for entry in entries:
+                    i = bisect.bisect_left(lst, entry)
+                    if i < len(lst) and lst[i] == entry:
+                        del lst[i]
+
+    def find(self, prefix, scope, limit):
+        """ids بادئتها prefix: بدايات الأسماء أولاً ثم الكلمات الداخلية، بحد limit."""
+        lists = self.scopes.get(scope)
+        out = []
+        if not lists:
+            return out
+        seen = set()
+        for lst in lists:
+            i = bisect.bisect_left(lst, (prefix,))
+            while i < len(lst) and len(out) < limit:
+                key, eid = lst[i]
+                if not key.startswith(prefix):
+                    break
+                if eid not in seen:
+                    seen.add(eid)
+                    out.append(eid)
+                i += 1
+        return out
+
+
+def build():
+    """يبني الفهرس من قاعدة البيانات (الإصدار يُقرأ قبل الصفوف) ويثبّته."""
+    global _index
+    started = time.perf_counter()
+    with get_conn() as conn:
+        version = data_versions.get("employees", conn)
+        try:
+            rows = conn.execute(_SELECT).fetchall()
+        except sqlite3.OperationalError:
+            # قاعدة جديدة قبل إنشاء employees
+            rows = []
+    index = _Index(version, [tuple(r) for r in rows])
+    with _lock:
+        _index = index
+        _STATS["builds"] += 1
+        _STATS["build_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return index
+
+
+def _current():
+    index = _index
+    version = data_versions.get("employees")
+    if index is not None and index.version == version:
+        if version is not None or time.monotonic() - index.built_at < FALLBACK_TTL:
+            return index
+    return build()
+
+
+def lookup(term, department_id=None, limit=DEFAULT_LIMIT):
+    """
+    الموظفون النشطون الذين يبدأ اسمهم أو إحدى كلماته أو رقمهم الوظيفي أو ID بـ term
+    (بعد التطبيع). department_id: داخل القسم فقط. يعيد حتى limit (<= MAX_LIMIT) عنصراً
+    {"id", "name", "department_id"}؛ [] لـ term فارغ.
+    """
+    prefix = " ".join(search.words(term))
+    if not prefix:
+        return []
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    index = _current()
+    out = []
+    for eid in index.find(prefix, department_id, limit):
+        row = index.employees.get(eid)
+        if row is not None:
+            out.append({"id": eid, "name": row[0], "department_id": row[2]})
+    return out
+
+
+def refresh(ids):
+    """
+    بعد commit لكتابة في هذه العملية: يحدّث الموظفين ids في الفهرس مباشرة إن كانت
+    كتابتهم هي وحدها ما رفع الإصدار؛ غير ذلك (كاتب آخر، معاملة خارجية لم تُثبَّت)
+    يُترك الفهرس ليُعاد بناؤه عند أول بحث.
+    """
+    global _index
+    ids = [int(i) for i in ids if i is not None]
+    if _index is None or not ids:
+        return
+    with get_conn() as conn:
+        if conn.in_transaction:
+            return
+        version = data_versions.get("employees", conn)
+        marks = ",".join("?" * len(ids))
+        rows = {r[0]: (r[1], r[2], r[3])
+                for r in conn.execute(f"{_SELECT} AND id IN ({marks})", ids).fetchall()}
+    with _lock:
+        index = _index
+        if index is None:
+            return
+        changed = [eid for eid in ids if index.employees.get(eid) != rows.get(eid)]
+        if version is not None and (index.version is None
+                                    or version != index.version + len(changed)):
+            return
+        patched = index.copy(version)
+        for eid in changed:
+            patched.remove(eid)
+            if eid in rows:
+                patched.add(eid, *rows[eid])
+        _index = patched
+        _STATS["patches"] += 1
+
+
+def invalidate():
+    global _index
+    with _lock:
+        _index = None
+
+
+def stats():
+    index = _index
+    return {
+        **_STATS,
+        "employees": len(index.employees) if index else None,
+        "version": index.version if index else None,
+    }
+
+
+def init_app(app):
+    with app.app_context():
+        build()
\ No newline at end of file
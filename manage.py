@@ -1,96 +1,288 @@
-import os
-import click
-from msd import create_app
-from msd.vacations.mapping import VACATION_TYPES
-from msd.auth.service import create_user_if_not_exists
-from msd.balances.accrual import run_monthly_accrual
-from msd.balances.reset import reset_emergency_if_needed
-from msd.database.connection import get_conn
-from msd.database.migrations.runner import run_all_migrations
-
-# ضمان تعرّف Flask CLI على التطبيق
-os.environ.setdefault("FLASK_APP", "manage.py")
-
-app = create_app()
-
-@app.cli.command("migrate")
-def migrate():
-    """تشغيل كل الهجرات."""
-    run_all_migrations()
-    click.echo("✅ الهجرات اكتملت.")
-
-@app.cli.command("seed-vacation-types")
-def seed_vacation_types():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS vacation_types (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              code TEXT UNIQUE NOT NULL,
-              name_ar TEXT NOT NULL,
-              fixed_duration INTEGER,
-              max_per_request INTEGER,
-              affects_annual_balance INTEGER DEFAULT 0,
-              affects_emergency_balance INTEGER DEFAULT 0,
-              approval_flow TEXT DEFAULT 'dept_then_manager',
-              requires_relation INTEGER DEFAULT 0
-            )
-        """)
-        for vt in VACATION_TYPES:
-            cur.execute("""
-                INSERT OR IGNORE INTO vacation_types
-                (code, name_ar, fixed_duration, max_per_request,
-                 affects_annual_balance, affects_emergency_balance,
-                 approval_flow, requires_relation)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                vt["code"], vt["name_ar"], vt["fixed_duration"],
-                vt["max_per_request"], vt["affects_annual_balance"],
-                vt["affects_emergency_balance"], vt["approval_flow"],
-                vt["requires_relation"]
-            ))
-        conn.commit()
-    click.echo("✅ تم إدخال أنواع الإجازات.")
-
-@app.cli.command("create-dept-head")
-@click.option("--username", required=True)
-@click.option("--password", required=True)
-@click.option("--department", required=True, type=int)
-@click.option("--telegram", required=False)
-def create_dept_head(username, password, department, telegram):
-    """
-    إنشاء أو تحديث مستخدم رئيس قسم.
-    """
-    from msd.auth.service import create_user_if_not_exists
-    uid = create_user_if_not_exists(
-        username=username,
-        password=password,
-        role="department_head",
-        department_id=department,
-        telegram_chat_id=telegram
-    )
-    click.echo(f"✅ رئيس القسم جاهز id={uid} username={username} department={department}")
-
-def create_manager(username, password):
-    create_user_if_not_exists(username=username, password=password, role="manager")
-    click.echo("✅ تم إنشاء/تحديث المدير.")
-
-@app.cli.command("accrual-run")
-def accrual_run():
-    run_monthly_accrual()
-    click.echo("✅ تم تنفيذ التراكم.")
-
-@app.cli.command("emergency-reset")
-@click.option("--force", is_flag=True, help="تنفيذ رغم عدم حلول أول السنة")
-def emergency_reset(force):
-    reset_emergency_if_needed(force=force)
-    click.echo("✅ فحص/تنفيذ إعادة ضبط الطارئة.")
-
-if __name__ == "__main__":
-    # الآن يمكن:
-    #   python manage.py migrate
-    #   python manage.py seed-vacation-types
-    #   python manage.py create-manager --username admin --password 123456
-    # أو استخدام: flask migrate (بعد set FLASK_APP=manage.py)
-    from flask.cli import main as flask_main
+import os
+import click
+
+# أوامر CLI لا تبدأ خيط المجدول؛ `manage.py scheduler` يشغّله في المقدمة
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+
+from msd import create_app
+from msd.vacations.mapping import VACATION_TYPES
+from msd.auth.service import create_user_if_not_exists
+from msd.balances.accrual import run_monthly_accrual
+from msd.balances.reset import run_due_resets
+from msd.database.connection import get_conn
+from msd.database.migrations.runner import run_all_migrations
+from msd.database.migrations import v026_vacation_types_version
+
+# ضمان تعرّف Flask CLI على التطبيق
+os.environ.setdefault("FLASK_APP", "manage.py")
+
+app = create_app()
+
+@app.cli.command("migrate")
+def migrate():
+    """تشغيل كل الهجرات."""
+    run_all_migrations()
+    click.echo("✅ الهجرات اكتملت.")
+
+@app.cli.command("seed-vacation-types")
+def seed_vacation_types():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS vacation_types (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              code TEXT UNIQUE NOT NULL,
+              name_ar TEXT NOT NULL,
+              fixed_duration INTEGER,
+              max_per_request INTEGER,
+              affects_annual_balance INTEGER DEFAULT 0,
+              affects_emergency_balance INTEGER DEFAULT 0,
+              approval_flow TEXT DEFAULT 'dept_then_manager',
+              requires_relation INTEGER DEFAULT 0
+            )
+        """)
+        for vt in VACATION_TYPES:
+            cur.execute("""
+                INSERT OR IGNORE INTO vacation_types
+                (code, name_ar, fixed_duration, max_per_request,
+                 affects_annual_balance, affects_emergency_balance,
+                 approval_flow, requires_relation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                vt["code"], vt["name_ar"], vt["fixed_duration"],
+                vt["max_per_request"], vt["affects_annual_balance"],
+                vt["affects_emergency_balance"], vt["approval_flow"],
+                vt["requires_relation"]
+            ))
+        # الجدول قد يُنشأ هنا أول مرة: ختم الإصدار (v026) لذاكرة الأنواع
+        v026_vacation_types_version.apply(conn)
+        conn.commit()
+    click.echo("✅ تم إدخال أنواع الإجازات.")
+
+@app.cli.command("create-dept-head")
+@click.option("--username", required=True)
+@click.option("--password", required=True)
+@click.option("--department", required=True, type=int)
+@click.option("--telegram", required=False)
+def create_dept_head(username, password, department, telegram):
+    """
+    إنشاء أو تحديث مستخدم رئيس قسم.
+    """
+    from msd.auth.service import create_user_if_not_exists
+    uid = create_user_if_not_exists(
+        username=username,
+        password=password,
+        role="department_head",
+        department_id=department,
+        telegram_chat_id=telegram
+    )
+    click.echo(f"✅ رئيس القسم جاهز id={uid} username={username} department={department}")
+
+def create_manager(username, password):
+    create_user_if_not_exists(username=username, password=password, role="manager")
+    click.echo("✅ تم إنشاء/تحديث المدير.")
+
+@app.cli.command("accrual-run")
+@click.option("--dry-run", is_flag=True, help="عرض الأشهر والأعداد دون كتابة")
+@click.option("--until", default=None, help="YYYY-MM (افتراضياً الشهر الحالي)")
+@click.option("--policy", "policies", multiple=True, help="رمز سياسة (افتراضياً كل المفعّلة)")
+@click.option("--chunk-size", default=5000, show_default=True, help="موظفون لكل وحدة عمل")
+@click.option("--progress", is_flag=True, help="سطر لكل دفعة")
+def accrual_run(dry_run, until, policies, chunk_size, progress):
+    """التراكم الشهري (سياسات accrual_policies) لكل شهر فائت منذ آخر تشغيل حتى --until."""
+    def report(p):
+        click.echo(f"  {p['policy']} {p['year']}-{p['month']:02d}: "
+                   f"{p['done']}/{p['total']} ({p['chunk_ms']}ms)")
+    try:
+        results = run_monthly_accrual(until=until, dry_run=dry_run, policies=list(policies) or None,
+                                      chunk_size=chunk_size, progress=report if progress else None)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for r in results:
+        extra = f" chunks={r['chunks']} {r['ms']}ms" if "ms" in r else ""
+        click.echo(f"{r['policy']} {r['year']}-{r['month']:02d}: "
+                   f"employees={r['employees']} days={r['days']}{extra}")
+    if not results:
+        click.echo("✅ لا أشهر فائتة.")
+    elif dry_run:
+        click.echo(f"(تجربة) {len(results)} شهراً لم تُطبَّق.")
+    else:
+        click.echo(f"✅ تراكم {len(results)} شهراً.")
+
+@app.cli.command("emergency-reset")
+@click.option("--force", is_flag=True, help="إعادة التنفيذ رغم تسجيله لهذه السنة")
+def emergency_reset(force):
+    """إعادة ضبط الأرصدة الطارئة للسنة الحالية إن لم تُنفَّذ بعد (balance_resets)."""
+    for r in run_due_resets(force=force):
+        click.echo(f"{r['balance']} {r['year']}: employees={r['employees']}")
+    click.echo("✅ فحص/تنفيذ إعادة ضبط الطارئة.")
+
+@app.cli.command("scheduler")
+@click.option("--once", is_flag=True, help="دورة واحدة (المهام المستحقة إن كانت العملية القائدة)")
+@click.option("--status", "show_status", is_flag=True, help="المهام وآخر تشغيلاتها ومدتها")
+@click.option("--run", "run_name", default=None, help="تشغيل مهمة الآن خارج جدولها")
+def scheduler_cmd(once, show_status, run_name):
+    """المجدول الداخلي في المقدمة (بديل خيط الخلفية في التطبيق) حتى Ctrl+C."""
+    from msd.utils import scheduler
+    if show_status:
+        st = scheduler.status()
+        leader = st["leader"]
+        click.echo(f"leader: {leader['owner'] if leader else '-'}")
+        for j in st["jobs"]:
+            last = (f"{j['last_run_at']} {j['last_status']} {j['last_duration_ms']}ms"
+                    if j["last_run_at"] else "-")
+            click.echo(f"{j['name']} [{j['schedule']}] enabled={j['enabled']} "
+                       f"next={j['next_run_at']} last={last}")
+            for r in j["runs"]:
+                click.echo(f"   #{r['id']} {r['trigger']} {r['started_at']} {r['status']} "
+                           f"{r['duration_ms']}ms {r['error'] or ''}")
+        return
+    try:
+        runs = ([scheduler.run_job(run_name)] if run_name
+                else scheduler.tick() if once else None)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if runs is not None:
+        for r in runs:
+            if r is None:
+                click.echo("⏳ المهمة قيد التشغيل في عملية أخرى.")
+                continue
+            click.echo(f"{r['job']}: {r['status']} {r['duration_ms']}ms {r['error'] or ''}")
+        if not runs:
+            click.echo("✅ لا مهام مستحقة (أو عملية أخرى هي القائدة).")
+        return
+    click.echo(f"⏱️ المجدول يعمل ({scheduler.OWNER})؛ Ctrl+C للإيقاف.")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        click.echo("⏹️ أُوقف المجدول.")
+
+@app.cli.command("rebuild-absence-summary")
+def rebuild_absence_summary():
+    """إعادة بناء absence_monthly_summary بالكامل من جدول absences."""
+    from msd.absences import monthly_summary
+    from msd.database import schema_registry
+    from msd.database.connection import transaction
+    with get_conn() as conn, transaction(conn):
+        n = monthly_summary.rebuild(conn, schema_registry.get().abs_range_select)
+    schema_registry.invalidate()
+    click.echo(f"✅ ملخص الغياب الشهري: {n} صفاً.")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """إعادة بناء فهارس البحث النصي (*_fts) بعد تعديل قواعد التطبيع أو الأعمدة المفهرسة."""
+    from msd.utils import search
+    from msd.database import schema_registry
+    from msd.database.connection import transaction
+    with get_conn() as conn, transaction(conn):
+        built = search.rebuild(conn)
+    schema_registry.invalidate()
+    click.echo(f"✅ فهارس البحث: {', '.join(built) or '-'}")
+
+@app.cli.command("reconcile-balances")
+@click.option("--fix", is_flag=True, help="تسجيل حركة 'reconcile' بالفرق (عمود employees هو المرجع)")
+@click.option("--limit", default=20, show_default=True, help="عدد الاختلافات المعروضة")
+def reconcile_balances(fix, limit):
+    """مقارنة مجموع سجل الأرصدة (balance_ledger) بأعمدة الرصيد في employees."""
+    from msd.balances import ledger
+    from msd.database.connection import transaction
+    with get_conn() as conn, transaction(conn):
+        mismatches = ledger.reconcile(conn, fix=fix)
+    for m in mismatches[:limit]:
+        click.echo(f"employee={m['employee_id']} {m['balance']}: column={m['column_value']} "
+                   f"ledger={m['ledger_value']} diff={m['diff']}")
+    if not mismatches:
+        click.echo("✅ السجل مطابق للأرصدة.")
+    elif fix:
+        click.echo(f"✅ سُجّلت {len(mismatches)} حركة تسوية.")
+    else:
+        click.echo(f"❌ {len(mismatches)} اختلافاً (--fix للتسوية).")
+        raise SystemExit(1)
+
+@app.cli.command("snapshot-balances")
+@click.option("--as-of", "as_of", default=None, help="YYYY-MM-DD (افتراضياً آخر يوم في الشهر السابق)")
+def snapshot_balances(as_of):
+    """لقطة أرصدة لكل موظف حتى تاريخ (تشغيل شهري)؛ balance_at يبدأ منها."""
+    from datetime import date, timedelta
+    from msd.balances import ledger
+    from msd.database.connection import transaction
+    as_of = as_of or (date.today().replace(day=1) - timedelta(days=1)).isoformat()
+    with get_conn() as conn, transaction(conn):
+        n = ledger.take_snapshot(conn, as_of)
+    click.echo(f"✅ لقطة {as_of}: {n} رصيداً.")
+
+@app.cli.command("cleanup-export-jobs")
+def cleanup_export_jobs():
+    """حذف ملفات ومهام التصدير الأقدم من EXPORT_JOB_RETENTION_HOURS."""
+    from msd.utils import export_jobs
+    n = export_jobs.cleanup()
+    click.echo(f"✅ حُذفت {n} مهمة تصدير.")
+
+@app.cli.command("check-query-plans")
+@click.option("--verbose", is_flag=True, help="عرض خطة كل استعلام")
+def check_query_plans_cmd(verbose):
+    """EXPLAIN QUERY PLAN لكل استعلامات الخدمات على قاعدة تجريبية؛ يفشل عند أي مسح كامل."""
+    from msd.database.query_plans import check_query_plans, failures
+    results = check_query_plans()
+    if verbose:
+        for r in results:
+            click.echo(f"{r['label']}: {' | '.join(r['plan']) or '-'}")
+    bad = failures(results)
+    for r in bad:
+        reason = r["error"] or f"مسح كامل: {', '.join(r['scans'])}"
+        click.echo(f"❌ {r['label']}: {reason}\n   {r['sql']}", err=True)
+    if bad:
+        raise SystemExit(1)
+    click.echo(f"✅ {len(results)} استعلاماً بلا مسح كامل.")
+
+@app.cli.command("bench-approvals")
+@click.option("--n", default=200, show_default=True, help="عدد الطلبات لكل وضع")
+@click.option("--synchronous", default="FULL", show_default=True,
+              type=click.Choice(["OFF", "NORMAL", "FULL"], case_sensitive=False))
+def bench_approvals_cmd(n, synchronous):
+    """عدد الالتزامات وزمن الموافقة الكاملة: commit لكل جملة مقابل وحدة عمل واحدة."""
+    from msd.scripts.benchmarks import bench_approvals
+    res = bench_approvals(n=n, synchronous=synchronous.upper())
+    for mode in ("legacy", "uow"):
+        r = res[mode]
+        click.echo(f"{mode:7s} commits/approval={r['commits_per_approval']:<5} "
+                   f"deferred={r['deferred_commits_per_approval']:<5} ms/approval={r['ms_per_approval']}")
+
+@app.cli.command("bench-accrual")
+@click.option("--employees", default=100_000, show_default=True)
+@click.option("--months", default=1, show_default=True, help="أشهر فائتة يلحق بها التشغيل")
+@click.option("--chunk-size", default=5000, show_default=True)
+@click.option("--window", default=300, show_default=True, help="نافذة المجدول بالثواني")
+def bench_accrual_cmd(employees, months, chunk_size, window):
+    """محرك التراكم على قاعدة تجريبية: الزمن الكلي وأطول دفعة ومطابقة سجل الأرصدة."""
+    from msd.scripts.benchmarks import bench_accrual
+    res = bench_accrual(employees=employees, months=months, chunk_size=chunk_size,
+                        window_seconds=window)
+    for r in res["runs"]:
+        click.echo(f"{r['policy']:9s} {r['year']}-{r['month']:02d} employees={r['employees']} {r['ms']}ms")
+    click.echo(f"total={res['total_ms']}ms chunks={res['chunks']} p50={res['chunk_p50_ms']}ms "
+               f"max={res['chunk_max_ms']}ms window={res['window_seconds']}s "
+               f"{'✅' if res['within_window'] else '❌'} ledger={'✅' if res['ledger_ok'] else '❌'}")
+
+@app.cli.command("bench-absence-report")
+@click.option("--rows", default=1_000_000, show_default=True, help="عدد سجلات الغياب")
+@click.option("--employees", default=5000, show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="أفضل زمن من عدد مرات")
+def bench_absence_report_cmd(rows, employees, repeat):
+    """تقرير الغياب: التجميع في بايثون / في SQLite / numpy / من الملخص الشهري، مع مطابقة النتائج."""
+    from msd.scripts.benchmarks import bench_absence_report
+    res = bench_absence_report(rows=rows, employees=employees, repeat=repeat)
+    click.echo(f"rows={res['rows']} summary_build={res['summary_build_ms']}ms")
+    for name, r in res["cases"].items():
+        click.echo(f"{name:13s} python={r['python_ms']}ms sql={r['sql_ms']}ms numpy={r['numpy_ms']}ms "
+                   f"default={r['default_ms']}ms "
+                   f"items={r['items']} same={'✅' if r['same_result'] else '❌'}")
+
+if __name__ == "__main__":
+    # الآن يمكن:
+    #   python manage.py migrate
+    #   python manage.py seed-vacation-types
+    #   python manage.py create-manager --username admin --password 123456
+    # أو استخدام: flask migrate (بعد set FLASK_APP=manage.py)
+    from flask.cli import main as flask_main
     flask_main()
\ No newline at end of file
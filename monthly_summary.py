@@ -0,0 +1,97 @@
+"""
+ملخص الغياب الشهري: absence_monthly_summary(employee_id, year, month, type, days)
+
+- يُحدَّث تزايدياً من service_absences داخل نفس وحدة العمل (apply بإشارة +1 / -1).
+- السجل الممتد على أكثر من شهر يُقسَّم: لكل شهر أيامه المتقاطعة معه فقط.
+- late / early_leave = يوم واحد لكل شهر يتقاطع معه السجل (عملياً سجل ليوم واحد).
+- rebuild() يعيد بناءه من absences كاملاً (manage.py rebuild-absence-summary).
+- تقارير الأشهر الكاملة في reporting تقرأ منه مباشرة بدل سجلات الغياب الخام.
+"""
+import calendar
+from datetime import date
+
+TABLE = "absence_monthly_summary"
+
+# نفس reporting.SINGLE_DAY_TYPES (لا نستورد reporting هنا لتجنّب الاستيراد الدائري)
+SINGLE_DAY_TYPES = ("late", "early_leave")
+
+
+def _to_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def month_spans(type_code, start, end):
+    """(year, month, days) لكل شهر يتقاطع معه السجل؛ لا شيء لتاريخ غير صالح أو نهاية قبل البداية."""
+    s, e = _to_date(start), _to_date(end)
+    if s is None or e is None or e < s:
+        return
+    year, month = s.year, s.month
+    while (year, month) <= (e.year, e.month):
+        m_start = date(year, month, 1)
+        m_end = date(year, month, calendar.monthrange(year, month)[1])
+        if type_code in SINGLE_DAY_TYPES:
+            days = 1
+        else:
+            days = (min(e, m_end) - max(s, m_start)).days + 1
+        yield year, month, days
+        month += 1
+        if month == 13:
+            year, month = year + 1, 1
+
+
+def apply(cur, employee_id, type_code, start, end, sign=1):
+    """يضيف (sign=1) أو يطرح (sign=-1) سجل غياب من الملخص؛ يُستدعى داخل transaction()."""
+    rows = [(employee_id, y, m, type_code, sign * d) for y, m, d in month_spans(type_code, start, end)]
+    if not rows:
+        return
+    # INSERT OR IGNORE + UPDATE بدل UPSERT (غير مدعوم قبل SQLite 3.24)
+    cur.executemany(f"""
+        INSERT OR IGNORE INTO {TABLE}(employee_id, year, month, type, days) VALUES (?,?,?,?,0)
+    """, [r[:4] for r in rows])
+    cur.executemany(f"""
+        UPDATE {TABLE} SET days = days + ?
+         WHERE employee_id=? AND year=? AND month=? AND type=?
+    """, [(r[4], *r[:4]) for r in rows])
+    if sign < 0:
+        cur.executemany(f"""
+            DELETE FROM {TABLE}
+             WHERE employee_id=? AND year=? AND month=? AND type=? AND days <= 0
+        """, [r[:4] for r in rows])
+
+
+def create_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE}(
+          employee_id INTEGER NOT NULL,
+          year INTEGER NOT NULL,
+          month INTEGER NOT NULL,
+          type TEXT NOT NULL,
+          days INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (employee_id, year, month, type)
+        )
+    """)
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_absence_summary_period ON {TABLE}(year, month)")
+
+
+def rebuild(conn, range_select="a.start_date, a.end_date"):
+    """
+    يحذف الملخص ويعيد حسابه من absences (قراءة بالمؤشر + executemany).
+    range_select: schema_registry.get().abs_range_select للقواعد القديمة (date فقط).
+    يعيد عدد صفوف الملخص.
+    """
+    totals = {}
+    cur = conn.execute(f"SELECT a.employee_id, a.type, {range_select} FROM absences a")
+    for employee_id, type_code, start, end in cur:
+        for y, m, d in month_spans(type_code, start, end):
+            key = (employee_id, y, m, type_code)
+            totals[key] = totals.get(key, 0) + d
+    cur = conn.cursor()
+    create_table(cur)
+    cur.execute(f"DELETE FROM {TABLE}")
+    cur.executemany(f"""
+        INSERT INTO {TABLE}(employee_id, year, month, type, days) VALUES (?,?,?,?,?)
+    """, [(*k, d) for k, d in totals.items() if d > 0])
+    return len(totals)
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+إشغال الأقسام: عدد الموظفين الغائبين (إجازة أو غياب) في كل يوم من نافذة، لكل قسم.
+
+- استعلام واحد (UNION ALL) يعيد فترات الإجازات المعتمدة (والمعلّقة اختيارياً) وفترات
+  الغياب (type='absence' فقط؛ التأخير والانصراف المبكر لا يعنيان الغياب عن العمل)،
+  مرتبة حسب الموظف ثم البداية.
+- فترات الموظف الواحد المتداخلة تُدمج أولاً كي لا يُحتسب مرتين في اليوم نفسه.
+- كل فترة مُدمجة = +1 عند أول يوم و -1 بعد آخر يوم في مصفوفة فروق القسم،
+  ثم مجموع تراكمي (accumulate) يعطي العدد اليومي: O(الفترات + الأقسام × الأيام).
+"""
+from datetime import date, timedelta
+from itertools import accumulate
+
+from msd.database.connection import get_conn
+from msd.database import schema_registry
+from msd.vacations.overlap import day_ord
+
+APPROVED_STATUSES = ("approved",)
+PENDING_STATUSES = ("pending_dept", "pending_manager")
+
+# سنتان + يوم (نافذة سنة كبيسة كاملة مع هامش)
+MAX_DAYS = 732
+
+
+def _window(start, end):
+    try:
+        s = date.fromisoformat(str(start))
+        e = date.fromisoformat(str(end))
+    except ValueError:
+        raise ValueError("تنسيق تاريخ غير صالح (YYYY-MM-DD)")
+    if e < s:
+        raise ValueError("نهاية الفترة قبل بدايتها")
+    if (e - s).days + 1 > MAX_DAYS:
+        raise ValueError(f"النافذة أطول من {MAX_DAYS} يوماً")
+    return s, e
+
+
+def intervals_sql(win_start, win_end, statuses, department_id=None):
+    """(sql, params): صفوف (department_id, employee_id, s, e) بأرقام الأيام، مرتبة حسب الموظف ثم s."""
+    schema = schema_registry.get()
+    s_col, e_col = f"a.{schema.abs_start_col}", f"a.{schema.abs_end_col}"
+    marks = ", ".join("?" * len(statuses))
+    params = [*statuses, day_ord(win_end), day_ord(win_start),
+              win_end.isoformat(), win_start.isoformat()]
+    dept_filter = ""
+    if department_id:
+        dept_filter = "AND e.department_id = ?"
+        params.append(department_id)
+    sql = f"""
+      SELECT e.department_id, x.employee_id, x.s, x.e
+        FROM (
+          SELECT v.employee_id, v.start_ord AS s, v.end_ord AS e
+            FROM vacation_requests v
+           WHERE v.status IN ({marks}) AND v.start_ord <= ? AND v.end_ord >= ?
+          UNION ALL
+          SELECT a.employee_id,
+                 CAST(julianday(date({s_col})) AS INTEGER),
+                 CAST(julianday(date({e_col})) AS INTEGER)
+            FROM absences a
+           WHERE a.type = 'absence' AND {s_col} <= ? AND {e_col} >= ?
+        ) x
+        JOIN employees e ON e.id = x.employee_id
+       WHERE x.s IS NOT NULL AND x.e IS NOT NULL {dept_filter}
+       ORDER BY x.employee_id, x.s
+    """
+    return sql, params
+
+
+def department_occupancy(start, end, department_id=None, include_pending=False):
+    """
+    {
+      "start", "end", "days": [YYYY-MM-DD ...],
+      "departments": [{"department_id", "name", "headcount", "counts": [...], "peak"}],
+      "totals": [...]
+    }
+    department_id=None: كل الأقسام (بما فيها الموظفون بلا قسم: department_id=null).
+    """
+    win_start, win_end = _window(start, end)
+    ws, we = day_ord(win_start), day_ord(win_end)
+    n = we - ws + 1
+    statuses = APPROVED_STATUSES + (PENDING_STATUSES if include_pending else ())
+
+    sql, params = intervals_sql(win_start, win_end, statuses, department_id)
+
+    diffs = {}
+
+    def flush(dept, s, e):
+        s, e = max(s, ws), min(e, we)
+        if e < s:
+            return
+        d = diffs.get(dept)
+        if d is None:
+            d = diffs[dept] = [0] * (n + 1)
+        d[s - ws] += 1
+        d[e - ws + 1] -= 1
+
+    with get_conn() as conn:
+        cur = conn.execute(sql, params)
+        current = None   # (employee_id, department_id, s, e) الفترة المُدمجة الجارية
+        for dept, emp, s, e in cur:
+            if current and current[0] == emp and s <= current[3] + 1:
+                if e > current[3]:
+                    current = (emp, dept, current[2], e)
+                continue
+            if current:
+                flush(current[1], current[2], current[3])
+            current = (emp, dept, s, e)
+        if current:
+            flush(current[1], current[2], current[3])
+
+        head_sql = """
+          SELECT e.department_id, d.name, COUNT(*) AS headcount
+            FROM employees e
+            LEFT JOIN departments d ON d.id = e.department_id
+        """
+        head_params = []
+        if department_id:
+            head_sql += " WHERE e.department_id = ?"
+            head_params.append(department_id)
+        head_sql += " GROUP BY e.department_id"
+        heads = {r[0]: (r[1], r[2]) for r in conn.execute(head_sql, head_params).fetchall()}
+
+    totals = [0] * n
+    departments = []
+    for dept in sorted(set(heads) | set(diffs), key=lambda k: (k is None, k)):
+        name, headcount = heads.get(dept, (None, 0))
+        d = diffs.get(dept)
+        counts = list(accumulate(d[:n])) if d else [0] * n
+        for i, c in enumerate(counts):
+            totals[i] += c
+        departments.append({
+            "department_id": dept,
+            "name": name,
+            "headcount": headcount,
+            "counts": counts,
+            "peak": max(counts) if counts else 0,
+        })
+
+    return {
+        "start": win_start.isoformat(),
+        "end": win_end.isoformat(),
+        "include_pending": include_pending,
+        "days": [(win_start + timedelta(days=i)).isoformat() for i in range(n)],
+        "departments": departments,
+        "totals": totals,
+    }
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+محرك تداخل الإجازات (مشترك بين service و vacations_api و telegram_bot).
+
+- الفترات شاملة للطرفين: [start, end] تتداخل مع [s, e] إذا start<=e و end>=s.
+- المقارنة على start_ord / end_ord (v018) مع الفهرس (employee_id, start_ord, end_ord).
+- الطلبات الملغاة أو المرفوضة لا تُحتسب.
+- الدوال *_sql تعيد (sql, params) لمن يملك اتصاله الخاص (البوت)،
+  والبقية تنفّذ على conn مُمرَّر.
+"""
+from datetime import date
+
+EXCLUDED_STATUSES = ("cancelled", "rejected_dept", "rejected_manager")
+
+# julianday('0001-01-01') = 1721425.5 ؛ CAST(... AS INTEGER) = date.toordinal() + هذا الفرق
+_JULIAN_OFFSET = 1721424
+
+# 4 معاملات لكل فترة؛ تحت حد SQLITE_MAX_VARIABLE_NUMBER=999 في الإصدارات القديمة
+BATCH_SIZE = 200
+
+_COLUMNS = "v.id, v.type_code, v.start_date, v.end_date, v.status"
+
+
+def day_ord(value) -> int:
+    """'YYYY-MM-DD' (أو date) -> نفس قيمة start_ord/end_ord في القاعدة."""
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return value.toordinal() + _JULIAN_OFFSET
+
+
+def conflicts_sql(employee_id, start, end, exclude_id=None, limit=None):
+    sql = f"""
+        SELECT {_COLUMNS}
+          FROM vacation_requests v
+         WHERE v.employee_id=?
+           AND v.start_ord <= ? AND v.end_ord >= ?
+           AND v.status NOT IN (?, ?, ?)
+    """
+    params = [employee_id, day_ord(end), day_ord(start), *EXCLUDED_STATUSES]
+    if exclude_id:
+        sql += " AND v.id != ?"
+        params.append(exclude_id)
+    sql += " ORDER BY v.id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def find_conflicts(conn, employee_id, start, end, exclude_id=None):
+    sql, params = conflicts_sql(employee_id, start, end, exclude_id)
+    return conn.execute(sql, params).fetchall()
+
+
+def has_conflict(conn, employee_id, start, end, exclude_id=None):
+    sql, params = conflicts_sql(employee_id, start, end, exclude_id, limit=1)
+    return conn.execute(sql, params).fetchone() is not None
+
+
+# ---------- فحص مجموعة فترات باستعلام واحد ----------
+def batch_sql(candidates, offset=0):
+    """
+    candidates: [(employee_id, start, end), ...] (حتى BATCH_SIZE)
+    كل صف ناتج يبدأ بـ k = offset + موضع الفترة في القائمة.
+    """
+    values = ", ".join(["(?, ?, ?, ?)"] * len(candidates))
+    params = []
+    for i, (employee_id, start, end) in enumerate(candidates):
+        params.extend([offset + i, employee_id, day_ord(start), day_ord(end)])
+    params.extend(EXCLUDED_STATUSES)
+    sql = f"""
+        WITH cand(k, employee_id, s, e) AS (VALUES {values})
+        SELECT cand.k, {_COLUMNS}
+          FROM cand
+          JOIN vacation_requests v
+            ON v.employee_id = cand.employee_id
+           AND v.start_ord <= cand.e AND v.end_ord >= cand.s
+         WHERE v.status NOT IN (?, ?, ?)
+         ORDER BY cand.k, v.id DESC
+    """
+    return sql, params
+
+
+def batch_queries(candidates):
+    """(sql, params) لكل دفعة من BATCH_SIZE فترة."""
+    candidates = list(candidates)
+    for offset in range(0, len(candidates), BATCH_SIZE):
+        yield batch_sql(candidates[offset:offset + BATCH_SIZE], offset)
+
+
+def group_batch_rows(rows, count):
+    """صفوف batch_sql -> قائمة بطول count، لكل فترة قائمة الطلبات المتداخلة معها."""
+    out = [[] for _ in range(count)]
+    for row in rows:
+        out[row[0]].append(row)
+    return out
+
+
+def find_conflicts_many(conn, candidates):
+    candidates = list(candidates)
+    rows = []
+    for sql, params in batch_queries(candidates):
+        rows.extend(conn.execute(sql, params).fetchall())
+    return group_batch_rows(rows, len(candidates))
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+ترقيم صفحات قوائم الإجازات والغياب بالمفتاح (المؤشر).
+
+- القوائم مرتبة بـ id تنازلياً. المؤشر هو آخر id في الصفحة السابقة، مرمَّزاً (urlsafe base64)
+  مع بصمة قصيرة للاستعلام وفلاتره، فلا يُعاد استخدام مؤشر مع فلاتر أخرى.
+- الصفحة بمؤشر هي `id < ?` على الفهرس لا LIMIT/OFFSET: كلفة كل صفحة واحدة مهما كان عمقها.
+  تُجلب limit + 1 صفاً؛ الصف الزائد يحدد فقط وجود next_cursor.
+- page/pages (OFFSET) باقية للواجهة الحالية. COUNT(*) على الربط نفسه يُحسب عند الحاجة فقط
+  (وضع الصفحات أو with_total) ويُخزَّن COUNT_TTL ثانية لكل (استعلام، معاملات). كتابات هذه
+  العملية (service و service_absences و vacations_api) تستدعي invalidate() بعد commit؛
+  كتابات العمليات الأخرى قد يتأخر ظهورها في المجموع حتى COUNT_TTL.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+COUNT_TTL = 30.0
+COUNT_CACHE_SIZE = 256
+
+_lock = threading.Lock()
+_counts = OrderedDict()   # (sql, params) -> (stored_at, total)
+
+
+def _key(*parts):
+    raw = json.dumps(parts, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(last_id, key):
+    raw = json.dumps({"id": last_id, "k": key}, separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, key):
+    """آخر id من الصفحة السابقة؛ ValueError لمؤشر تالف أو لاستعلام آخر."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        last_id = int(data["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("مؤشر الصفحة غير صالح")
+    if data.get("k") != key:
+        raise ValueError("مؤشر الصفحة لا يطابق الفلاتر الحالية")
+    return last_id
+
+
+def count(conn, sql, params):
+    """COUNT(*) من الذاكرة إن لم تتجاوز COUNT_TTL ثانية، وإلا يُحسب ويُخزَّن."""
+    key = (sql, tuple(params))
+    now = time.monotonic()
+    with _lock:
+        entry = _counts.get(key)
+        if entry is not None and now - entry[0] <= COUNT_TTL:
+            _counts.move_to_end(key)
+            return entry[1]
+    total = conn.execute(sql, params).fetchone()[0]
+    with _lock:
+        _counts[key] = (now, total)
+        _counts.move_to_end(key)
+        while len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return total
+
+
+def invalidate():
+    with _lock:
+        _counts.clear()
+
+
+def fetch_page(conn, columns, base, clauses, params, id_col, limit,
+               page=1, cursor=None, with_total=None):
+    """
+    صفحة من `SELECT {columns} {base} WHERE clauses ORDER BY {id_col} DESC`
+    (العمود الأول في columns هو id_col). يعيد (rows, meta)؛
+    meta = {"total", "page", "pages", "limit", "next_cursor"}.
+    cursor: الصفحة التالية بالمفتاح بدل OFFSET (page يُتجاهل).
+    with_total: None = العدد في وضع الصفحات فقط؛ بدونه total و pages = None.
+    """
+    key = _key(base, clauses, params)
+    where, where_params = list(clauses), list(params)
+    if cursor:
+        where.append(f"{id_col} < ?")
+        where_params.append(decode_cursor(cursor, key))
+        page, offset = None, 0
+    else:
+        page = max(int(page or 1), 1)
+        offset = (page - 1) * limit
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    rows = conn.execute(f"""
+        SELECT {columns}
+          {base} {where_sql}
+         ORDER BY {id_col} DESC
+         LIMIT ? OFFSET ?
+    """, where_params + [limit + 1, offset]).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    total = pages = None
+    if with_total is None:
+        with_total = cursor is None
+    if with_total:
+        count_where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        total = count(conn, f"SELECT COUNT(*) {base} {count_where}", list(params))
+        pages = (total + limit - 1) // limit if total else 1
+    return rows, {
+        "total": total,
+        "page": page,
+        "pages": pages,
+        "limit": limit,
+        "next_cursor": encode_cursor(rows[-1][0], key) if more else None,
+    }
\ No newline at end of file
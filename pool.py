@@ -0,0 +1,205 @@
+"""
+مجمّع اتصالات SQLite (Connection Pool) محدود الحجم وآمن للخيوط.
+
+- الاتصال يُنشأ مرة واحدة ويُهيّأ (PRAGMA) مرة واحدة ثم يُعاد استخدامه.
+- عند الإرجاع يُعاد ضبطه (rollback لأي معاملة معلّقة + row_factory الافتراضي)
+  لأن بعض المسارات تغيّر row_factory على الاتصال مباشرة.
+- يحتفظ بإحصاءات: hits / misses / waits / timeouts وزمن الحجز (checkout).
+- readonly=True: الاتصال يُفتح بـ URI (mode=ro) مع PRAGMA query_only.
+"""
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class PooledConnection(sqlite3.Connection):
+    """اتصال عادي يدعم weakref لكي يكتشف المجمّع الاتصالات المفقودة (لم تُرجع).
+    factory مخصص (مثل TracingConnection) يجب أن يرث منه."""
+
+    # عمق وحدة العمل (connection.transaction): commit() داخلها يُؤجَّل لنهايتها
+    uow_depth = 0
+
+    def commit(self):
+        if self.uow_depth:
+            return
+        super().commit()
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = 8, timeout: float = 10.0,
+                 cached_statements: int = 512, init_conn=None,
+                 row_factory=sqlite3.Row, readonly: bool = False,
+                 factory=None):
+        self.path = path
+        self.size = max(int(size), 1)
+        self.timeout = float(timeout)
+        self.cached_statements = int(cached_statements)
+        self.row_factory = row_factory
+        self.readonly = readonly
+        self.factory = factory or PooledConnection
+        self.pid = os.getpid()
+        self._init_conn = init_conn
+        # RLock: استدعاء weakref قد يحدث أثناء جمع الذاكرة داخل القفل نفسه
+        self._cond = threading.Condition(threading.RLock())
+        self._idle = []
+        self._created = 0
+        # id(conn) -> (weakref, thread ident, checkout start)
+        self._checked_out = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "timeouts": 0,
+            "discarded": 0,
+            "lost": 0,
+            "checkouts": 0,
+            "checkout_time_ms": 0.0,
+            "checkout_max_ms": 0.0,
+        }
+
+    # ---------- إنشاء / إعادة ضبط ----------
+    def _open(self, target, uri=False):
+        return sqlite3.connect(
+            target,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # ينتقل بين خيوط الطلبات، لكن خيط واحد في كل مرة
+            uri=uri,
+            factory=self.factory
+        )
+
+    def _connect(self):
+        if self.readonly:
+            try:
+                conn = self._open(f"file:{self.path}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                # ملفات WAL (-shm) غير موجودة بعد ولا يمكن إنشاؤها بوضع ro:
+                # نفتح عادياً ونعتمد على query_only لمنع الكتابة
+                conn = self._open(self.path)
+            conn.execute("PRAGMA query_only=1;")
+        else:
+            conn = self._open(self.path)
+        conn.row_factory = self.row_factory
+        if self._init_conn:
+            self._init_conn(conn)
+        return conn
+
+    def _reset(self, conn):
+        conn.uow_depth = 0
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = self.row_factory
+
+    # ---------- حجز / إرجاع ----------
+    def acquire(self):
+        waited_from = None
+        with self._cond:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats["hits"] += 1
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    conn = None
+                    self._stats["misses"] += 1
+                    break
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout("انتهت مهلة انتظار اتصال قاعدة البيانات")
+                self._cond.wait(remaining)
+            if waited_from is not None:
+                self._stats["wait_time_ms"] += (time.monotonic() - waited_from) * 1000
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        key = id(conn)
+        ref = weakref.ref(conn, lambda _r, key=key: self._on_lost(key, _r))
+        with self._cond:
+            self._checked_out[key] = (ref, threading.get_ident(), time.monotonic())
+            self._stats["checkouts"] += 1
+        return conn
+
+    def _on_lost(self, key, ref):
+        # اتصال محجوز جُمع من الذاكرة دون release (teardown لم يُسجّل مثلاً)
+        with self._cond:
+            info = self._checked_out.get(key)
+            if not info or info[0] is not ref:
+                return
+            del self._checked_out[key]
+            self._created -= 1
+            self._stats["lost"] += 1
+            self._cond.notify()
+
+    def release(self, conn):
+        with self._cond:
+            info = self._checked_out.pop(id(conn), None)
+            if info:
+                held_ms = (time.monotonic() - info[2]) * 1000
+                self._stats["checkout_time_ms"] += held_ms
+                self._stats["checkout_max_ms"] = max(self._stats["checkout_max_ms"], held_ms)
+        try:
+            self._reset(conn)
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    # ---------- إحصاءات ----------
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "path": self.path,
+                "readonly": self.readonly,
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": len(self._checked_out),
+                "in_use_threads": sorted({t for _, t, _ in self._checked_out.values()}),
+            })
+        checkouts = out["checkouts"] or 1
+        out["checkout_avg_ms"] = round(out["checkout_time_ms"] / checkouts, 3)
+        out["checkout_time_ms"] = round(out["checkout_time_ms"], 3)
+        out["checkout_max_ms"] = round(out["checkout_max_ms"], 3)
+        out["wait_time_ms"] = round(out["wait_time_ms"], 3)
+        return out
\ No newline at end of file
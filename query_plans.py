@@ -0,0 +1,474 @@
+"""
+فحص خطط الاستعلام (EXPLAIN QUERY PLAN) على قاعدة تجريبية مُعبّأة.
+
+- الجمل الثابتة تُستخرج من مصدر وحدات الخدمة (AST) دون استيرادها.
+- الجمل المبنية ديناميكياً (فلاتر اختيارية) لها صيغ تمثيلية في DYNAMIC_STATEMENTS؛
+  عند تعديل باني استعلام يجب تحديث صيغته هنا.
+- أي SCAN (جدول أو فهرس كامل) على جدول غير صغير في جملة بها WHERE يُعد فشلاً،
+  إلا ما في ALLOWED_SCANS مع سببه.
+
+التشغيل: python manage.py check-query-plans
+"""
+import ast
+import importlib.util
+import os
+import re
+
+from msd.database import fixtures
+from msd.database.migrations.v017_hot_path_indexes import apply_indexes
+from msd.database.migrations import (v018_vacation_day_ordinals, v019_absence_monthly_summary,
+                                     v021_balance_ledger, v024_search_index)
+from msd.vacations import overlap
+
+SOURCE_MODULES = [
+    "msd.vacations.service",
+    "msd.vacations.routes_dept_head",
+    "msd.manager.service_manager",
+    "msd.absences.service_absences",
+    "msd.absences.reporting",
+    "msd.api.vacations_api",
+]
+
+# سكربتات في جذر المشروع (خارج الحزمة)
+SOURCE_SCRIPTS = ["telegram_bot.py"]
+
+SQL_CALLS = {"execute", "executemany", "fetch_one", "fetch_all"}
+SKIP_PREFIXES = ("PRAGMA", "CREATE", "ALTER", "DROP")
+
+# جداول مرجعية صغيرة: المسح الكامل لها مقبول
+SMALL_TABLES = {"vacation_types", "departments", "users", "migration_meta", "sqlite_sequence"}
+
+# مسح كامل معروف ومقبول حالياً (label -> السبب)
+ALLOWED_SCANS = {
+    "absences.reporting._fetch_candidate_records[range]":
+        "تقرير فترة لكل الموظفين: شرط التداخل مداه مفتوح من جهة (start_date<=نهاية الفترة) "
+        "فلا يحدّه فهرس B-tree، والترتيب حسب الموظف يجعل مسح الفهرس أرخص من الفرز.",
+    "absences.reporting._aggregate_sql[range]":
+        "نفس شرط التداخل مفتوح الطرف في تقرير كل الموظفين (التجميع داخل SQLite).",
+    "vacations.occupancy.intervals_sql":
+        "خريطة كل الأقسام تشمل كل الموظفين: مسح الفهرس المغطّي idx_employees_dept "
+        "يقود بحثاً بالفهرس لكل موظف في vacation_requests و absences.",
+    "balances.ledger.apply_bulk[insert]":
+        "تراكم/تصفير جماعي لكل الموظفين النشطين: المسح هو المطلوب (مرة شهرياً/سنوياً).",
+    "balances.ledger._drop_stale_snapshots[bulk]":
+        "بعد حركة جماعية بتاريخ سابق فقط؛ جدول اللقطات مفهرس بالموظف أولاً لخدمة balance_at.",
+    "balances.ledger.take_snapshot":
+        "اللقطة الشهرية تمر على كل موظف/رصيد في السجل (مسح فهرس idx_balance_ledger_emp).",
+    "balances.ledger.reconcile":
+        "فحص المطابقة الكامل يقارن كل الموظفين؛ المجموع لكل موظف بحث بالفهرس.",
+}
+
+# صيغ تمثيلية للاستعلامات المبنية بالفلاتر (label -> sql)
+DYNAMIC_STATEMENTS = {
+    "vacations.service.list_requests[employee_id,status]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          LEFT JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.status=? AND vr.employee_id=?
+         ORDER BY vr.created_at DESC
+    """,
+    "vacations.service.list_requests_paginated[status]": """
+        SELECT COUNT(*) FROM vacation_requests vr
+          LEFT JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.status=?
+    """,
+    "vacations.service.list_requests_paginated[employee_id]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          LEFT JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.employee_id=?
+         ORDER BY vr.id DESC LIMIT ? OFFSET ?
+    """,
+    "vacations.service.list_requests_paginated[status,cursor]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          LEFT JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.status=? AND vr.id < ?
+         ORDER BY vr.id DESC LIMIT ? OFFSET ?
+    """,
+    "vacations.service._update_status": """
+        UPDATE vacation_requests SET status=?, manager_decision_at=?, rejection_reason=? WHERE id=?
+    """,
+    "vacations.routes_dept_head.dept_vacations[status]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          JOIN employees e ON e.id=vr.employee_id
+         WHERE e.department_id=? AND vr.status IN (?,?)
+         ORDER BY vr.id DESC LIMIT 500
+    """,
+    "api.vacations_api.list_vacations[employee_id,status]": """
+        SELECT COUNT(*) FROM vacation_requests vr JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.employee_id=? AND vr.status=?
+    """,
+    "api.vacations_api.list_vacations[status]": """
+        SELECT vr.id, e.name FROM vacation_requests vr JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.status=? ORDER BY vr.id DESC LIMIT ? OFFSET ?
+    """,
+    "api.vacations_api.list_vacations[employee_id,cursor]": """
+        SELECT vr.id, e.name FROM vacation_requests vr JOIN employees e ON e.id=vr.employee_id
+         WHERE vr.employee_id=? AND vr.id < ? ORDER BY vr.id DESC LIMIT ? OFFSET ?
+    """,
+    "api.vacations_api.dept_vacations[department]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          JOIN employees e ON e.id=vr.employee_id
+         WHERE e.department_id=? ORDER BY vr.id DESC LIMIT ?
+    """,
+    "manager.service_manager.list_employees[department_id]": """
+        SELECT e.id, e.name FROM employees e
+         WHERE e.department_id = ? ORDER BY e.name ASC LIMIT ? OFFSET ?
+    """,
+    "manager.service_manager.list_employee_names[department_id]": """
+        SELECT id, name, department_id FROM employees
+         WHERE department_id=? ORDER BY name LIMIT ?
+    """,
+    "manager.service_manager.update_employee": """
+        UPDATE employees SET name=?, department_id=?, updated_at=? WHERE id=?
+    """,
+    "absences.service_absences.list_absences[employee_id,range]": """
+        SELECT COUNT(*) FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE a.employee_id=? AND a.start_date>=? AND a.end_date<=?
+    """,
+    "absences.service_absences.list_absences[employee_id,cursor]": """
+        SELECT a.id, e.name FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE a.employee_id=? AND a.id < ?
+         ORDER BY a.id DESC LIMIT ? OFFSET ?
+    """,
+    "absences.service_absences.list_absences[search]": """
+        SELECT a.id, e.name FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE (a.id IN (SELECT rowid FROM absences_fts WHERE absences_fts MATCH ?)
+                OR a.employee_id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?))
+         ORDER BY a.id DESC LIMIT ? OFFSET ?
+    """,
+    "vacations.service.list_requests_paginated[q]": """
+        SELECT vr.id, e.name FROM vacation_requests vr
+          LEFT JOIN employees e ON e.id=vr.employee_id
+         WHERE (vr.id IN (SELECT rowid FROM vacation_requests_fts WHERE vacation_requests_fts MATCH ?)
+                OR vr.employee_id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?))
+         ORDER BY vr.id DESC LIMIT ? OFFSET ?
+    """,
+    "utils.search.search_employees[department_id]": """
+        SELECT e.id, e.name, e.department_id
+          FROM employees_fts f
+          JOIN employees e ON e.id = f.rowid
+         WHERE employees_fts MATCH ? AND e.department_id=?
+         ORDER BY bm25(employees_fts, 10.0, 2.0), e.name LIMIT ?
+    """,
+    "absences.service_absences.get_absence": """
+        SELECT a.id, e.name FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE a.id=?
+    """,
+    "absences.reporting._fetch_candidate_records[range]": """
+        SELECT a.id, e.name FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE a.start_date <= ? AND a.end_date >= ?
+         ORDER BY a.employee_id, a.type, a.start_date
+    """,
+    "absences.reporting._aggregate_sql[range]": """
+        WITH clipped AS (
+          SELECT a.employee_id, a.type,
+                 CAST(julianday(MIN(a.end_date, ?)) - julianday(MAX(a.start_date, ?)) AS INTEGER) + 1 AS span
+            FROM absences a
+           WHERE a.start_date <= ? AND a.end_date >= ?
+        )
+        SELECT c.employee_id, e.name, c.type, SUM(c.span),
+               SUM(SUM(c.span)) OVER (PARTITION BY c.employee_id), SUM(SUM(c.span)) OVER ()
+          FROM clipped c LEFT JOIN employees e ON e.id = c.employee_id
+         WHERE c.span > 0
+         GROUP BY c.employee_id, c.type
+    """,
+    "absences.reporting._aggregate_sql[range,employee_id]": """
+        WITH clipped AS (
+          SELECT a.employee_id, a.type,
+                 CAST(julianday(MIN(a.end_date, ?)) - julianday(MAX(a.start_date, ?)) AS INTEGER) + 1 AS span
+            FROM absences a
+           WHERE a.start_date <= ? AND a.end_date >= ? AND a.employee_id = ?
+        )
+        SELECT c.employee_id, e.name, c.type, SUM(c.span),
+               SUM(SUM(c.span)) OVER (PARTITION BY c.employee_id), SUM(SUM(c.span)) OVER ()
+          FROM clipped c LEFT JOIN employees e ON e.id = c.employee_id
+         WHERE c.span > 0
+         GROUP BY c.employee_id, c.type
+    """,
+    "absences.reporting._aggregate_numpy[range]": """
+        SELECT employee_id, type, s, e FROM (
+          SELECT a.employee_id, a.type,
+                 CAST(julianday(date(a.start_date)) AS INTEGER) AS s,
+                 CAST(julianday(date(a.end_date)) AS INTEGER) AS e
+            FROM absences a
+           WHERE a.start_date <= ? AND a.end_date >= ?
+        ) WHERE s IS NOT NULL AND e IS NOT NULL
+    """,
+    "absences.reporting._aggregate_numpy[range,employee_id]": """
+        SELECT employee_id, type, s, e FROM (
+          SELECT a.employee_id, a.type,
+                 CAST(julianday(date(a.start_date)) AS INTEGER) AS s,
+                 CAST(julianday(date(a.end_date)) AS INTEGER) AS e
+            FROM absences a
+           WHERE a.start_date <= ? AND a.end_date >= ? AND a.employee_id = ?
+        ) WHERE s IS NOT NULL AND e IS NOT NULL
+    """,
+    "absences.reporting._employee_names": """
+        SELECT id, name FROM employees WHERE id IN (?,?,?)
+    """,
+    "vacations.occupancy.intervals_sql": """
+        SELECT e.department_id, x.employee_id, x.s, x.e
+          FROM (
+            SELECT v.employee_id, v.start_ord AS s, v.end_ord AS e
+              FROM vacation_requests v
+             WHERE v.status IN (?, ?, ?) AND v.start_ord <= ? AND v.end_ord >= ?
+            UNION ALL
+            SELECT a.employee_id,
+                   CAST(julianday(date(a.start_date)) AS INTEGER),
+                   CAST(julianday(date(a.end_date)) AS INTEGER)
+              FROM absences a
+             WHERE a.type = 'absence' AND a.start_date <= ? AND a.end_date >= ?
+          ) x
+          JOIN employees e ON e.id = x.employee_id
+         WHERE x.s IS NOT NULL AND x.e IS NOT NULL
+         ORDER BY x.employee_id, x.s
+    """,
+    "vacations.occupancy.intervals_sql[department_id]": """
+        SELECT e.department_id, x.employee_id, x.s, x.e
+          FROM (
+            SELECT v.employee_id, v.start_ord AS s, v.end_ord AS e
+              FROM vacation_requests v
+             WHERE v.status IN (?) AND v.start_ord <= ? AND v.end_ord >= ?
+            UNION ALL
+            SELECT a.employee_id,
+                   CAST(julianday(date(a.start_date)) AS INTEGER),
+                   CAST(julianday(date(a.end_date)) AS INTEGER)
+              FROM absences a
+             WHERE a.type = 'absence' AND a.start_date <= ? AND a.end_date >= ?
+          ) x
+          JOIN employees e ON e.id = x.employee_id
+         WHERE x.s IS NOT NULL AND x.e IS NOT NULL AND e.department_id = ?
+         ORDER BY x.employee_id, x.s
+    """,
+    "absences.reporting._aggregate_summary[range]": """
+        SELECT s.employee_id, e.name, s.type, SUM(s.days)
+          FROM absence_monthly_summary s LEFT JOIN employees e ON e.id = s.employee_id
+         WHERE s.year BETWEEN ? AND ? AND s.year * 12 + s.month BETWEEN ? AND ?
+         GROUP BY s.employee_id, s.type HAVING SUM(s.days) > 0
+    """,
+    "absences.reporting._aggregate_summary[range,employee_id]": """
+        SELECT s.employee_id, e.name, s.type, SUM(s.days)
+          FROM absence_monthly_summary s LEFT JOIN employees e ON e.id = s.employee_id
+         WHERE s.year BETWEEN ? AND ? AND s.year * 12 + s.month BETWEEN ? AND ?
+           AND s.employee_id = ?
+         GROUP BY s.employee_id, s.type HAVING SUM(s.days) > 0
+    """,
+    "absences.monthly_summary.apply[update]": """
+        UPDATE absence_monthly_summary SET days = days + ?
+         WHERE employee_id=? AND year=? AND month=? AND type=?
+    """,
+    "absences.monthly_summary.apply[delete]": """
+        DELETE FROM absence_monthly_summary
+         WHERE employee_id=? AND year=? AND month=? AND type=? AND days <= 0
+    """,
+    "absences.service_absences.delete_absence[summary]": """
+        SELECT a.employee_id, a.type, a.start_date, a.end_date FROM absences a WHERE a.id=?
+    """,
+    "balances.ledger.post": """
+        INSERT INTO balance_ledger(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+        VALUES (?,?,?,?,?,?,?,?)
+    """,
+    "balances.ledger._drop_stale_snapshots": """
+        DELETE FROM balance_snapshots WHERE balance=? AND as_of >= ? AND employee_id=?
+    """,
+    "balances.ledger._drop_stale_snapshots[bulk]": """
+        DELETE FROM balance_snapshots WHERE balance=? AND as_of >= ?
+    """,
+    "balances.ledger.set_balance": """
+        INSERT INTO balance_ledger(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+        SELECT id, ?, COALESCE(CAST(? AS REAL), 0) - COALESCE(vacation_balance, 0), ?, ?, ?, ?, ?
+          FROM employees WHERE id=? AND COALESCE(vacation_balance, 0) <> COALESCE(CAST(? AS REAL), 0)
+    """,
+    "balances.ledger.apply_bulk[insert]": """
+        INSERT INTO balance_ledger(employee_id, balance, delta, kind, ref, effective_date, actor_id, created_at)
+        SELECT id, ?, d, ?, ?, ?, ?, ?
+          FROM (SELECT id, ? - COALESCE(emergency_vacation_balance, 0) AS d
+                  FROM employees WHERE status = 'active')
+         WHERE d IS NOT NULL AND d <> 0
+    """,
+    "balances.ledger.balance_at[snapshot]": """
+        SELECT as_of, amount FROM balance_snapshots
+         WHERE employee_id=? AND balance=? AND as_of <= ?
+         ORDER BY as_of DESC LIMIT 1
+    """,
+    "balances.ledger.balance_at[tail]": """
+        SELECT COALESCE(SUM(delta), 0) FROM balance_ledger
+         WHERE employee_id=? AND balance=? AND effective_date > ? AND effective_date <= ?
+    """,
+    "balances.ledger.history": """
+        SELECT id, balance, delta, kind, ref, effective_date, actor_id, created_at
+          FROM balance_ledger WHERE employee_id=? AND balance=? ORDER BY id DESC LIMIT ?
+    """,
+    "balances.ledger.take_snapshot": """
+        INSERT OR REPLACE INTO balance_snapshots(employee_id, balance, as_of, amount, created_at)
+        SELECT k.employee_id, k.balance, ?,
+               COALESCE(s.amount, 0) + COALESCE((
+                 SELECT SUM(l.delta) FROM balance_ledger l
+                  WHERE l.employee_id = k.employee_id AND l.balance = k.balance
+                    AND l.effective_date > COALESCE(s.as_of, '') AND l.effective_date <= ?
+               ), 0),
+               ?
+          FROM (SELECT DISTINCT employee_id, balance FROM balance_ledger WHERE effective_date <= ?) k
+          LEFT JOIN balance_snapshots s
+            ON s.employee_id = k.employee_id AND s.balance = k.balance
+           AND s.as_of = (SELECT MAX(s2.as_of) FROM balance_snapshots s2
+                           WHERE s2.employee_id = k.employee_id AND s2.balance = k.balance
+                             AND s2.as_of < ?)
+    """,
+    "balances.ledger.reconcile": """
+        SELECT e.id, CAST(COALESCE(e.vacation_balance, 0) AS REAL) AS actual,
+               (SELECT COALESCE(SUM(l.delta), 0) FROM balance_ledger l
+                 WHERE l.employee_id = e.id AND l.balance = ?) AS total
+          FROM employees e ORDER BY e.id
+    """,
+    "balances.ledger.reconcile[employee_ids]": """
+        SELECT e.id, CAST(COALESCE(e.vacation_balance, 0) AS REAL) AS actual,
+               (SELECT COALESCE(SUM(l.delta), 0) FROM balance_ledger l
+                 WHERE l.employee_id = e.id AND l.balance = ?) AS total
+          FROM employees e WHERE e.id IN (?, ?, ?) ORDER BY e.id
+    """,
+    "absences.reporting._fetch_candidate_records[range,employee_id]": """
+        SELECT a.id, e.name FROM absences a
+          LEFT JOIN employees e ON e.id=a.employee_id
+         WHERE a.start_date <= ? AND a.end_date >= ? AND a.employee_id=?
+         ORDER BY a.employee_id, a.type, a.start_date
+    """,
+}
+
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_ALIAS_RE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.I)
+# أسماء CTE (مثل قائمة الفترات في overlap.batch_sql): مسحها هو قراءة مدخلات الجملة نفسها
+_CTE_RE = re.compile(r"\b(\w+)\s*(?:\([^)]*\))?\s+AS\s*\(\s*(?:VALUES|SELECT)\b", re.I)
+_ALIAS_STOP = {"WHERE", "ON", "LEFT", "JOIN", "INNER", "ORDER", "GROUP", "LIMIT", "SET", "VALUES"}
+
+
+def _project_root():
+    spec = importlib.util.find_spec("msd")
+    return os.path.dirname(os.path.dirname(spec.origin))
+
+
+def _source_files():
+    for name in SOURCE_MODULES:
+        spec = importlib.util.find_spec(name)
+        if spec and spec.origin:
+            yield name, spec.origin
+    root = _project_root()
+    for script in SOURCE_SCRIPTS:
+        path = os.path.join(root, script)
+        if os.path.exists(path):
+            yield script, path
+
+
+def extract_statements(label, path):
+    """كل نص SQL حرفي يُمرَّر مباشرة إلى execute/fetch_* -> [(label, sql)]."""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read(), filename=path)
+    out = []
+
+    def visit(node, func_name):
+        for child in ast.iter_child_nodes(node):
+            name = func_name
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = child.name
+            if isinstance(child, ast.Call) and child.args:
+                f = child.func
+                fname = f.attr if isinstance(f, ast.Attribute) else getattr(f, "id", None)
+                arg = child.args[0]
+                if fname in SQL_CALLS and isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    out.append((f"{label}.{name}:{child.lineno}", arg.value))
+            visit(child, name)
+
+    visit(tree, "<module>")
+    return out
+
+
+def _overlap_statements():
+    """جمل محرك التداخل كما يبنيها (msd.vacations.overlap)."""
+    day = "2024-01-01"
+    return [
+        ("vacations.overlap.conflicts_sql", overlap.conflicts_sql(1, day, day)[0]),
+        ("vacations.overlap.conflicts_sql[exclude_id,limit]",
+         overlap.conflicts_sql(1, day, day, exclude_id=1, limit=1)[0]),
+        ("vacations.overlap.batch_sql", overlap.batch_sql([(1, day, day), (2, day, day)])[0]),
+    ]
+
+
+def collect_statements():
+    stmts = []
+    for label, path in _source_files():
+        stmts.extend(extract_statements(label, path))
+    stmts.extend(DYNAMIC_STATEMENTS.items())
+    stmts.extend(_overlap_statements())
+    return [(lbl, sql) for lbl, sql in stmts
+            if not sql.strip().upper().startswith(SKIP_PREFIXES)]
+
+
+def _aliases(sql):
+    out = {}
+    for table, alias in _ALIAS_RE.findall(sql):
+        out[table] = table
+        if alias and alias.upper() not in _ALIAS_STOP:
+            out[alias] = table
+    return out
+
+
+def explain(conn, sql):
+    params = [None] * sql.count("?")
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [r[3] for r in rows]
+
+
+def full_scans(sql, plan):
+    """الجداول (غير الصغيرة) التي تُقرأ بمسح كامل في جملة لها شرط WHERE."""
+    if not re.search(r"\bWHERE\b", sql, re.I):
+        return []
+    aliases = _aliases(sql)
+    ctes = set(_CTE_RE.findall(sql))
+    scans = []
+    for detail in plan:
+        m = _SCAN_RE.match(detail)
+        # "SCAN t USING [COVERING] INDEX i" بلا قيود = قراءة الفهرس كاملاً
+        # "SCAN CONSTANT ROW" / "SCAN 2 CONSTANT ROWS" = قائمة VALUES
+        # "SCAN f VIRTUAL TABLE INDEX n:M" = بحث FTS5 (الجدول الافتراضي يطبّق MATCH بنفسه)
+        if (not m or m.group(1) == "CONSTANT" or m.group(1).isdigit() or m.group(1) in ctes
+                or "VIRTUAL TABLE INDEX" in detail):
+            continue
+        table = aliases.get(m.group(1), m.group(1))
+        if table not in SMALL_TABLES:
+            scans.append(table)
+    return scans
+
+
+def check_query_plans(conn=None):
+    """
+    يعيد قائمة نتائج: {label, sql, plan, scans, error}.
+    conn=None: تُنشأ قاعدة تجريبية في الذاكرة (مخطط + بيانات + فهارس v017 + أعمدة v018 + ملخص v019
+    + سجل الأرصدة v021 + فهارس البحث v024).
+    """
+    if conn is None:
+        conn = fixtures.scratch_db(analyze=False)
+        apply_indexes(conn)
+        v018_vacation_day_ordinals.apply(conn)
+        v019_absence_monthly_summary.apply(conn)
+        v021_balance_ledger.apply(conn)
+        v024_search_index.apply(conn)
+        conn.execute("ANALYZE")
+    results = []
+    for label, sql in collect_statements():
+        item = {"label": label, "sql": " ".join(sql.split()), "plan": [], "scans": [], "error": None}
+        try:
+            item["plan"] = explain(conn, sql)
+            if label not in ALLOWED_SCANS:
+                item["scans"] = full_scans(sql, item["plan"])
+        except Exception as e:
+            item["error"] = str(e)
+        results.append(item)
+    return results
+
+
+def failures(results):
+    return [r for r in results if r["scans"] or r["error"]]
\ No newline at end of file
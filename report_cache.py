@@ -0,0 +1,116 @@
+"""
+ذاكرة تقارير الغياب (داخل العملية).
+
+- المفتاح = المعاملات المُطبَّعة: (بداية النافذة، نهايتها، الموظف) بعد _report_window،
+  فتقرير شهر 2025-03 ونطاق 2025-03-01..2025-03-31 يتشاركان المدخل نفسه.
+- LRU بحد REPORT_CACHE_SIZE مدخلاً + صلاحية REPORT_CACHE_TTL ثانية.
+- عدّاد جيل يرفعه service_absences بعد كل كتابة ناجحة (ويفرغ الذاكرة)؛ الحساب الذي بدأ
+  قبل الكتابة وانتهى بعدها لا يُخزَّن.
+- الكتابات من عملية أخرى (عامل آخر / سكربت) لا ترفع جيل هذه العملية: TTL هو حدّ التقادم.
+- الإحصاءات (hits / misses / ...) في /api/v1/admin/db/stats تحت "report_cache".
+- يحمل أيضاً محرك التجميع الافتراضي لـ reporting (الإعداد REPORT_ENGINE: sql أو numpy).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("sql", "numpy")
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # key -> (stored_at, value)
+
+_settings = {
+    "enabled": True,
+    "max_entries": 64,
+    "ttl": 60.0,
+    "engine": "sql",
+}
+
+_generation = 0
+_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "expired": 0,
+    "evicted": 0,
+}
+
+
+def generation():
+    return _generation
+
+
+def invalidate():
+    """يُستدعى بعد أي تغيير على absences؛ كل المدخلات الحالية تصبح قديمة."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+
+def get(key):
+    if not _settings["enabled"]:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _STATS["misses"] += 1
+            return None
+        stored_at, value = entry
+        if now - stored_at > _settings["ttl"]:
+            del _entries[key]
+            _STATS["expired"] += 1
+            _STATS["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _STATS["hits"] += 1
+        return value
+
+
+def put(key, value, gen):
+    """gen: الجيل عند بدء الحساب؛ إن تغيّر أثناءه فالنتيجة قد تكون قديمة ولا تُخزَّن."""
+    if not _settings["enabled"]:
+        return
+    with _lock:
+        if gen != _generation:
+            return
+        _entries[key] = (time.monotonic(), value)
+        _entries.move_to_end(key)
+        while len(_entries) > _settings["max_entries"]:
+            _entries.popitem(last=False)
+            _STATS["evicted"] += 1
+
+
+def stats():
+    with _lock:
+        out = dict(_STATS)
+        out["entries"] = len(_entries)
+        out["generation"] = _generation
+    out.update(_settings)
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 3) if lookups else None
+    return out
+
+
+def engine():
+    """محرك التجميع الافتراضي لتقارير الغياب (sql / numpy)."""
+    return _settings["engine"]
+
+
+def init_app(app):
+    name = str(app.config.get("REPORT_ENGINE", _settings["engine"]) or "sql").strip().lower()
+    if name not in ENGINES:
+        raise ValueError(f"REPORT_ENGINE غير مدعوم: {name!r} (المتاح: {', '.join(ENGINES)})")
+    if name == "numpy":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            logger.warning("REPORT_ENGINE=numpy لكن numpy غير مثبت؛ ستُحسب التقارير في SQL")
+    _settings["engine"] = name
+    _settings["max_entries"] = int(app.config.get("REPORT_CACHE_SIZE", _settings["max_entries"]))
+    _settings["ttl"] = float(app.config.get("REPORT_CACHE_TTL", _settings["ttl"]))
+    _settings["enabled"] = _settings["max_entries"] > 0 and _settings["ttl"] > 0
+    invalidate()
\ No newline at end of file
@@ -1,225 +1,452 @@
-from datetime import date, datetime, timedelta
-from typing import Optional, List, Dict, Tuple
-from io import BytesIO
-from msd.database.connection import get_conn
-
-try:
-    import openpyxl
-    from openpyxl.styles import Alignment, Font
-except ImportError:
-    openpyxl = None  # سنتحقق لاحقاً
-
-# ---------------- Lazy Meta ----------------
-# لا نحمل الأعمدة عند الاستيراد لتفادي الحاجة إلى Flask context
-_META = {
-    "cols": None,
-    "has_range": False,
-    "has_date": False,
-    "loaded": False
-}
-
-TYPE_LABELS = {
-    "absence": "غياب",
-    "late": "تأخير",
-    "early_leave": "انصراف مبكر"
-}
-
-def _ensure_meta():
-    if _META["loaded"]:
-        return
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(absences)")
-        cols = {r[1] for r in cur.fetchall()}
-    _META["cols"] = cols
-    _META["has_range"] = "start_date" in cols and "end_date" in cols
-    _META["has_date"] = "date" in cols
-    _META["loaded"] = True
-
-def _parse_date(s: str) -> date:
-    return datetime.strptime(s, "%Y-%m-%d").date()
-
-def _overlap_days(rec_start: date, rec_end: date, win_start: date, win_end: date) -> int:
-    start = max(rec_start, win_start)
-    end = min(rec_end, win_end)
-    if end < start:
-        return 0
-    return (end - start).days + 1
-
-def _fetch_candidate_records(win_start: date, win_end: date,
-                             employee_id: Optional[int] = None) -> List[Dict]:
-    _ensure_meta()
-    where = []
-    params = []
-    if _META["has_range"]:
-        where.append("NOT (end_date < ? OR start_date > ?)")
-        params.extend([win_start.isoformat(), win_end.isoformat()])
-    else:
-        where.append("NOT (date < ? OR date > ?)")
-        params.extend([win_start.isoformat(), win_end.isoformat()])
-
-    if employee_id:
-        where.append("a.employee_id=?")
-        params.append(employee_id)
-
-    where_sql = "WHERE " + " AND ".join(where) if where else ""
-    range_select = "a.start_date, a.end_date" if _META["has_range"] else "a.date AS start_date, a.date AS end_date"
-
-    sql = f"""
-      SELECT a.id, a.employee_id, e.name AS employee_name,
-             a.type, {range_select}, a.duration, a.notes
-        FROM absences a
-        LEFT JOIN employees e ON e.id=a.employee_id
-        {where_sql}
-      ORDER BY a.employee_id, a.type, a.start_date
-    """
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
-
-def generate_report(report_type: str,
-                    year: Optional[int] = None,
-                    month: Optional[int] = None,
-                    start_date: Optional[str] = None,
-                    end_date: Optional[str] = None,
-                    employee_id: Optional[int] = None) -> Dict:
-    """
-    أنواع التقرير:
-      - month  (يستلزم year, month)
-      - range  (start_date, end_date)
-      - employee (employee_id) مع نطاق اختياري
-    """
-    if report_type == "month":
-        if not (year and month):
-            raise ValueError("يجب تحديد السنة والشهر")
-        win_start = date(year, month, 1)
-        if month == 12:
-            win_end = date(year+1, 1, 1) - timedelta(days=1)
-        else:
-            win_end = date(year, month+1, 1) - timedelta(days=1)
-    elif report_type == "range":
-        if not (start_date and end_date):
-            raise ValueError("يجب تحديد تاريخي البداية والنهاية")
-        win_start = _parse_date(start_date)
-        win_end = _parse_date(end_date)
-        if win_end < win_start:
-            raise ValueError("نهاية الفترة قبل بدايتها")
-    elif report_type == "employee":
-        if not employee_id:
-            raise ValueError("يجب تحديد الموظف للتقرير الخاص")
-        if start_date and end_date:
-            win_start = _parse_date(start_date)
-            win_end = _parse_date(end_date)
-            if win_end < win_start:
-                raise ValueError("نهاية الفترة قبل بدايتها")
-        else:
-            win_start = date(2000,1,1)
-            win_end = date(2100,1,1)
-    else:
-        raise ValueError("نوع تقرير غير مدعوم")
-
-    candidates = _fetch_candidate_records(win_start, win_end,
-                                          employee_id if report_type=="employee" else None)
-
-    aggregated = {}
-    per_employee_total = {}
-    grand_total = 0
-
-    for rec in candidates:
-        try:
-            r_start = _parse_date(rec['start_date'])
-            r_end = _parse_date(rec['end_date'])
-        except Exception:
-            continue
-        overlap = _overlap_days(r_start, r_end, win_start, win_end)
-        if overlap <= 0:
-            continue
-        if rec['type'] in ("late", "early_leave"):
-            overlap = 1
-
-        key = (rec['employee_id'], rec['type'])
-        if key not in aggregated:
-            aggregated[key] = {
-                "employee_id": rec['employee_id'],
-                "employee_name": rec.get('employee_name') or f"#{rec['employee_id']}",
-                "type": rec['type'],
-                "type_label": TYPE_LABELS.get(rec['type'], rec['type']),
-                "days": 0
-            }
-        aggregated[key]["days"] += overlap
-        per_employee_total.setdefault(rec['employee_id'], 0)
-        per_employee_total[rec['employee_id']] += overlap
-        grand_total += overlap
-
-    rows = list(aggregated.values())
-    rows.sort(key=lambda r: (r["employee_name"], r["type"]))
-
-    return {
-        "params": {
-            "report_type": report_type,
-            "year": year,
-            "month": month,
-            "start_date": win_start.isoformat(),
-            "end_date": win_end.isoformat(),
-            "employee_id": employee_id
-        },
-        "items": rows,
-        "totals": {
-            "grand_total_days": grand_total,
-            "per_employee": per_employee_total
-        }
-    }
-
-def export_report_to_excel(report_data: Dict) -> Tuple[bytes, str, str]:
-    if openpyxl is None:
-        raise RuntimeError("مكتبة openpyxl غير مثبتة (pip install openpyxl)")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Report"
-
-    params = report_data.get("params", {})
-    items = report_data.get("items", [])
-    totals = report_data.get("totals", {})
-
-    title = f"تقرير الغياب - نوع: {params.get('report_type')}"
-    ws.merge_cells("A1:C1")
-    ws["A1"] = title
-    ws["A1"].font = Font(bold=True, size=14)
-    ws["A1"].alignment = Alignment(horizontal="center")
-
-    ws.append(["النطاق", f"{params.get('start_date')} → {params.get('end_date')}"])
-    ws.append(["عدد الصفوف المجمعة", len(items)])
-    ws.append([])
-
-    ws.append(["الموظف","النوع","الأيام"])
-    ws.row_dimensions[ws.max_row].font = Font(bold=True)
-
-    for r in items:
-        ws.append([
-            r["employee_name"],
-            r["type_label"],
-            r["days"]
-        ])
-
-    ws.append([])
-    ws.append(["الإجمالي الكلي للأيام", totals.get("grand_total_days", 0)])
-
-    if totals.get("per_employee"):
-        ws.append([])
-        ws.append(["إجمالي لكل موظف (ID, Days)"])
-        ws.row_dimensions[ws.max_row].font = Font(bold=True)
-        for emp_id, d in totals["per_employee"].items():
-            ws.append([emp_id, d])
-
-    for col in ("A","B","C","D","E"):
-        if ws.column_dimensions.get(col):
-            ws.column_dimensions[col].width = 28
-
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-    filename = f"absences_report_{params.get('report_type')}.xlsx"
+import logging
+import sqlite3
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Tuple
+from io import BytesIO
+from msd.database.connection import get_conn
+from msd.database import schema_registry
+from msd.absences import report_cache
+
+try:
+    import openpyxl
+    from openpyxl.styles import Alignment, Font
+except ImportError:
+    openpyxl = None  # سنتحقق لاحقاً
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # محرك "numpy" يرجع إلى "sql"
+
+logger = logging.getLogger(__name__)
+
+# "sql": التجميع داخل SQLite (julianday + GROUP BY + دوال النافذة)
+# "python": المسار الأصلي (صفاً صفاً) – يُستخدم احتياطياً ولمقارنة النتائج
+# "numpy": أرقام الأيام في مصفوفات + قص وتجميع متجه (bincount) – يتطلب numpy
+# "summary": من absence_monthly_summary (v019) – يُختار تلقائياً للنوافذ المكوّنة من أشهر كاملة
+# المحرك الافتراضي من الإعداد REPORT_ENGINE (report_cache.init_app)
+USE_MONTHLY_SUMMARY = True
+
+# أنواع تُحتسب يوماً واحداً مهما كانت الفترة
+SINGLE_DAY_TYPES = ("late", "early_leave")
+
+TYPE_LABELS = {
+    "absence": "غياب",
+    "late": "تأخير",
+    "early_leave": "انصراف مبكر"
+}
+
+def _parse_date(s: str) -> date:
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+def _overlap_days(rec_start: date, rec_end: date, win_start: date, win_end: date) -> int:
+    start = max(rec_start, win_start)
+    end = min(rec_end, win_end)
+    if end < start:
+        return 0
+    return (end - start).days + 1
+
+def _fetch_candidate_records(win_start: date, win_end: date,
+                             employee_id: Optional[int] = None) -> List[Dict]:
+    # الأعمدة من سجل المخطط (يُحمَّل داخل سياق التطبيق لا عند الاستيراد)
+    schema = schema_registry.get()
+    where = []
+    params = []
+    if schema.abs_has_range:
+        # صيغة التداخل المكافئة: start_date<=نهاية الفترة AND end_date>=بدايتها (تستخدم الفهرس)
+        where.append("a.start_date <= ? AND a.end_date >= ?")
+        params.extend([win_end.isoformat(), win_start.isoformat()])
+    else:
+        where.append("a.date BETWEEN ? AND ?")
+        params.extend([win_start.isoformat(), win_end.isoformat()])
+
+    if employee_id:
+        where.append("a.employee_id=?")
+        params.append(employee_id)
+
+    where_sql = "WHERE " + " AND ".join(where) if where else ""
+    range_select = schema.abs_range_select
+
+    sql = f"""
+      SELECT a.id, a.employee_id, e.name AS employee_name,
+             a.type, {range_select}, a.duration, a.notes
+        FROM absences a
+        LEFT JOIN employees e ON e.id=a.employee_id
+        {where_sql}
+      ORDER BY a.employee_id, a.type, a.{schema.abs_start_col}
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        return [dict(r) for r in rows]
+
+def _aggregate_python(win_start: date, win_end: date,
+                      employee_id: Optional[int] = None) -> Tuple[List[Dict], Dict, int]:
+    candidates = _fetch_candidate_records(win_start, win_end, employee_id)
+
+    aggregated = {}
+    per_employee_total = {}
+    grand_total = 0
+
+    for rec in candidates:
+        try:
+            r_start = _parse_date(rec['start_date'])
+            r_end = _parse_date(rec['end_date'])
+        except Exception:
+            continue
+        overlap = _overlap_days(r_start, r_end, win_start, win_end)
+        if overlap <= 0:
+            continue
+        if rec['type'] in SINGLE_DAY_TYPES:
+            overlap = 1
+
+        key = (rec['employee_id'], rec['type'])
+        if key not in aggregated:
+            aggregated[key] = {
+                "employee_id": rec['employee_id'],
+                "employee_name": rec.get('employee_name') or f"#{rec['employee_id']}",
+                "type": rec['type'],
+                "type_label": TYPE_LABELS.get(rec['type'], rec['type']),
+                "days": 0
+            }
+        aggregated[key]["days"] += overlap
+        per_employee_total.setdefault(rec['employee_id'], 0)
+        per_employee_total[rec['employee_id']] += overlap
+        grand_total += overlap
+
+    rows = list(aggregated.values())
+    rows.sort(key=lambda r: (r["employee_name"], r["type"]))
+    return rows, per_employee_total, grand_total
+
+def _aggregate_sql(win_start: date, win_end: date,
+                   employee_id: Optional[int] = None) -> Tuple[List[Dict], Dict, int]:
+    """
+    نفس نتيجة _aggregate_python لكن التقليم (MAX/MIN + julianday) والتجميع
+    والإجماليات (SUM ... OVER) داخل SQLite؛ لا يصل إلى بايثون إلا صف لكل (موظف، نوع).
+    """
+    schema = schema_registry.get()
+    s_col, e_col = f"a.{schema.abs_start_col}", f"a.{schema.abs_end_col}"
+    ws, we = win_start.isoformat(), win_end.isoformat()
+    params = [we, ws, we, ws]
+    emp_filter = ""
+    if employee_id:
+        emp_filter = "AND a.employee_id = ?"
+        params.append(employee_id)
+    single = ", ".join(f"'{t}'" for t in SINGLE_DAY_TYPES)
+    days_expr = f"CASE WHEN c.type IN ({single}) THEN 1 ELSE c.span END"
+    sql = f"""
+      WITH clipped AS (
+        SELECT a.employee_id, a.type,
+               CAST(julianday(MIN({e_col}, ?)) - julianday(MAX({s_col}, ?)) AS INTEGER) + 1 AS span
+          FROM absences a
+         WHERE {s_col} <= ? AND {e_col} >= ? {emp_filter}
+      )
+      SELECT c.employee_id,
+             COALESCE(e.name, '#' || c.employee_id) AS employee_name,
+             c.type,
+             SUM({days_expr}) AS days,
+             SUM(SUM({days_expr})) OVER (PARTITION BY c.employee_id) AS employee_total,
+             SUM(SUM({days_expr})) OVER () AS grand_total
+        FROM clipped c
+        LEFT JOIN employees e ON e.id = c.employee_id
+       WHERE c.span > 0
+       GROUP BY c.employee_id, c.type
+       ORDER BY employee_name, c.type, c.employee_id
+    """
+    with get_conn() as conn:
+        result = conn.execute(sql, params).fetchall()
+    rows = []
+    per_employee = {}
+    grand_total = 0
+    for r in result:
+        rows.append({
+            "employee_id": r["employee_id"],
+            "employee_name": r["employee_name"],
+            "type": r["type"],
+            "type_label": TYPE_LABELS.get(r["type"], r["type"]),
+            "days": r["days"]
+        })
+        per_employee[r["employee_id"]] = r["employee_total"]
+        grand_total = r["grand_total"]
+    per_employee_total = {k: per_employee[k] for k in sorted(per_employee)}
+    return rows, per_employee_total, grand_total
+
+def _employee_names(conn, ids) -> Dict[int, str]:
+    names = {}
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        for r in conn.execute(f"SELECT id, name FROM employees WHERE id IN ({marks})", chunk):
+            names[r[0]] = r[1]
+    return names
+
+def _aggregate_numpy(win_start: date, win_end: date,
+                     employee_id: Optional[int] = None) -> Tuple[List[Dict], Dict, int]:
+    """
+    نفس نتيجة _aggregate_sql: SQLite يعيد (الموظف، النوع، رقم يوم البداية، رقم يوم النهاية) فقط،
+    ثم القص على النافذة (maximum/minimum) والتجميع لكل (موظف، نوع) بـ bincount على مصفوفات.
+    """
+    schema = schema_registry.get()
+    s_col, e_col = f"a.{schema.abs_start_col}", f"a.{schema.abs_end_col}"
+    params = [win_end.isoformat(), win_start.isoformat()]
+    emp_filter = ""
+    if employee_id:
+        emp_filter = "AND a.employee_id = ?"
+        params.append(employee_id)
+    sql = f"""
+      SELECT employee_id, type, s, e FROM (
+        SELECT a.employee_id, a.type,
+               CAST(julianday(date({s_col})) AS INTEGER) AS s,
+               CAST(julianday(date({e_col})) AS INTEGER) AS e
+          FROM absences a
+         WHERE {s_col} <= ? AND {e_col} >= ? {emp_filter}
+      ) WHERE s IS NOT NULL AND e IS NOT NULL
+    """
+    with get_conn() as conn:
+        records = conn.execute(sql, params).fetchall()
+        if not records:
+            return [], {}, 0
+        emp_col, type_col, start_col, end_col = zip(*records)
+        emp = np.array(emp_col, dtype=np.int64)
+        start = np.array(start_col, dtype=np.int64)
+        end = np.array(end_col, dtype=np.int64)
+        type_codes = {}
+        typ = np.array([type_codes.setdefault(t, len(type_codes)) for t in type_col], dtype=np.int64)
+        types = list(type_codes)
+
+        # date.toordinal() + 1721424 = CAST(julianday(date) AS INTEGER)
+        ws = win_start.toordinal() + 1721424
+        we = win_end.toordinal() + 1721424
+        span = np.minimum(end, we) - np.maximum(start, ws) + 1
+        # التداخل يُفحص قبل تثبيت اليوم الواحد (كما في sql/python): سجل late بنهاية قبل بدايته لا يُعد
+        keep = span > 0
+        single = np.array([t in SINGLE_DAY_TYPES for t in types])[typ]
+        span = np.where(single & keep, 1, span)
+        emp, typ, span = emp[keep], typ[keep], span[keep]
+
+        emp_ids, emp_idx = np.unique(emp, return_inverse=True)
+        cells = emp_idx * len(types) + typ
+        size = len(emp_ids) * len(types)
+        counts = np.bincount(cells, minlength=size)
+        days = np.zeros(size, dtype=np.int64)
+        np.add.at(days, cells, span)
+        per_emp = np.bincount(emp_idx, weights=span, minlength=len(emp_ids)).astype(np.int64)
+
+        emp_list = emp_ids.tolist()
+        names = _employee_names(conn, emp_list)
+
+    rows = []
+    for cell in np.flatnonzero(counts).tolist():
+        eid = emp_list[cell // len(types)]
+        t = types[cell % len(types)]
+        rows.append({
+            "employee_id": eid,
+            "employee_name": names[eid] if names.get(eid) is not None else f"#{eid}",
+            "type": t,
+            "type_label": TYPE_LABELS.get(t, t),
+            "days": int(days[cell])
+        })
+    rows.sort(key=lambda r: (r["employee_name"], r["type"], r["employee_id"]))
+    per_employee_total = dict(zip(emp_list, per_emp.tolist()))
+    return rows, per_employee_total, int(per_emp.sum())
+
+def _whole_months(win_start: date, win_end: date) -> bool:
+    return (win_start.day == 1
+            and win_end.day == calendar.monthrange(win_end.year, win_end.month)[1])
+
+def _aggregate_summary(win_start: date, win_end: date,
+                       employee_id: Optional[int] = None) -> Tuple[List[Dict], Dict, int]:
+    """
+    نفس نتيجة _aggregate_sql لنافذة من أشهر كاملة، من absence_monthly_summary:
+    صف لكل (موظف، شهر، نوع) بدل سجلات الغياب الخام.
+    """
+    where = ["s.year BETWEEN ? AND ?", "s.year * 12 + s.month BETWEEN ? AND ?"]
+    params = [win_start.year, win_end.year,
+              win_start.year * 12 + win_start.month, win_end.year * 12 + win_end.month]
+    if employee_id:
+        where.append("s.employee_id = ?")
+        params.append(employee_id)
+    sql = f"""
+      SELECT s.employee_id,
+             COALESCE(e.name, '#' || s.employee_id) AS employee_name,
+             s.type,
+             SUM(s.days) AS days
+        FROM absence_monthly_summary s
+        LEFT JOIN employees e ON e.id = s.employee_id
+       WHERE {" AND ".join(where)}
+       GROUP BY s.employee_id, s.type
+      HAVING SUM(s.days) > 0
+       ORDER BY employee_name, s.type, s.employee_id
+    """
+    with get_conn() as conn:
+        result = conn.execute(sql, params).fetchall()
+    rows = []
+    per_employee = {}
+    for r in result:
+        rows.append({
+            "employee_id": r["employee_id"],
+            "employee_name": r["employee_name"],
+            "type": r["type"],
+            "type_label": TYPE_LABELS.get(r["type"], r["type"]),
+            "days": r["days"]
+        })
+        per_employee[r["employee_id"]] = per_employee.get(r["employee_id"], 0) + r["days"]
+    per_employee_total = {k: per_employee[k] for k in sorted(per_employee)}
+    return rows, per_employee_total, sum(per_employee.values())
+
+def _report_window(report_type, year, month, start_date, end_date, employee_id) -> Tuple[date, date]:
+    if report_type == "month":
+        if not (year and month):
+            raise ValueError("يجب تحديد السنة والشهر")
+        win_start = date(year, month, 1)
+        if month == 12:
+            win_end = date(year+1, 1, 1) - timedelta(days=1)
+        else:
+            win_end = date(year, month+1, 1) - timedelta(days=1)
+    elif report_type == "range":
+        if not (start_date and end_date):
+            raise ValueError("يجب تحديد تاريخي البداية والنهاية")
+        win_start = _parse_date(start_date)
+        win_end = _parse_date(end_date)
+        if win_end < win_start:
+            raise ValueError("نهاية الفترة قبل بدايتها")
+    elif report_type == "employee":
+        if not employee_id:
+            raise ValueError("يجب تحديد الموظف للتقرير الخاص")
+        if start_date and end_date:
+            win_start = _parse_date(start_date)
+            win_end = _parse_date(end_date)
+            if win_end < win_start:
+                raise ValueError("نهاية الفترة قبل بدايتها")
+        else:
+            win_start = date(2000,1,1)
+            win_end = date(2100,1,1)
+    else:
+        raise ValueError("نوع تقرير غير مدعوم")
+    return win_start, win_end
+
+def generate_report(report_type: str,
+                    year: Optional[int] = None,
+                    month: Optional[int] = None,
+                    start_date: Optional[str] = None,
+                    end_date: Optional[str] = None,
+                    employee_id: Optional[int] = None,
+                    engine: Optional[str] = None) -> Dict:
+    """
+    أنواع التقرير:
+      - month  (يستلزم year, month)
+      - range  (start_date, end_date)
+      - employee (employee_id) مع نطاق اختياري
+    engine: "summary" | "numpy" | "sql" | "python"
+            (الافتراضي: summary لنافذة أشهر كاملة إن وُجد الملخص، وإلا الإعداد REPORT_ENGINE)
+    بدون engine صريح تُقرأ النتيجة من report_cache إن وُجدت (العرض ثم التصدير بنفس المعاملات).
+    """
+    win_start, win_end = _report_window(report_type, year, month, start_date, end_date, employee_id)
+    emp_filter = employee_id if report_type == "employee" else None
+
+    if engine is None:
+        key = (win_start, win_end, emp_filter)
+        result = report_cache.get(key)
+        if result is None:
+            gen = report_cache.generation()
+            result = _aggregate(win_start, win_end, emp_filter)
+            report_cache.put(key, result, gen)
+    else:
+        result = _aggregate(win_start, win_end, emp_filter, engine)
+    rows, per_employee_total, grand_total = result
+
+    return {
+        "params": {
+            "report_type": report_type,
+            "year": year,
+            "month": month,
+            "start_date": win_start.isoformat(),
+            "end_date": win_end.isoformat(),
+            "employee_id": employee_id
+        },
+        # نسخ: المدخل المخزَّن لا يتأثر بتعديل المستدعي
+        "items": [dict(r) for r in rows],
+        "totals": {
+            "grand_total_days": grand_total,
+            "per_employee": dict(per_employee_total)
+        }
+    }
+
+def _aggregate(win_start: date, win_end: date, emp_filter: Optional[int],
+               engine: Optional[str] = None) -> Tuple[List[Dict], Dict, int]:
+    if engine in (None, "summary"):
+        if (USE_MONTHLY_SUMMARY and schema_registry.get().abs_summary
+                and _whole_months(win_start, win_end)):
+            engine = "summary"
+        else:
+            engine = report_cache.engine()
+    if engine == "summary":
+        rows, per_employee_total, grand_total = _aggregate_summary(win_start, win_end, emp_filter)
+    elif engine == "numpy" and np is not None:
+        rows, per_employee_total, grand_total = _aggregate_numpy(win_start, win_end, emp_filter)
+    elif engine in ("sql", "numpy"):
+        # numpy غير مثبت -> sql
+        try:
+            rows, per_employee_total, grand_total = _aggregate_sql(win_start, win_end, emp_filter)
+        except sqlite3.OperationalError as e:
+            # SQLite < 3.25 (بدون دوال النافذة)
+            logger.warning("تجميع التقرير في SQL غير متاح (%s)، استخدام مسار بايثون", e)
+            rows, per_employee_total, grand_total = _aggregate_python(win_start, win_end, emp_filter)
+    else:
+        rows, per_employee_total, grand_total = _aggregate_python(win_start, win_end, emp_filter)
+    return rows, per_employee_total, grand_total
+
+def export_report_to_excel(report_data: Dict) -> Tuple[bytes, str, str]:
+    if openpyxl is None:
+        raise RuntimeError("مكتبة openpyxl غير مثبتة (pip install openpyxl)")
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Report"
+
+    params = report_data.get("params", {})
+    items = report_data.get("items", [])
+    totals = report_data.get("totals", {})
+
+    title = f"تقرير الغياب - نوع: {params.get('report_type')}"
+    ws.merge_cells("A1:C1")
+    ws["A1"] = title
+    ws["A1"].font = Font(bold=True, size=14)
+    ws["A1"].alignment = Alignment(horizontal="center")
+
+    ws.append(["النطاق", f"{params.get('start_date')} → {params.get('end_date')}"])
+    ws.append(["عدد الصفوف المجمعة", len(items)])
+    ws.append([])
+
+    ws.append(["الموظف","النوع","الأيام"])
+    ws.row_dimensions[ws.max_row].font = Font(bold=True)
+
+    for r in items:
+        ws.append([
+            r["employee_name"],
+            r["type_label"],
+            r["days"]
+        ])
+
+    ws.append([])
+    ws.append(["الإجمالي الكلي للأيام", totals.get("grand_total_days", 0)])
+
+    if totals.get("per_employee"):
+        ws.append([])
+        ws.append(["إجمالي لكل موظف (ID, Days)"])
+        ws.row_dimensions[ws.max_row].font = Font(bold=True)
+        for emp_id, d in totals["per_employee"].items():
+            ws.append([emp_id, d])
+
+    for col in ("A","B","C","D","E"):
+        if ws.column_dimensions.get(col):
+            ws.column_dimensions[col].width = 28
+
+    bio = BytesIO()
+    wb.save(bio)
+    bio.seek(0)
+    filename = f"absences_report_{params.get('report_type')}.xlsx"
     return bio.getvalue(), filename, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
\ No newline at end of file
@@ -1,11 +1,53 @@
-from datetime import date
-from msd.database.connection import get_conn
-
-def reset_emergency_if_needed(force=False):
-    today = date.today()
-    if not force and not (today.month == 1 and today.day == 1):
-        return
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE employees SET emergency_balance = 12")
-        conn.commit()
\ No newline at end of file
+"""
+إعادة ضبط الأرصدة الطارئة السنوية (التنفيذ الوحيد؛ msd.vacations.emergency_reset_service يستدعيه).
+
+- RESETS: العمود -> شرط الموظفين؛ emergency_balance للجميع و emergency_vacation_balance
+  للنشطين فقط (قاعدتا التنفيذين السابقين)، كلاهما إلى RESET_VALUE يوماً عبر سجل الأرصدة.
+- كل (عمود، سنة) يُنفَّذ مرة واحدة (balance_resets، v023): الشرط "لم تُنفَّذ هذه السنة بعد"
+  لا "اليوم 1 يناير"، فالمجدول المتأخر أو التشغيل اليدوي يلحق بها.
+"""
+from datetime import date, datetime
+
+from msd.database.connection import get_conn, transaction
+from msd.balances import ledger
+
+RESET_VALUE = 12
+
+RESETS = {
+    "emergency_balance": "1=1",
+    "emergency_vacation_balance": "status = 'active'",
+}
+
+
+def run_due_resets(year=None, force=False, columns=None):
+    """
+    يعيد ضبط كل عمود في RESETS (أو columns) لم يُعَد ضبطه للسنة year (افتراضياً الحالية).
+    force: إعادة التنفيذ رغم تسجيله. يعيد [{"balance", "year", "employees"}] لما نُفِّذ.
+    """
+    today = date.today()
+    year = int(year or today.year)
+    if year > today.year:
+        raise ValueError("لا إعادة ضبط لسنة لم تبدأ بعد")
+    results = []
+    with get_conn() as conn:
+        present = set(ledger.tracked_columns())
+        for column, where in RESETS.items():
+            if column not in present or (columns and column not in columns):
+                continue
+            with transaction(conn):
+                done = conn.execute("SELECT 1 FROM balance_resets WHERE balance=? AND year=?",
+                                    (column, year)).fetchone()
+                if done and not force:
+                    continue
+                n = ledger.apply_bulk(conn, column, "reset", value=RESET_VALUE, where=where,
+                                      ref=f"reset:{year}", effective=date(year, 1, 1))
+                conn.execute("""
+                    INSERT OR REPLACE INTO balance_resets(balance, year, employees, reset_at)
+                    VALUES (?,?,?,?)
+                """, (column, year, n, datetime.utcnow().isoformat(timespec="seconds")))
+            results.append({"balance": column, "year": year, "employees": n})
+    return results
+
+
+def reset_emergency_if_needed(force=False):
+    return run_due_resets(force=force)
\ No newline at end of file
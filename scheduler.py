@@ -0,0 +1,387 @@
+"""
+مجدول دوري داخل العملية: التراكم الشهري وإعادة الضبط السنوية والتنظيف تُشغَّل من التطبيق
+نفسه بلا cron.
+
+- المهام تُسجَّل بالاسم (@scheduler.job("monthly_accrual", "monthly 1 00:30"))؛ صفها في
+  scheduler_jobs (الترحيل v023) يحمل الجدول والتذبذب والتفعيل و next_run_at، فتبقى الخطة
+  بعد إعادة التشغيل ويمكن تعديلها من القاعدة.
+- صيغ الجدول: "every <ثوانٍ>"، "daily HH:MM"، "monthly <يوم> HH:MM"، "yearly MM-DD HH:MM"
+  (بالتوقيت المحلي).
+- قفل القائد: كل عامل يدور، لكن حامل صف scheduler_leases وحده يشغّل المهام. العقد ينتهي بعد
+  SCHEDULER_LEASE_SECONDS ويُجدَّد في كل دورة، ومن خيط نبض كل ثلث المدة ما دامت مهام الدورة
+  تعمل (المهام متزامنة وقد تطول عن مدة العقد). إن فُقد العقد رغم ذلك لا تبدأ مهام أخرى في
+  الدورة. كل تشغيل يحجز صف مهمته أيضاً، فلا تعمل المهمة مرتين معاً حتى عند انتقال القيادة.
+- اللحاق: المهمة التي فات next_run_at (العملية متوقفة وقتها) تعمل مرة في الدورة التالية؛
+  المهام متساوية الأثر وتلحق بنفسها (التراكم يملأ كل شهر فائت، وإعادة الضبط كل سنة فائتة).
+  المهمة الجديدة مستحقة فوراً.
+- التذبذب: يضاف 0..jitter_seconds عشوائياً إلى كل موعد محسوب.
+- السجل: scheduler_runs يحفظ الحالة والمدة والنتيجة لكل تشغيل مدة SCHEDULER_HISTORY_DAYS؛
+  `manage.py scheduler --status` يعرضه.
+"""
+import calendar
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from msd.database.connection import get_conn, transaction
+from msd.database.migrations import v023_scheduler
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+LEASE = "scheduler"
+
+# الاسم -> (الدالة، الجدول، ثواني التذبذب)
+JOBS = {}
+
+_settings = {
+    "enabled": True,
+    "tick": 30.0,
+    "lease": 90.0,
+    "job_timeout": 6 * 3600.0,
+    "retry": 900.0,
+    "history_days": 90,
+}
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+_app = None
+
+
+def job(name, schedule, jitter=0):
+    def decorator(fn):
+        parse_schedule(schedule)
+        JOBS[name] = (fn, schedule, int(jitter))
+        return fn
+    return decorator
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def _iso(dt):
+    return dt.isoformat(timespec="seconds")
+
+
+def _clock(value):
+    h, m = (int(p) for p in value.split(":"))
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError
+    return h, m
+
+
+def parse_schedule(schedule):
+    """(kind, args) أو ValueError لجدول غير صالح."""
+    try:
+        kind, *args = schedule.split()
+        if kind == "every" and len(args) == 1 and int(args[0]) > 0:
+            return kind, (int(args[0]),)
+        if kind == "daily" and len(args) == 1:
+            return kind, _clock(args[0])
+        if kind == "monthly" and len(args) == 2 and 1 <= int(args[0]) <= 31:
+            return kind, (int(args[0]), *_clock(args[1]))
+        if kind == "yearly" and len(args) == 2:
+            month, day = (int(p) for p in args[0].split("-"))
+            date(2000, month, day)
+            return kind, (month, day, *_clock(args[1]))
+    except ValueError:
+        pass
+    raise ValueError(f"جدول زمني غير صالح: {schedule!r}")
+
+
+def next_fire(schedule, after):
+    """أول موعد للجدول بعد after (datetime محلي) دون تذبذب."""
+    kind, args = parse_schedule(schedule)
+    if kind == "every":
+        return after + timedelta(seconds=args[0])
+    if kind == "daily":
+        at = after.replace(hour=args[0], minute=args[1], second=0, microsecond=0)
+        return at if at > after else at + timedelta(days=1)
+    if kind == "monthly":
+        day, h, m = args
+        year, month = after.year, after.month
+        while True:
+            at = datetime(year, month, min(day, calendar.monthrange(year, month)[1]), h, m)
+            if at > after:
+                return at
+            year, month = year + (month == 12), month % 12 + 1
+    month, day, h, m = args
+    for year in range(after.year, after.year + 9):
+        try:
+            at = datetime(year, month, day, h, m)
+        except ValueError:   # 29 فبراير في سنة غير كبيسة
+            continue
+        if at > after:
+            return at
+
+
+def _next_run(schedule, jitter, after):
+    at = next_fire(schedule, after)
+    if jitter:
+        at += timedelta(seconds=random.randint(0, jitter))
+    return at
+
+
+def sync_jobs(conn, now=None):
+    """يضيف صفوف المهام المسجّلة غير الموجودة (مستحقة فوراً)؛ الصفوف الموجودة لا تتغير."""
+    now = now or _now()
+    conn.executemany("""
+        INSERT OR IGNORE INTO scheduler_jobs(name, schedule, jitter_seconds, next_run_at)
+        VALUES (?,?,?,?)
+    """, [(name, schedule, jitter, _iso(now)) for name, (_, schedule, jitter) in JOBS.items()])
+
+
+def acquire_lease(conn, owner=OWNER, now=None):
+    """True إن كانت هذه العملية القائدة (تجديد عقدها أو أخذ عقد منتهٍ)."""
+    now = now or time.time()
+    expires = now + _settings["lease"]
+    with transaction(conn):
+        conn.execute("""
+            INSERT OR IGNORE INTO scheduler_leases(name, owner, acquired_at, expires_at)
+            VALUES (?,?,?,?)
+        """, (LEASE, owner, now, expires))
+        cur = conn.execute("""
+            UPDATE scheduler_leases
+               SET acquired_at = CASE WHEN owner = ? THEN acquired_at ELSE ? END,
+                   owner = ?, expires_at = ?
+             WHERE name = ? AND (owner = ? OR expires_at < ?)
+        """, (owner, now, owner, expires, LEASE, owner, now))
+        return cur.rowcount == 1
+
+
+def release_lease(conn, owner=OWNER):
+    with transaction(conn):
+        conn.execute("DELETE FROM scheduler_leases WHERE name=? AND owner=?", (LEASE, owner))
+
+
+def _claim(conn, name, now, due_only):
+    stale = _iso(now - timedelta(seconds=_settings["job_timeout"]))
+    sql = """
+        UPDATE scheduler_jobs SET claimed_by=?, claimed_at=?
+         WHERE name=? AND (claimed_by IS NULL OR claimed_at < ?)
+    """
+    params = [OWNER, _iso(now), name, stale]
+    if due_only:
+        sql += " AND enabled=1 AND next_run_at <= ?"
+        params.append(_iso(now))
+    with transaction(conn):
+        if conn.execute(sql, params).rowcount != 1:
+            return None
+        return conn.execute("SELECT schedule, jitter_seconds, next_run_at FROM scheduler_jobs WHERE name=?",
+                            (name,)).fetchone()
+
+
+def run_job(name, scheduled=False, now=None):
+    """
+    يشغّل المهمة الآن (scheduled: فقط إن كانت مستحقة، ثم يُحسب موعدها القادم).
+    يعيد صف التشغيل dict، أو None إن كانت محجوزة لتشغيل آخر/غير مستحقة.
+    """
+    if name not in JOBS:
+        raise ValueError(f"مهمة غير معروفة: {name}")
+    fn = JOBS[name][0]
+    now = now or _now()
+    with get_conn() as conn:
+        row = _claim(conn, name, now, due_only=scheduled)
+        if row is None:
+            return None
+        schedule, jitter, scheduled_for = row
+        with transaction(conn):
+            run_id = conn.execute("""
+                INSERT INTO scheduler_runs(job, trigger, scheduled_for, owner, status, started_at)
+                VALUES (?,?,?,?,?,?)
+            """, (name, "schedule" if scheduled else "manual", scheduled_for if scheduled else None,
+                  OWNER, RUNNING, _iso(_now()))).lastrowid
+    started = time.perf_counter()
+    result = error = None
+    try:
+        result = fn()
+        status = DONE
+    except Exception as e:
+        logger.exception("فشل مهمة المجدول %s", name)
+        status, error = FAILED, str(e)
+    duration = round((time.perf_counter() - started) * 1000, 1)
+    finished = _now()
+    with get_conn() as conn, transaction(conn):
+        conn.execute("""
+            UPDATE scheduler_runs SET status=?, finished_at=?, duration_ms=?, result=?, error=? WHERE id=?
+        """, (status, _iso(finished), duration,
+              json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+              error, run_id))
+        fields = {"claimed_by": None, "claimed_at": None, "last_run_at": _iso(finished),
+                  "last_status": status, "last_duration_ms": duration}
+        if scheduled:
+            following = _next_run(schedule, jitter, finished)
+            if status == FAILED:
+                following = min(following, finished + timedelta(seconds=_settings["retry"]))
+            fields["next_run_at"] = _iso(following)
+        cols = ", ".join(f"{k}=?" for k in fields)
+        conn.execute(f"UPDATE scheduler_jobs SET {cols} WHERE name=?", (*fields.values(), name))
+        conn.execute("DELETE FROM scheduler_runs WHERE job=? AND started_at < ?",
+                     (name, _iso(finished - timedelta(days=_settings["history_days"]))))
+    logger.info("مهمة المجدول %s: %s (%sms)", name, status, duration)
+    return {"id": run_id, "job": name, "status": status, "duration_ms": duration,
+            "result": result, "error": error}
+
+
+def _heartbeat(app, done, lost):
+    """يجدّد عقد القائد كل ثلث مدته حتى done؛ يضبط lost إن أخذته عملية أخرى."""
+    while not done.wait(_settings["lease"] / 3):
+        with app.app_context():
+            try:
+                with get_conn() as conn:
+                    if not acquire_lease(conn):
+                        lost.set()
+                        return
+            except Exception:
+                # القاعدة مشغولة بكتابة المهمة: المحاولة التالية بعد ثلث المدة
+                logger.exception("فشل تجديد قفل المجدول")
+
+
+def tick(now=None):
+    """دورة واحدة: إن كانت هذه العملية القائدة تُشغَّل المهام المستحقة. يعيد التشغيلات."""
+    now = now or _now()
+    with get_conn() as conn:
+        if not acquire_lease(conn):
+            return []
+        due = [r[0] for r in conn.execute("""
+            SELECT name FROM scheduler_jobs WHERE enabled=1 AND next_run_at <= ? ORDER BY next_run_at
+        """, (_iso(now),)).fetchall()]
+    runs = []
+    if not due:
+        return runs
+    done, lost = threading.Event(), threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(current_app._get_current_object(), done, lost),
+                            name="scheduler-lease", daemon=True)
+    beat.start()
+    try:
+        for name in due:
+            if lost.is_set():
+                logger.warning("فُقد قفل المجدول أثناء الدورة؛ تأجيل المهام المتبقية")
+                break
+            if name not in JOBS:
+                logger.warning("مهمة مجدولة غير مسجّلة في الكود: %s", name)
+                continue
+            run = run_job(name, scheduled=True, now=now)
+            if run:
+                runs.append(run)
+    finally:
+        done.set()
+        beat.join()
+    return runs
+
+
+def status(limit=5):
+    """المهام مع آخر limit تشغيلات لكل منها، وحامل قفل القائد."""
+    with get_conn() as conn:
+        jobs = [dict(r) for r in conn.execute("""
+            SELECT name, schedule, jitter_seconds, enabled, next_run_at, claimed_by,
+                   last_run_at, last_status, last_duration_ms
+              FROM scheduler_jobs ORDER BY name
+        """).fetchall()]
+        for j in jobs:
+            j["runs"] = [dict(r) for r in conn.execute("""
+                SELECT id, trigger, scheduled_for, status, started_at, duration_ms, error
+                  FROM scheduler_runs WHERE job=? ORDER BY started_at DESC, id DESC LIMIT ?
+            """, (j["name"], limit)).fetchall()]
+        lease = conn.execute("SELECT owner, acquired_at, expires_at FROM scheduler_leases WHERE name=?",
+                             (LEASE,)).fetchone()
+    return {"jobs": jobs, "leader": dict(lease) if lease else None, "owner": OWNER}
+
+
+def run_forever(stop=None):
+    """حلقة المجدول (خيط الخلفية أو `manage.py scheduler`) حتى stop.set()."""
+    stop = stop or _stop
+    try:
+        # تأخير أولي عشوائي كي لا تتسابق العمّال عند الإقلاع
+        stop.wait(random.uniform(0, min(_settings["tick"], 5.0)))
+        while not stop.is_set():
+            with _app.app_context():
+                try:
+                    tick()
+                except Exception:
+                    logger.exception("فشل دورة المجدول")
+            stop.wait(_settings["tick"])
+    finally:
+        with _app.app_context():
+            try:
+                with get_conn() as conn:
+                    release_lease(conn)
+            except Exception:
+                logger.exception("فشل تحرير قفل المجدول")
+
+
+def start():
+    """يبدأ خيط المجدول في هذه العملية (مرة واحدة)."""
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stop.clear()
+        _thread = threading.Thread(target=run_forever, name="scheduler", daemon=True)
+        _thread.start()
+
+
+def stop(timeout=None):
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+
+
+@job("monthly_accrual", "monthly 1 00:30", jitter=600)
+def _monthly_accrual():
+    from msd.balances import accrual
+    return accrual.run_monthly_accrual()
+
+
+@job("emergency_reset", "yearly 01-01 00:10", jitter=600)
+def _emergency_reset():
+    from msd.balances import reset
+    return reset.run_due_resets()
+
+
+@job("balance_snapshot", "monthly 1 02:00", jitter=600)
+def _balance_snapshot():
+    from msd.balances import ledger
+    as_of = date.today().replace(day=1) - timedelta(days=1)
+    with get_conn() as conn, transaction(conn):
+        return {"as_of": as_of.isoformat(), "snapshots": ledger.take_snapshot(conn, as_of)}
+
+
+@job("export_cleanup", "every 3600", jitter=300)
+def _export_cleanup():
+    from msd.utils import export_jobs
+    return {"deleted": export_jobs.cleanup()}
+
+
+def init_app(app):
+    global _app
+    _app = app
+    cfg = app.config
+    _settings["enabled"] = bool(cfg.get("SCHEDULER_ENABLED", _settings["enabled"]))
+    _settings["tick"] = float(cfg.get("SCHEDULER_TICK_SECONDS", _settings["tick"]))
+    _settings["lease"] = float(cfg.get("SCHEDULER_LEASE_SECONDS", _settings["lease"]))
+    _settings["job_timeout"] = float(cfg.get("SCHEDULER_JOB_TIMEOUT", _settings["job_timeout"]))
+    _settings["retry"] = float(cfg.get("SCHEDULER_RETRY_SECONDS", _settings["retry"]))
+    _settings["history_days"] = int(cfg.get("SCHEDULER_HISTORY_DAYS", _settings["history_days"]))
+    with app.app_context():
+        with get_conn() as conn:
+            v023_scheduler.apply(conn)
+            sync_jobs(conn)
+            conn.commit()
+    if _settings["enabled"]:
+        start()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+سجل المخطط: أعمدة الجداول التي تختلف بين القواعد القديمة والمُهاجَرة
+(employees / absences / vacation_requests)
+ووجود الجداول المُضافة لاحقاً (absence_monthly_summary / balance_ledger / فهارس البحث *_fts)
+ومقاطع SQL المبنية عليها.
+
+- يُحمَّل مرة واحدة عند بدء التطبيق (init_app) أو عند أول get() داخل سياق التطبيق.
+- يُبطَل من runner.run_all_migrations؛ العمليات الأخرى (عامل آخر) تلتقط التغيير عند إعادة التشغيل.
+- المسارات الساخنة تستخدم get() فقط ولا تنفّذ PRAGMA table_info.
+"""
+import threading
+
+from msd.database.connection import get_conn
+
+TRACKED_TABLES = ("employees", "absences", "vacation_requests", "absence_monthly_summary",
+                  "balance_ledger", "employees_fts", "vacation_requests_fts", "absences_fts")
+
+_lock = threading.Lock()
+_current = None
+
+
+def _coalesce(cols, prefix="", default="0"):
+    parts = [prefix + c for c in cols]
+    if default is not None:
+        parts.append(default)
+    if len(parts) == 1:
+        return parts[0]
+    return f"COALESCE({', '.join(parts)})"
+
+
+class SchemaInfo:
+    def __init__(self, columns):
+        self.columns = columns
+        emp = columns.get("employees", frozenset())
+        absn = columns.get("absences", frozenset())
+
+        # ---- absences: date القديم أو start_date/end_date ----
+        self.abs_has_range = "start_date" in absn and "end_date" in absn
+        self.abs_has_date = "date" in absn
+        if self.abs_has_range:
+            self.abs_range_select = "a.start_date, a.end_date"
+            self.abs_start_col = "start_date"
+            self.abs_end_col = "end_date"
+        else:
+            self.abs_range_select = "a.date AS start_date, a.date AS end_date"
+            self.abs_start_col = self.abs_end_col = "date"
+        # ملخص الغياب الشهري (v019)؛ غيابه = التقارير من absences والكتابات لا تحدّثه
+        self.abs_summary = "days" in columns.get("absence_monthly_summary", frozenset())
+        # سجل الأرصدة (v021)؛ غيابه = msd.balances.ledger يحدّث الأعمدة دون تسجيل الحركات
+        self.balance_ledger = "delta" in columns.get("balance_ledger", frozenset())
+        # فهارس البحث (v024): الجداول التي لها {table}_fts؛ غيرها يُبحث فيه بـ LIKE
+        self.search_fts = frozenset(t[:-4] for t in ("employees_fts", "vacation_requests_fts",
+                                                     "absences_fts") if columns.get(t))
+
+        # ---- employees: emergency_vacation_balance أو emergency_balance ----
+        emergency = [c for c in ("emergency_vacation_balance", "emergency_balance") if c in emp]
+        self.emp_emergency_col = emergency[0] if emergency else None
+        self.emp_emergency_expr = _coalesce(emergency)
+        self.e_emp_emergency_expr = _coalesce(emergency, "e.")
+        titles = [c for c in ("job_title", "job_grade") if c in emp]
+        self.e_emp_job_title_expr = _coalesce(titles, "e.", None) if titles else "NULL"
+
+    def has(self, table, column):
+        return column in self.columns.get(table, ())
+
+
+def load(conn=None):
+    """يقرأ الأعمدة (PRAGMA مرة لكل جدول) ويثبّت SchemaInfo جديداً."""
+    global _current
+    if conn is None:
+        with get_conn() as c:
+            return load(c)
+    columns = {}
+    for table in TRACKED_TABLES:
+        columns[table] = frozenset(r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall())
+    info = SchemaInfo(columns)
+    with _lock:
+        _current = info
+    return info
+
+
+def get():
+    info = _current
+    if info is None:
+        with _lock:
+            info = _current
+        if info is None:
+            info = load()
+    return info
+
+
+def invalidate():
+    global _current
+    with _lock:
+        _current = None
+
+
+def init_app(app):
+    with app.app_context():
+        load()
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+بحث نصي يراعي العربية في الموظفين وطلبات الإجازات والغياب (SQLite FTS5، الترحيل v024).
+
+- التطبيع يوحّد الصيغ التي يخلطها المستخدمون عند الكتابة: صور الألف (أ إ آ ٱ -> ا)،
+  التاء المربوطة (ة -> ه)، الألف المقصورة (ى -> ي)، كراسي الهمزة (ؤ -> و، ئ -> ي)؛ ويحذف
+  التشكيل والتطويل ويحوّل الأرقام العربية الهندية إلى ASCII. جدول واحد (_FOLD) يولّد SQL
+  مشغّلات المزامنة (REPLACE متداخلة عادية، فأي عميل يكتب في القاعدة يُبقي الفهرس محدّثاً)
+  ويُطبَّق في بايثون على نص البحث.
+- INDEXES: الجدول -> الأعمدة المفهرسة؛ `{table}_fts` يحمل النص المطبَّع و rowid = id الصف،
+  وتُبقيه مشغّلات AFTER INSERT/UPDATE/DELETE متزامناً.
+- نص البحث يصبح استعلام بادئات ("كلمة"* لكل كلمة، وكل الكلمات مطلوبة) مرتباً بـ bm25. بلا FTS5
+  (SQLite قديم أو فهرس غير مبني) تعود كل الدوال إلى مرشحات LIKE '%term%' السابقة.
+"""
+import logging
+import re
+
+from msd.database import schema_registry
+
+logger = logging.getLogger(__name__)
+
+# الجدول -> الأعمدة المفهرسة (ترتيبها = ترتيب أوزان bm25 في RANK_WEIGHTS)
+INDEXES = {
+    "employees": ("name", "serial_number"),
+    "vacation_requests": ("notes", "relation", "type_code"),
+    "absences": ("notes",),
+}
+
+RANK_WEIGHTS = {"employees": (10.0, 2.0)}
+
+MAX_TERMS = 8
+
+# REPLACE متداخلة لكل مرحلة في SQL التطبيع (محلل SQLite يرفض ما يقارب 27 مستوى في المشغّل)
+_STAGE = 14
+
+_FOLD = [
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ة", "ه"), ("ى", "ي"), ("ؤ", "و"), ("ئ", "ي"),
+    # التشكيل والتطويل
+    *((chr(c), "") for c in range(0x064B, 0x0653)),
+    ("ٰ", ""), ("ـ", ""),
+    # الأرقام العربية الهندية
+    *((chr(0x0660 + i), str(i)) for i in range(10)),
+]
+
+_TRANSLATE = str.maketrans({a: b for a, b in _FOLD})
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    return str(text).translate(_TRANSLATE) if text is not None else None
+
+
+def _replace(expr, pairs):
+    for a, b in pairs:
+        expr = f"replace({expr}, '{a}', '{b}')"
+    return expr
+
+
+def normalize_select(exprs, source=None, keep=()):
+    """
+    SELECT يعيد keep كما هي (k0, k1, ...) ثم exprs مطبّعة بالقواعد نفسها (n0, n1, ...)؛
+    التطبيع على مراحل متداخلة كاستعلامات فرعية، _STAGE استبدالاً لكل مرحلة.
+    """
+    stages = [_FOLD[i:i + _STAGE] for i in range(0, len(_FOLD), _STAGE)]
+    kept = [f"k{i}" for i in range(len(keep))]
+    names = [f"n{i}" for i in range(len(exprs))]
+    cols = [f"{k} AS {a}" for k, a in zip(keep, kept)]
+    cols += [f"{_replace(e, stages[0])} AS {n}" for e, n in zip(exprs, names)]
+    sql = "SELECT " + ", ".join(cols) + (f" FROM {source}" if source else "")
+    for stage in stages[1:]:
+        cols = kept + [f"{_replace(n, stage)} AS {n}" for n in names]
+        sql = "SELECT " + ", ".join(cols) + f" FROM ({sql})"
+    return sql
+
+
+def words(text):
+    """كلمات text بعد التطبيع وبأحرف لاتينية صغيرة (كما يقطّعها unicode61)."""
+    return _WORD_RE.findall(normalize(text or "").lower())
+
+
+def fts_query(term):
+    """نص MATCH: بادئة لكل كلمة بعد التطبيع؛ None إن لم تبقَ كلمات."""
+    terms = words(term)[:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{w}"*' for w in terms)
+
+
+def available(table):
+    return table in schema_registry.get().search_fts
+
+
+# ---------- بناء الفهرس ----------
+
+def _triggers(table, cols):
+    fts = f"{table}_fts"
+    names = ", ".join(f"n{i}" for i in range(len(cols)))
+    normalized = normalize_select([f"new.{c}" for c in cols], keep=("new.id",))
+    insert = f"INSERT INTO {fts}(rowid, {', '.join(cols)}) SELECT k0, {names} FROM ({normalized});"
+    delete = f"DELETE FROM {fts} WHERE rowid = old.id;"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {', '.join(cols)} ON {table} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def create_index(conn, table):
+    """
+    ينشئ {table}_fts ومشغّلاته ويملؤه من الجدول إن لم يكن موجوداً.
+    يعيد True إن أُنشئ الآن؛ يتخطى الجداول الناقصة الأعمدة.
+    """
+    cols = INDEXES[table]
+    fts = f"{table}_fts"
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (fts,)).fetchone():
+        return False
+    existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if not set(cols) | {"id"} <= existing:
+        return False
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+          {', '.join(cols)},
+          tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    names = ", ".join(f"n{i}" for i in range(len(cols)))
+    conn.execute(f"""
+        INSERT INTO {fts}(rowid, {', '.join(cols)})
+        SELECT k0, {names} FROM ({normalize_select(cols, source=table, keep=("id",))})
+    """)
+    for sql in _triggers(table, cols):
+        conn.execute(sql)
+    return True
+
+
+def drop_index(conn, table):
+    fts = f"{table}_fts"
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    conn.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def rebuild(conn, tables=None):
+    """يعيد بناء الفهارس (بعد تعديل INDEXES أو قواعد التطبيع). يعيد الجداول المبنية."""
+    built = []
+    for table in tables or INDEXES:
+        drop_index(conn, table)
+        if create_index(conn, table):
+            built.append(table)
+    return built
+
+
+# ---------- الاستعلام ----------
+
+def match_clause(table, term, id_expr, like_columns):
+    """
+    (sql, params): شرط "{id_expr} ضمن نتائج البحث عن term في table"، عبر {table}_fts
+    إن وُجد وإلا LIKE على like_columns. None إن لم يكن في term ما يُبحث عنه.
+    """
+    term = (term or "").strip()
+    if not term:
+        return None
+    if available(table):
+        q = fts_query(term)
+        if q is None:
+            return None
+        return f"{id_expr} IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)", [q]
+    like = f"%{term}%"
+    return "(" + " OR ".join(f"{c} LIKE ?" for c in like_columns) + ")", [like] * len(like_columns)
+
+
+def any_of(*clauses):
+    """يدمج شروط match_clause بـ OR؛ None إن كانت كلها None."""
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+    return "(" + " OR ".join(c[0] for c in clauses) + ")", [p for c in clauses for p in c[1]]
+
+
+def search_employees(conn, term, where=(), params=(), limit=50):
+    """
+    الموظفون المطابقون لـ term (الاسم / الرقم الوظيفي) مرتبين بالصلة (bm25) ثم الاسم.
+    where/params: شروط إضافية على e. يعيد صفوف (id, name, department_id).
+    """
+    clauses, args = list(where), list(params)
+    if available("employees"):
+        q = fts_query(term)
+        if q is None:
+            return []
+        weights = ", ".join(str(w) for w in RANK_WEIGHTS["employees"])
+        extra = "".join(f" AND {c}" for c in clauses)
+        return conn.execute(f"""
+            SELECT e.id, e.name, e.department_id
+              FROM employees_fts f
+              JOIN employees e ON e.id = f.rowid
+             WHERE employees_fts MATCH ?{extra}
+             ORDER BY bm25(employees_fts, {weights}), e.name
+             LIMIT ?
+        """, [q, *args, limit]).fetchall()
+    clauses.append("(e.name LIKE ? OR e.serial_number LIKE ?)")
+    like = f"%{term.strip()}%"
+    return conn.execute(f"""
+        SELECT e.id, e.name, e.department_id FROM employees e
+         WHERE {' AND '.join(clauses)}
+         ORDER BY e.name LIMIT ?
+    """, [*args, like, like, limit]).fetchall()
\ No newline at end of file
@@ -1,503 +1,658 @@
-import re
-from datetime import datetime
-from msd.database.connection import get_conn
-from msd.auth.service import create_user_if_not_exists
-
-# الحقول التي نسمح بتعديلها عبر API
-EDITABLE_FIELDS = {
-    "serial_number","name","national_id","department_id","job_grade","job_title",
-    "hiring_date","grade_date","bonus","vacation_balance","emergency_vacation_balance",
-    "work_days","status"
-}
-
-DATE_FIELDS = {"hiring_date","grade_date"}
-NUMERIC_FIELDS = {"bonus","vacation_balance","emergency_vacation_balance"}
-
-def _now():
-    return datetime.utcnow().isoformat()
-
-def _audit(conn, action, record_id, changes, table_name="employees", actor_id=None):
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO audit_log(action, table_name, record_id, changes, created_at)
-            VALUES(?,?,?,?,CURRENT_TIMESTAMP)
-        """, (action, table_name, record_id,
-              (f"[actor={actor_id}] " if actor_id else "") + changes))
-        conn.commit()
-    except Exception:
-        pass
-
-def _normalize_date(val):
-    if val is None: return None
-    s = str(val).strip()
-    if not s or s in ("0","0000-00-00","None","nan"):
-        return None
-    for fmt in ("%Y-%m-%d","%d/%m/%Y","%Y/%m/%d","%d-%m-%Y","%Y.%m.%d"):
-        try:
-            return datetime.strptime(s, fmt).date().isoformat()
-        except ValueError:
-            continue
-    if re.fullmatch(r"\d{4,6}", s):
-        try:
-            import pandas as pd
-            base = datetime(1899,12,30)
-            return (base + pd.Timedelta(days=int(s))).date().isoformat()
-        except Exception:
-            return None
-    return None
-
-# ============ موظفون ============
-
-def list_employees(page=1, limit=25, search=None, department_id=None, status=None, order="name"):
-    """
-    تُرجع List[dict] لواجهة المدير.
-    يدعم: page, limit, search, department_id, status, order.
-    """
-    page = max(int(page or 1), 1)
-    limit = min(max(int(limit or 25), 1), 500)
-    offset = (page - 1) * limit
-
-    filters = []
-    params = []
-
-    if search:
-        s = f"%{str(search).strip()}%"
-        filters.append("(e.name LIKE ? OR e.serial_number LIKE ?)")
-        params.extend([s, s])
-
-    if department_id:
-        filters.append("e.department_id = ?")
-        params.append(int(department_id))
-
-    if status:
-        filters.append("e.status = ?")
-        params.append(status)
-
-    where = ("WHERE " + " AND ".join(filters)) if filters else ""
-
-    order_cols = {
-        "name": "e.name",
-        "id": "e.id",
-        "serial": "e.serial_number",
-        "dept": "e.department_id"
-    }
-    order_by = order_cols.get(order, "e.name")
-
-    sql = f"""
-      SELECT
-         e.id,
-         e.serial_number,
-         e.name,
-         e.national_id,
-         e.department,
-         e.department_id,
-         COALESCE(e.job_title, e.job_grade) AS job_title,
-         e.job_grade,
-         COALESCE(e.vacation_balance, 0) AS vacation_balance,
-         COALESCE(e.emergency_vacation_balance, e.emergency_balance, 0) AS emergency_vacation_balance,
-         COALESCE(e.status,'active') AS status
-      FROM employees e
-      {where}
-      ORDER BY {order_by} ASC
-      LIMIT ? OFFSET ?
-    """
-    params.extend([limit, offset])
-
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
-
-    out = []
-    for r in rows:
-        out.append({
-            "id": r[0],
-            "serial_number": r[1],
-            "name": r[2],
-            "national_id": r[3],
-            "department": r[4],
-            "department_id": r[5],
-            "job_title": r[6],
-            "job_grade": r[7],
-            "vacation_balance": r[8],
-            "emergency_vacation_balance": r[9],
-            "status": r[10],
-        })
-    return out
-
-def get_employee(emp_id: int):
-    """
-    تُرجع dict ثابتة. تتعامل مع غياب job_title عبر COALESCE إلى job_grade.
-    """
-    sql = """
-      SELECT
-        e.id,
-        e.serial_number,
-        e.name,
-        e.national_id,
-        e.department,
-        e.department_id,
-        COALESCE(e.job_title, e.job_grade) AS job_title,
-        e.job_grade,
-        e.hiring_date,
-        e.grade_date,
-        e.bonus,
-        COALESCE(e.vacation_balance,0) AS vacation_balance,
-        COALESCE(e.emergency_vacation_balance, e.emergency_balance, 0) AS emergency_vacation_balance,
-        COALESCE(e.work_days,'') AS work_days,
-        COALESCE(e.status,'active') AS status
-      FROM employees e
-      WHERE e.id = ?
-    """
-    with get_conn() as conn:
-        r = conn.execute(sql, (emp_id,)).fetchone()
-    if not r:
-        return None
-    return {
-        "id": r[0],
-        "serial_number": r[1],
-        "name": r[2],
-        "national_id": r[3],
-        "department": r[4],
-        "department_id": r[5],
-        "job_title": r[6],
-        "job_grade": r[7],
-        "hiring_date": r[8],
-        "grade_date": r[9],
-        "bonus": r[10],
-        "vacation_balance": r[11],
-        "emergency_vacation_balance": r[12],
-        "work_days": r[13],
-        "status": r[14],
-    }
-
-def _validate_employee_payload(data, partial=False):
-    cleaned = {}
-    for k, v in (data or {}).items():
-        if k in EDITABLE_FIELDS:
-            if k in DATE_FIELDS:
-                cleaned[k] = _normalize_date(v)
-            else:
-                cleaned[k] = v
-    if not partial:
-        for r in ("name","serial_number"):
-            if r not in cleaned or not str(cleaned[r]).strip():
-                raise ValueError(f"حقل {r} مطلوب")
-    return cleaned
-
-def create_employee(data, actor_id=None):
-    payload = _validate_employee_payload(data)
-    payload.setdefault("status","active")
-    with get_conn() as conn:
-        cur = conn.cursor()
-        if payload.get("national_id"):
-            cur.execute("SELECT 1 FROM employees WHERE national_id=?", (payload["national_id"],))
-            if cur.fetchone():
-                raise ValueError("national_id موجود مسبقاً")
-        cur.execute("SELECT 1 FROM employees WHERE serial_number=?", (payload["serial_number"],))
-        if cur.fetchone():
-            raise ValueError("serial_number موجود مسبقاً")
-        cols = list(payload.keys())
-        vals = [payload[c] for c in cols]
-        cols_sql = ",".join(cols)
-        qs = ",".join(["?"]*len(cols))
-        cur.execute(f"""
-            INSERT INTO employees ({cols_sql}, created_at, updated_at)
-            VALUES ({qs}, ?, ?)
-        """, vals + [_now(), _now()])
-        eid = cur.lastrowid
-        conn.commit()
-        _audit(conn,"CREATE", eid, f"create employee name={payload.get('name')}", actor_id=actor_id)
-        return eid
-
-def update_employee(eid, data, actor_id=None, actor_role=None):
-    payload = _validate_employee_payload(data, partial=True)
-    if not payload:
-        return
-    if actor_role not in ("manager","admin"):
-        payload.pop("vacation_balance", None)
-        payload.pop("emergency_vacation_balance", None)
-    with get_conn() as conn:
-        cur = conn.cursor()
-        if "national_id" in payload and payload["national_id"]:
-            cur.execute("SELECT id FROM employees WHERE national_id=? AND id<>?", (payload["national_id"], eid))
-            if cur.fetchone():
-                raise ValueError("national_id مستخدم لموظف آخر")
-        if "serial_number" in payload and payload["serial_number"]:
-            cur.execute("SELECT id FROM employees WHERE serial_number=? AND id<>?", (payload["serial_number"], eid))
-            if cur.fetchone():
-                raise ValueError("serial_number مستخدم لموظف آخر")
-        sets = []
-        vals = []
-        for k,v in payload.items():
-            sets.append(f"{k}=?")
-            vals.append(v)
-        sets.append("updated_at=?")
-        vals.append(_now())
-        vals.append(eid)
-        cur.execute(f"UPDATE employees SET {', '.join(sets)} WHERE id=?", vals)
-        if cur.rowcount == 0:
-            raise ValueError("الموظف غير موجود")
-        conn.commit()
-        _audit(conn,"UPDATE", eid, "update fields="+",".join(payload.keys()), actor_id=actor_id)
-
-def delete_employee(eid, actor_id=None):
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM employees WHERE id=?", (eid,))
-        if cur.rowcount == 0:
-            raise ValueError("غير موجود")
-        conn.commit()
-        _audit(conn,"DELETE", eid, "delete employee", actor_id=actor_id)
-
-def employee_stats(eid: int):
-    emp = get_employee(eid)
-    if not emp:
-        return None
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT status, COUNT(*) c, IFNULL(SUM(requested_days),0) total_days
-              FROM vacation_requests
-             WHERE employee_id=?
-             GROUP BY status
-        """, (eid,))
-        vac_stats = {r[0]: {"count": r[1], "days": r[2]} for r in cur.fetchall()}
-        approved_days = vac_stats.get("approved", {}).get("days",0)
-        cur.execute("""
-            SELECT type, COUNT(*) c, IFNULL(SUM(duration),0) durations
-              FROM absences
-             WHERE employee_id=?
-             GROUP BY type
-        """, (eid,))
-        abs_stats = {r[0]: {"count": r[1], "days_or_duration": r[2]} for r in cur.fetchall()}
-    return {
-        "employee": {"id": emp["id"], "name": emp["name"], "department_id": emp["department_id"]},
-        "vacations": vac_stats,
-        "approved_days": approved_days,
-        "absences": abs_stats
-    }
-
-# ============ إدارة الأقسام ============
-
-def list_departments():
-    """
-    إرجاع الأقسام مع اسم رئيس القسم (إن وُجد) عبر users.role='department_head' و users.department_id.
-    لا حاجة لعمود head_user_id في جدول الأقسام.
-    """
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT d.id, d.name,
-                   u.username AS head_username
-              FROM departments d
-              LEFT JOIN users u
-                     ON u.role='department_head' AND u.department_id = d.id
-             ORDER BY d.name
-        """)
-        rows = cur.fetchall()
-        return [{"id": r[0], "name": r[1], "head_username": r[2]} for r in rows]
-
-def create_department(name, actor_id=None):
-    name = (name or "").strip()
-    if not name:
-        raise ValueError("اسم القسم مطلوب")
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT 1 FROM departments WHERE name=?", (name,))
-        if cur.fetchone():
-            raise ValueError("القسم موجود")
-        cur.execute("INSERT INTO departments(name) VALUES(?)", (name,))
-        did = cur.lastrowid
-        conn.commit()
-        _audit(conn, "CREATE_DEPT", did, f"create department name={name}", table_name="departments", actor_id=actor_id)
-        return did
-
-def update_department(dept_id, name, actor_id=None):
-    name = (name or "").strip()
-    if not name:
-        raise ValueError("اسم القسم مطلوب")
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE departments SET name=? WHERE id=?", (name, dept_id))
-        if cur.rowcount == 0:
-            raise ValueError("القسم غير موجود")
-        conn.commit()
-        _audit(conn, "UPDATE_DEPT", dept_id, f"update department name={name}", table_name="departments", actor_id=actor_id)
-
-def delete_department(dept_id, actor_id=None):
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM departments WHERE id=?", (dept_id,))
-        if cur.rowcount == 0:
-            raise ValueError("القسم غير موجود")
-        conn.commit()
-        _audit(conn, "DELETE_DEPT", dept_id, "delete department", table_name="departments", actor_id=actor_id)
-
-def assign_department_head(dept_id, employee_id, username, password, actor_id=None):
-    """
-    ينشئ/يحدّث مستخدم بدور department_head ويضبط department_id له على رقم القسم.
-    لا يكتب أي شيء داخل جدول الأقسام.
-    """
-    username = (username or "").strip()
-    if not username or not password:
-        raise ValueError("اسم مستخدم وكلمة مرور مطلوبة")
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT 1 FROM departments WHERE id=?", (dept_id,))
-        if not cur.fetchone():
-            raise ValueError("القسم غير موجود")
-        cur.execute("SELECT id FROM employees WHERE id=?", (employee_id,))
-        if not cur.fetchone():
-            raise ValueError("الموظف غير موجود")
-    user_id = create_user_if_not_exists(
-        username=username,
-        password=password,
-        role="department_head",
-        department_id=dept_id
-    )
-    with get_conn() as conn:
-        _audit(conn, "ASSIGN_HEAD", dept_id, f"assign head user={user_id}", table_name="departments", actor_id=actor_id)
-    return user_id
-
-# ============ أسماء الموظفين للكومبو ============
-
-def list_employee_names(search=None, department_id=None, limit=200):
-    where = []
-    params = []
-    if department_id:
-        where.append("department_id=?")
-        params.append(department_id)
-    if search:
-        like = f"%{str(search).strip()}%"
-        where.append("name LIKE ?")
-        params.append(like)
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-    sql = f"""
-        SELECT id, name, department_id
-          FROM employees
-          {where_sql}
-         ORDER BY name
-         LIMIT ?
-    """
-    params.append(limit)
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
-        return [{"id":r[0], "name":r[1], "department_id":r[2]} for r in rows]
-
-# ============ استيراد / تصدير ============
-
-IMPORT_COLUMNS_MAP = {
-    "serial_number":"serial_number",
-    "name":"name",
-    "national_id":"national_id",
-    "department":"department_id",
-    "job_grade":"job_grade",
-    "job_title":"job_title",
-    "hiring_date":"hiring_date",
-    "grade_date":"grade_date",
-    "bonus":"bonus",
-    "vacation_balance":"vacation_balance",
-    "emergency_vacation_balance":"emergency_vacation_balance",
-    "work_days":"work_days",
-    "status":"status"
-}
-
-EXPORT_COLUMNS_ORDER = [
-    "id","serial_number","name","national_id","department_id","job_grade","job_title",
-    "hiring_date","grade_date","bonus","vacation_balance","emergency_vacation_balance","work_days","status",
-    "created_at","updated_at"
-]
-
-def import_employees_file(file_storage, actor_id=None, mode="replace"):
-    import pandas as pd
-    filename = (file_storage.filename or "").lower()
-    if filename.endswith(".csv"):
-        df = pd.read_csv(file_storage)
-    else:
-        df = pd.read_excel(file_storage)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    processed=0; created=0; updated=0; errors=[]
-    with get_conn() as conn:
-        cur = conn.cursor()
-        for idx, row in df.iterrows():
-            processed += 1
-            try:
-                mapped = {}
-                for src,dst in IMPORT_COLUMNS_MAP.items():
-                    if src in row and not pd.isna(row[src]):
-                        val = row[src]
-                        if dst in DATE_FIELDS: val = _normalize_date(val)
-                        elif isinstance(val, str): val = val.strip()
-                        mapped[dst] = val
-                if not mapped.get("name") or not mapped.get("serial_number"):
-                    raise ValueError("حقل name أو serial_number مفقود")
-                if "department_id" in mapped and isinstance(mapped["department_id"], str):
-                    try: mapped["department_id"] = int(mapped["department_id"])
-                    except ValueError: mapped["department_id"] = None
-
-                cur.execute("SELECT id FROM employees WHERE national_id=?", (mapped.get("national_id"),))
-                erow = cur.fetchone()
-                if not erow and mapped.get("serial_number"):
-                    cur.execute("SELECT id FROM employees WHERE serial_number=?", (mapped.get("serial_number"),))
-                    erow = cur.fetchone()
-
-                if erow:
-                    eid = erow[0]
-                    sets=[]; vals=[]
-                    if mode == "replace":
-                        for k,v in mapped.items():
-                            if k in EDITABLE_FIELDS:
-                                sets.append(f"{k}=?"); vals.append(v)
-                    elif mode == "merge":
-                        cur.execute("SELECT "+",".join(EDITABLE_FIELDS)+" FROM employees WHERE id=?", (eid,))
-                        current = cur.fetchone()
-                        curr_map = dict(zip(EDITABLE_FIELDS, current)) if current else {}
-                        for k,v in mapped.items():
-                            if k in EDITABLE_FIELDS and (not curr_map.get(k) or str(curr_map.get(k)).strip()==""):
-                                sets.append(f"{k}=?"); vals.append(v)
-                    elif mode == "smart":
-                        cur.execute("SELECT "+",".join(EDITABLE_FIELDS)+" FROM employees WHERE id=?", (eid,))
-                        current = cur.fetchone()
-                        curr_map = dict(zip(EDITABLE_FIELDS, current)) if current else {}
-                        for k,v in mapped.items():
-                            if k not in EDITABLE_FIELDS: continue
-                            existing = curr_map.get(k)
-                            if not existing or str(existing).strip()=="": sets.append(f"{k}=?"); vals.append(v)
-                            else:
-                                if k in NUMERIC_FIELDS and v not in (None,""):
-                                    sets.append(f"{k}=?"); vals.append(v)
-                                if k in DATE_FIELDS and v and not existing:
-                                    sets.append(f"{k}=?"); vals.append(v)
-                    else:
-                        raise ValueError("وضع استيراد غير معروف")
-                    if sets:
-                        sets.append("updated_at=?"); vals.append(_now())
-                        vals.append(eid)
-                        cur.execute(f"UPDATE employees SET {', '.join(sets)} WHERE id=?", vals)
-                        updated += 1
-                        _audit(conn,"IMPORT_UPDATE", eid, f"row={idx} mode={mode}", actor_id=actor_id)
-                else:
-                    cols=[]; vals=[]
-                    for k,v in mapped.items():
-                        if k in EDITABLE_FIELDS:
-                            cols.append(k); vals.append(v)
-                    cols.append("created_at"); vals.append(_now())
-                    cols.append("updated_at"); vals.append(_now())
-                    cur.execute(f"INSERT INTO employees({','.join(cols)}) VALUES({','.join(['?']*len(vals))})", vals)
-                    eid = cur.lastrowid
-                    created += 1
-                    _audit(conn,"IMPORT_CREATE", eid, f"row={idx}", actor_id=actor_id)
-            except Exception as e:
-                errors.append({"row": int(idx)+2, "error": str(e)})
-        conn.commit()
-    return {"processed":processed,"created":created,"updated":updated,"errors":errors,"mode":mode}
-
-def export_dataframe():
-    import pandas as pd
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(f"SELECT {', '.join(EXPORT_COLUMNS_ORDER)} FROM employees ORDER BY name")
-        rows = cur.fetchall()
-        df = pd.DataFrame(rows, columns=EXPORT_COLUMNS_ORDER)
-    return df
\ No newline at end of file
+import re
+from datetime import datetime
+from msd.database.connection import get_conn, transaction
+from msd.database import schema_registry
+from msd.balances import ledger
+from msd.utils.export_stream import iter_query
+from msd.utils import search as search_index
+from msd.employees import lookup
+from msd.departments import directory
+from msd.auth.service import create_user_if_not_exists
+
+# الحقول التي نسمح بتعديلها عبر API
+EDITABLE_FIELDS = {
+    "serial_number","name","national_id","department_id","job_grade","job_title",
+    "hiring_date","grade_date","bonus","vacation_balance","emergency_vacation_balance",
+    "work_days","status"
+}
+
+DATE_FIELDS = {"hiring_date","grade_date"}
+NUMERIC_FIELDS = {"bonus","vacation_balance","emergency_vacation_balance"}
+# أعمدة الرصيد: تُكتب عبر سجل الأرصدة (msd.balances.ledger)
+BALANCE_FIELDS = ("vacation_balance","emergency_vacation_balance")
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+def _audit(conn, action, record_id, changes, table_name="employees", actor_id=None):
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO audit_log(action, table_name, record_id, changes, created_at)
+            VALUES(?,?,?,?,CURRENT_TIMESTAMP)
+        """, (action, table_name, record_id,
+              (f"[actor={actor_id}] " if actor_id else "") + changes))
+    except Exception:
+        pass
+
+def _normalize_date(val):
+    if val is None: return None
+    s = str(val).strip()
+    if not s or s in ("0","0000-00-00","None","nan"):
+        return None
+    for fmt in ("%Y-%m-%d","%d/%m/%Y","%Y/%m/%d","%d-%m-%Y","%Y.%m.%d"):
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            continue
+    if re.fullmatch(r"\d{4,6}", s):
+        try:
+            import pandas as pd
+            base = datetime(1899,12,30)
+            return (base + pd.Timedelta(days=int(s))).date().isoformat()
+        except Exception:
+            return None
+    return None
+
+# ============ موظفون ============
+
+def list_employees(page=1, limit=25, search=None, department_id=None, status=None, order="name"):
+    """
+    تُرجع List[dict] لواجهة المدير.
+    يدعم: page, limit, search, department_id, status, order.
+    """
+    page = max(int(page or 1), 1)
+    limit = min(max(int(limit or 25), 1), 500)
+    offset = (page - 1) * limit
+
+    filters = []
+    params = []
+
+    found = search_index.match_clause("employees", str(search or ""), "e.id",
+                                      ("e.name", "e.serial_number"))
+    if found:
+        filters.append(found[0])
+        params.extend(found[1])
+
+    if department_id:
+        filters.append("e.department_id = ?")
+        params.append(int(department_id))
+
+    if status:
+        filters.append("e.status = ?")
+        params.append(status)
+
+    where = ("WHERE " + " AND ".join(filters)) if filters else ""
+
+    order_cols = {
+        "name": "e.name",
+        "id": "e.id",
+        "serial": "e.serial_number",
+        "dept": "e.department_id"
+    }
+    order_by = order_cols.get(order, "e.name")
+    schema = schema_registry.get()
+
+    sql = f"""
+      SELECT
+         e.id,
+         e.serial_number,
+         e.name,
+         e.national_id,
+         e.department,
+         e.department_id,
+         {schema.e_emp_job_title_expr} AS job_title,
+         e.job_grade,
+         COALESCE(e.vacation_balance, 0) AS vacation_balance,
+         {schema.e_emp_emergency_expr} AS emergency_vacation_balance,
+         COALESCE(e.status,'active') AS status
+      FROM employees e
+      {where}
+      ORDER BY {order_by} ASC
+      LIMIT ? OFFSET ?
+    """
+    params.extend([limit, offset])
+
+    with get_conn() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    out = []
+    for r in rows:
+        out.append({
+            "id": r[0],
+            "serial_number": r[1],
+            "name": r[2],
+            "national_id": r[3],
+            "department": r[4],
+            "department_id": r[5],
+            "job_title": r[6],
+            "job_grade": r[7],
+            "vacation_balance": r[8],
+            "emergency_vacation_balance": r[9],
+            "status": r[10],
+        })
+    return out
+
+def get_employee(emp_id: int):
+    """
+    تُرجع dict ثابتة. تتعامل مع غياب job_title عبر COALESCE إلى job_grade.
+    """
+    schema = schema_registry.get()
+    sql = f"""
+      SELECT
+        e.id,
+        e.serial_number,
+        e.name,
+        e.national_id,
+        e.department,
+        e.department_id,
+        {schema.e_emp_job_title_expr} AS job_title,
+        e.job_grade,
+        e.hiring_date,
+        e.grade_date,
+        e.bonus,
+        COALESCE(e.vacation_balance,0) AS vacation_balance,
+        {schema.e_emp_emergency_expr} AS emergency_vacation_balance,
+        COALESCE(e.work_days,'') AS work_days,
+        COALESCE(e.status,'active') AS status
+      FROM employees e
+      WHERE e.id = ?
+    """
+    with get_conn() as conn:
+        r = conn.execute(sql, (emp_id,)).fetchone()
+    if not r:
+        return None
+    return {
+        "id": r[0],
+        "serial_number": r[1],
+        "name": r[2],
+        "national_id": r[3],
+        "department": r[4],
+        "department_id": r[5],
+        "job_title": r[6],
+        "job_grade": r[7],
+        "hiring_date": r[8],
+        "grade_date": r[9],
+        "bonus": r[10],
+        "vacation_balance": r[11],
+        "emergency_vacation_balance": r[12],
+        "work_days": r[13],
+        "status": r[14],
+    }
+
+def _validate_employee_payload(data, partial=False):
+    cleaned = {}
+    for k, v in (data or {}).items():
+        if k in EDITABLE_FIELDS:
+            if k in DATE_FIELDS:
+                cleaned[k] = _normalize_date(v)
+            else:
+                cleaned[k] = v
+    if not partial:
+        for r in ("name","serial_number"):
+            if r not in cleaned or not str(cleaned[r]).strip():
+                raise ValueError(f"حقل {r} مطلوب")
+    return cleaned
+
+def create_employee(data, actor_id=None):
+    payload = _validate_employee_payload(data)
+    payload.setdefault("status","active")
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        if payload.get("national_id"):
+            cur.execute("SELECT 1 FROM employees WHERE national_id=?", (payload["national_id"],))
+            if cur.fetchone():
+                raise ValueError("national_id موجود مسبقاً")
+        cur.execute("SELECT 1 FROM employees WHERE serial_number=?", (payload["serial_number"],))
+        if cur.fetchone():
+            raise ValueError("serial_number موجود مسبقاً")
+        cols = list(payload.keys())
+        vals = [payload[c] for c in cols]
+        cols_sql = ",".join(cols)
+        qs = ",".join(["?"]*len(cols))
+        cur.execute(f"""
+            INSERT INTO employees ({cols_sql}, created_at, updated_at)
+            VALUES ({qs}, ?, ?)
+        """, vals + [_now(), _now()])
+        eid = cur.lastrowid
+        ledger.sync(conn, [eid], "opening", actor_id=actor_id)
+        _audit(conn,"CREATE", eid, f"create employee name={payload.get('name')}", actor_id=actor_id)
+    lookup.refresh([eid])
+    return eid
+
+def update_employee(eid, data, actor_id=None, actor_role=None):
+    payload = _validate_employee_payload(data, partial=True)
+    if not payload:
+        return
+    if actor_role not in ("manager","admin"):
+        payload.pop("vacation_balance", None)
+        payload.pop("emergency_vacation_balance", None)
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        if "national_id" in payload and payload["national_id"]:
+            cur.execute("SELECT id FROM employees WHERE national_id=? AND id<>?", (payload["national_id"], eid))
+            if cur.fetchone():
+                raise ValueError("national_id مستخدم لموظف آخر")
+        if "serial_number" in payload and payload["serial_number"]:
+            cur.execute("SELECT id FROM employees WHERE serial_number=? AND id<>?", (payload["serial_number"], eid))
+            if cur.fetchone():
+                raise ValueError("serial_number مستخدم لموظف آخر")
+        sets = []
+        vals = []
+        for k,v in payload.items():
+            if k in BALANCE_FIELDS:
+                continue
+            sets.append(f"{k}=?")
+            vals.append(v)
+        sets.append("updated_at=?")
+        vals.append(_now())
+        vals.append(eid)
+        cur.execute(f"UPDATE employees SET {', '.join(sets)} WHERE id=?", vals)
+        if cur.rowcount == 0:
+            raise ValueError("الموظف غير موجود")
+        for k in BALANCE_FIELDS:
+            if k in payload:
+                ledger.set_balance(conn, eid, k, payload[k], "manual", actor_id=actor_id)
+        _audit(conn,"UPDATE", eid, "update fields="+",".join(payload.keys()), actor_id=actor_id)
+    lookup.refresh([eid])
+
+def delete_employee(eid, actor_id=None):
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        cur.execute("DELETE FROM employees WHERE id=?", (eid,))
+        if cur.rowcount == 0:
+            raise ValueError("غير موجود")
+        _audit(conn,"DELETE", eid, "delete employee", actor_id=actor_id)
+    lookup.refresh([eid])
+
+def employee_stats(eid: int):
+    emp = get_employee(eid)
+    if not emp:
+        return None
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT status, COUNT(*) c, IFNULL(SUM(requested_days),0) total_days
+              FROM vacation_requests
+             WHERE employee_id=?
+             GROUP BY status
+        """, (eid,))
+        vac_stats = {r[0]: {"count": r[1], "days": r[2]} for r in cur.fetchall()}
+        approved_days = vac_stats.get("approved", {}).get("days",0)
+        cur.execute("""
+            SELECT type, COUNT(*) c, IFNULL(SUM(duration),0) durations
+              FROM absences
+             WHERE employee_id=?
+             GROUP BY type
+        """, (eid,))
+        abs_stats = {r[0]: {"count": r[1], "days_or_duration": r[2]} for r in cur.fetchall()}
+    return {
+        "employee": {"id": emp["id"], "name": emp["name"], "department_id": emp["department_id"]},
+        "vacations": vac_stats,
+        "approved_days": approved_days,
+        "absences": abs_stats
+    }
+
+def employee_balances(eid: int, as_of=None, limit=50):
+    """
+    الأرصدة كما كانت في نهاية يوم as_of (افتراضياً اليوم) من سجل الأرصدة + آخر الحركات.
+    None إن لم يوجد الموظف؛ ValueError لتاريخ غير صالح أو قبل الهجرة v021.
+    """
+    if not schema_registry.get().balance_ledger:
+        raise ValueError("سجل الأرصدة غير مُهيأ (شغّل الهجرات)")
+    try:
+        day = (datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else datetime.now().date()).isoformat()
+    except ValueError:
+        raise ValueError("تنسيق تاريخ غير صالح (YYYY-MM-DD)")
+    with get_conn() as conn:
+        if not conn.execute("SELECT 1 FROM employees WHERE id=?", (eid,)).fetchone():
+            return None
+        balances = {col: round(ledger.balance_at(conn, eid, col, day), 4)
+                    for col in ledger.tracked_columns()}
+        history = ledger.history(conn, eid, limit=limit)
+    return {
+        "employee_id": eid,
+        "as_of": day,
+        "balances": balances,
+        "history": history,
+    }
+
+# ============ إدارة الأقسام ============
+
+def list_departments():
+    """
+    إرجاع الأقسام مع اسم رئيس القسم (إن وُجد) عبر users.role='department_head' و users.department_id.
+    لا حاجة لعمود head_user_id في جدول الأقسام. من دليل الأقسام (msd.departments.directory).
+    """
+    return [{"id": d["id"], "name": d["name"], "head_username": d["head_username"]}
+            for d in directory.all()]
+
+def create_department(name, actor_id=None):
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("اسم القسم مطلوب")
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        if directory.by_name(name, conn):
+            raise ValueError("القسم موجود")
+        cur.execute("INSERT INTO departments(name) VALUES(?)", (name,))
+        did = cur.lastrowid
+        _audit(conn, "CREATE_DEPT", did, f"create department name={name}", table_name="departments", actor_id=actor_id)
+        return did
+
+def update_department(dept_id, name, actor_id=None):
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("اسم القسم مطلوب")
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        cur.execute("UPDATE departments SET name=? WHERE id=?", (name, dept_id))
+        if cur.rowcount == 0:
+            raise ValueError("القسم غير موجود")
+        _audit(conn, "UPDATE_DEPT", dept_id, f"update department name={name}", table_name="departments", actor_id=actor_id)
+
+def delete_department(dept_id, actor_id=None):
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        cur.execute("DELETE FROM departments WHERE id=?", (dept_id,))
+        if cur.rowcount == 0:
+            raise ValueError("القسم غير موجود")
+        _audit(conn, "DELETE_DEPT", dept_id, "delete department", table_name="departments", actor_id=actor_id)
+
+def assign_department_head(dept_id, employee_id, username, password, actor_id=None):
+    """
+    ينشئ/يحدّث مستخدم بدور department_head ويضبط department_id له على رقم القسم.
+    لا يكتب أي شيء داخل جدول الأقسام.
+    """
+    username = (username or "").strip()
+    if not username or not password:
+        raise ValueError("اسم مستخدم وكلمة مرور مطلوبة")
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM departments WHERE id=?", (dept_id,))
+        if not cur.fetchone():
+            raise ValueError("القسم غير موجود")
+        cur.execute("SELECT id FROM employees WHERE id=?", (employee_id,))
+        if not cur.fetchone():
+            raise ValueError("الموظف غير موجود")
+        # commit داخل create_user_if_not_exists يُؤجَّل لنهاية الوحدة
+        user_id = create_user_if_not_exists(
+            username=username,
+            password=password,
+            role="department_head",
+            department_id=dept_id
+        )
+        _audit(conn, "ASSIGN_HEAD", dept_id, f"assign head user={user_id}", table_name="departments", actor_id=actor_id)
+    return user_id
+
+# ============ أسماء الموظفين للكومبو ============
+
+def list_employee_names(search=None, department_id=None, limit=200):
+    """search: بحث نصي (بادئات الكلمات بعد التطبيع) مرتب بالصلة؛ بدونه الترتيب بالاسم."""
+    where = []
+    params = []
+    if department_id:
+        where.append("e.department_id=?")
+        params.append(department_id)
+    with get_conn() as conn:
+        if search and str(search).strip():
+            rows = search_index.search_employees(conn, str(search), where, params, limit)
+        else:
+            where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+            rows = conn.execute(f"""
+                SELECT e.id, e.name, e.department_id
+                  FROM employees e
+                  {where_sql}
+                 ORDER BY e.name
+                 LIMIT ?
+            """, params + [limit]).fetchall()
+        return [{"id":r[0], "name":r[1], "department_id":r[2]} for r in rows]
+
+# ============ استيراد / تصدير ============
+
+IMPORT_COLUMNS_MAP = {
+    "serial_number":"serial_number",
+    "name":"name",
+    "national_id":"national_id",
+    "department":"department_id",
+    "job_grade":"job_grade",
+    "job_title":"job_title",
+    "hiring_date":"hiring_date",
+    "grade_date":"grade_date",
+    "bonus":"bonus",
+    "vacation_balance":"vacation_balance",
+    "emergency_vacation_balance":"emergency_vacation_balance",
+    "work_days":"work_days",
+    "status":"status"
+}
+
+EXPORT_COLUMNS_ORDER = [
+    "id","serial_number","name","national_id","department_id","job_grade","job_title",
+    "hiring_date","grade_date","bonus","vacation_balance","emergency_vacation_balance","work_days","status",
+    "created_at","updated_at"
+]
+
+def _plain(val):
+    # قيم pandas/numpy (int64, Timestamp...) -> قيم بايثون يقبلها sqlite3
+    if hasattr(val, "item") and not isinstance(val, str):
+        try:
+            return val.item()
+        except (ValueError, TypeError):
+            return val
+    return val
+
+def _map_import_row(row, isna):
+    mapped = {}
+    for src,dst in IMPORT_COLUMNS_MAP.items():
+        if src in row and not isna(row[src]):
+            val = _plain(row[src])
+            if dst in DATE_FIELDS: val = _normalize_date(val)
+            elif isinstance(val, str): val = val.strip()
+            mapped[dst] = val
+    if not mapped.get("name") or not mapped.get("serial_number"):
+        raise ValueError("حقل name أو serial_number مفقود")
+    if "department_id" in mapped and isinstance(mapped["department_id"], str):
+        # رقم القسم أو اسمه (دليل الأقسام)
+        mapped["department_id"] = directory.resolve(mapped["department_id"])
+    return mapped
+
+def _import_sets(mode, mapped, curr_map):
+    """الحقول التي سيكتبها الاستيراد لموظف موجود (بنفس قواعد replace/merge/smart)."""
+    sets = {}
+    if mode == "replace":
+        for k,v in mapped.items():
+            if k in EDITABLE_FIELDS:
+                sets[k] = v
+    elif mode == "merge":
+        for k,v in mapped.items():
+            if k in EDITABLE_FIELDS and (not curr_map.get(k) or str(curr_map.get(k)).strip()==""):
+                sets[k] = v
+    elif mode == "smart":
+        for k,v in mapped.items():
+            if k not in EDITABLE_FIELDS: continue
+            existing = curr_map.get(k)
+            if not existing or str(existing).strip()=="": sets[k] = v
+            else:
+                if k in NUMERIC_FIELDS and v not in (None,""):
+                    sets[k] = v
+                if k in DATE_FIELDS and v and not existing:
+                    sets[k] = v
+    else:
+        raise ValueError("وضع استيراد غير معروف")
+    return sets
+
+def _key(val):
+    return None if val is None else str(val).strip()
+
+class _IdIndex:
+    """مفتاح -> معرّفات الموظفين؛ البحث يعيد أصغر id كما يفعل SELECT ... WHERE col=? على الفهرس."""
+    def __init__(self):
+        self._ids = {}
+
+    def add(self, val, eid):
+        k = _key(val)
+        if k is not None:
+            self._ids.setdefault(k, set()).add(eid)
+
+    def discard(self, val, eid):
+        ids = self._ids.get(_key(val))
+        if ids:
+            ids.discard(eid)
+
+    def get(self, val):
+        ids = self._ids.get(_key(val))
+        return min(ids) if ids else None
+
+def _next_employee_id(cur):
+    cur.execute("SELECT COALESCE(MAX(id),0) FROM employees")
+    next_id = cur.fetchone()[0]
+    try:
+        cur.execute("SELECT seq FROM sqlite_sequence WHERE name='employees'")
+        seq = cur.fetchone()
+        if seq and seq[0]:
+            next_id = max(next_id, seq[0])
+    except Exception:
+        pass  # الجدول بدون AUTOINCREMENT
+    return next_id + 1
+
+def _apply_grouped(cur, ops, build_sql, errors):
+    """
+    ops: [(cols_tuple, params, row_no)] -> executemany لكل مجموعة أعمدة.
+    عند فشل مجموعة نعيدها صفاً صفاً لنُرجع الخطأ لصفه كما في السابق.
+    يعيد أرقام الصفوف التي فشلت.
+    """
+    groups = {}
+    for cols, params, row_no in ops:
+        groups.setdefault(cols, []).append((params, row_no))
+    failed = set()
+    for cols, items in groups.items():
+        sql = build_sql(cols)
+        try:
+            cur.execute("SAVEPOINT import_batch")
+            cur.executemany(sql, [p for p, _ in items])
+            cur.execute("RELEASE import_batch")
+        except Exception:
+            cur.execute("ROLLBACK TO import_batch")
+            cur.execute("RELEASE import_batch")
+            for params, row_no in items:
+                try:
+                    cur.execute(sql, params)
+                except Exception as e:
+                    failed.add(row_no)
+                    errors.append({"row": row_no, "error": str(e)})
+    return failed
+
+def import_employees_file(file_storage, actor_id=None, mode="replace"):
+    """
+    استيراد على مراحل:
+      1) قراءة الملف وتحويل كل صف (الأخطاء تُسجَّل لكل صف)
+      2) تحميل خرائط national_id/serial_number -> id والقيم الحالية باستعلام واحد،
+         ثم حساب الفرق لكل صف في الذاكرة (الصفوف المكررة ترى نتيجة ما قبلها)
+      3) تطبيق النتيجة بـ executemany وإدراج سجلات التدقيق دفعة واحدة، داخل transaction واحدة
+    """
+    import pandas as pd
+    filename = (file_storage.filename or "").lower()
+    if filename.endswith(".csv"):
+        df = pd.read_csv(file_storage)
+    else:
+        df = pd.read_excel(file_storage)
+    df.columns = [str(c).strip() for c in df.columns]
+
+    processed=0; created=0; updated=0; errors=[]
+    fields = sorted(EDITABLE_FIELDS)
+    with get_conn() as conn, transaction(conn):
+        cur = conn.cursor()
+        # ---- المرحلة 2: الخرائط والقيم الحالية ----
+        cur.execute(f"SELECT id, {', '.join(fields)} FROM employees ORDER BY id")
+        current = {}
+        by_nid = _IdIndex()
+        by_serial = _IdIndex()
+        for r in cur.fetchall():
+            eid = r[0]
+            current[eid] = dict(zip(fields, r[1:]))
+            by_nid.add(current[eid]["national_id"], eid)
+            by_serial.add(current[eid]["serial_number"], eid)
+        next_id = _next_employee_id(cur)
+
+        inserts = {}   # eid -> (values, row_no)
+        updates = {}   # eid -> {col: value}
+        update_rows = {}  # eid -> رقم آخر صف حدّثه (لتقرير الخطأ)
+        audit = []     # (action, eid, changes)
+        for idx, row in zip(df.index, df.to_dict("records")):
+            processed += 1
+            try:
+                mapped = _map_import_row(row, pd.isna)
+                eid = by_nid.get(mapped.get("national_id"))
+                if eid is None and mapped.get("serial_number"):
+                    eid = by_serial.get(mapped.get("serial_number"))
+
+                if eid is not None:
+                    sets = _import_sets(mode, mapped, current[eid])
+                    if sets:
+                        sets["updated_at"] = _now()
+                        if eid in inserts:
+                            inserts[eid][0].update(sets)
+                        else:
+                            updates.setdefault(eid, {}).update(sets)
+                            update_rows[eid] = int(idx)+2
+                        # الصفوف اللاحقة تبحث بالقيم بعد التحديث
+                        for col, index in (("national_id", by_nid), ("serial_number", by_serial)):
+                            if col in sets:
+                                index.discard(current[eid][col], eid)
+                                index.add(sets[col], eid)
+                        current[eid].update(sets)
+                        updated += 1
+                        audit.append(("IMPORT_UPDATE", eid, f"row={idx} mode={mode}"))
+                else:
+                    eid = next_id; next_id += 1
+                    values = {k: v for k, v in mapped.items() if k in EDITABLE_FIELDS}
+                    values["created_at"] = _now()
+                    values["updated_at"] = _now()
+                    inserts[eid] = (values, int(idx)+2)
+                    current[eid] = {f: values.get(f) for f in fields}
+                    by_nid.add(values.get("national_id"), eid)
+                    by_serial.add(values["serial_number"], eid)
+                    created += 1
+                    audit.append(("IMPORT_CREATE", eid, f"row={idx}"))
+            except Exception as e:
+                errors.append({"row": int(idx)+2, "error": str(e)})
+
+        # ---- المرحلة 3: التطبيق ----
+        failed_inserts = _apply_grouped(
+            cur,
+            [(tuple(["id"] + list(values)), [eid] + list(values.values()), row_no)
+             for eid, (values, row_no) in inserts.items()],
+            lambda cols: f"INSERT INTO employees({','.join(cols)}) VALUES({','.join(['?']*len(cols))})",
+            errors
+        )
+        row_eid = {row_no: eid for eid, (_, row_no) in inserts.items()}
+        failed_updates = _apply_grouped(
+            cur,
+            [(tuple(sets), list(sets.values()) + [eid], update_rows[eid])
+             for eid, sets in updates.items()],
+            lambda cols: f"UPDATE employees SET {', '.join(c + '=?' for c in cols)} WHERE id=?",
+            errors
+        )
+        failed_ids = {row_eid[n] for n in failed_inserts}
+        failed_ids |= {eid for eid, n in update_rows.items() if n in failed_updates}
+        for action, eid, _ in audit:
+            if eid in failed_ids:
+                if action == "IMPORT_CREATE": created -= 1
+                else: updated -= 1
+        prefix = f"[actor={actor_id}] " if actor_id else ""
+        cur.executemany("""
+            INSERT INTO audit_log(action, table_name, record_id, changes, created_at)
+            VALUES(?,?,?,?,CURRENT_TIMESTAMP)
+        """, [(action, "employees", eid, prefix + changes)
+              for action, eid, changes in audit if eid not in failed_ids])
+        # الأرصدة التي كتبها الاستيراد -> حركة 'import' لكل موظف تغيّر رصيده
+        touched = [eid for eid, (values, _) in inserts.items()
+                   if eid not in failed_ids and any(k in values for k in BALANCE_FIELDS)]
+        touched += [eid for eid, sets in updates.items()
+                    if eid not in failed_ids and any(k in sets for k in BALANCE_FIELDS)]
+        ledger.sync(conn, touched, "import", ref=f"import:{mode}", actor_id=actor_id)
+    return {"processed":processed,"created":created,"updated":updated,"errors":errors,"mode":mode}
+
+def iter_export_rows():
+    """صفوف التصدير بترتيب EXPORT_COLUMNS_ORDER، تُقرأ من المؤشر على دفعات."""
+    return iter_query(f"SELECT {', '.join(EXPORT_COLUMNS_ORDER)} FROM employees ORDER BY name")
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+تتبّع استعلامات SQL لكل طلب HTTP.
+
+- TracingConnection / TracingCursor: يسجّلان نص الجملة، عدد المعاملات، الزمن، وعدد الصفوف.
+- كل طلب له RequestTrace (في threading.local) يبدأ في before_request وينتهي في after_request.
+- الجمل الأبطأ من DB_SLOW_QUERY_MS تُسجَّل في السجل (logger msd.database.tracing).
+- تكرار نفس الجملة DB_N_PLUS_ONE_THRESHOLD مرة أو أكثر في طلب واحد = تحذير N+1.
+- الإجماليات في الترويسات X-DB-Queries / X-DB-Time وفي /api/v1/admin/db/stats.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+
+from msd.database.pool import PooledConnection
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+_settings = {
+    "slow_ms": 200.0,
+    "n_plus_one": 5,
+}
+
+# آخر الطلبات المتتبَّعة + إجماليات منذ بدء العملية
+_RECENT = deque(maxlen=200)
+_TOTALS = {
+    "requests": 0,
+    "queries": 0,
+    "time_ms": 0.0,
+    "commits": 0,
+    "slow_queries": 0,
+    "n_plus_one": 0,
+}
+
+
+def _normalize(sql):
+    return " ".join(sql.split())
+
+
+def _param_count(params):
+    try:
+        return len(params)
+    except TypeError:
+        return 0
+
+
+class RequestTrace:
+    def __init__(self, label=""):
+        self.label = label
+        self.statements = []
+        self.commits = 0
+        self.deferred_commits = 0
+        self.commit_ms = 0.0
+        self.started = time.perf_counter()
+
+    def record(self, sql, nparams, ms, rows):
+        entry = {"sql": sql, "params": nparams, "ms": ms, "rows": rows}
+        self.statements.append(entry)
+        return entry
+
+    @property
+    def total_ms(self):
+        return sum(s["ms"] for s in self.statements)
+
+    def repeated(self, threshold):
+        counts = Counter(_normalize(s["sql"]) for s in self.statements)
+        return [(sql, n) for sql, n in counts.most_common() if n >= threshold]
+
+    def summary(self):
+        return {
+            "request": self.label,
+            "queries": len(self.statements),
+            "time_ms": round(self.total_ms, 3),
+            "commits": self.commits,
+            "deferred_commits": self.deferred_commits,
+            "commit_ms": round(self.commit_ms, 3),
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "rows": sum(max(s["rows"], 0) for s in self.statements),
+            "n_plus_one": [{"sql": sql[:300], "count": n}
+                           for sql, n in self.repeated(_settings["n_plus_one"])],
+            "statements": [
+                {"sql": _normalize(s["sql"])[:300], "params": s["params"],
+                 "ms": round(s["ms"], 3), "rows": s["rows"]}
+                for s in self.statements
+            ],
+        }
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def _record(sql, nparams, started, rows):
+    ms = (time.perf_counter() - started) * 1000
+    if ms >= _settings["slow_ms"]:
+        with _lock:
+            _TOTALS["slow_queries"] += 1
+        logger.warning("استعلام بطيء %.1fms (%d params): %s", ms, nparams, _normalize(sql)[:500])
+    trace = current_trace()
+    if trace is None:
+        return None
+    return trace.record(sql, nparams, ms, rows)
+
+
+class TracingCursor(sqlite3.Cursor):
+    _entry = None
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._entry = _record(sql, _param_count(parameters), t0, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq = seq_of_parameters if isinstance(seq_of_parameters, (list, tuple)) else list(seq_of_parameters)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            self._entry = _record(sql, sum(_param_count(p) for p in seq), t0, self.rowcount)
+
+    def _fetched(self, started, n):
+        if self._entry is not None:
+            self._entry["ms"] += (time.perf_counter() - started) * 1000
+            self._entry["rows"] = max(self._entry["rows"], 0) + n
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        if self._entry is not None:
+            self._entry["rows"] = max(self._entry["rows"], 0) + 1
+        return row
+
+
+class TracingConnection(PooledConnection):
+    """conn.execute في sqlite3 لا يمر عبر cursor()؛ لذا نعيد توجيهه صراحة."""
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        trace = current_trace()
+        if self.uow_depth:
+            # مؤجَّل داخل transaction()
+            if trace is not None:
+                trace.deferred_commits += 1
+            return
+        t0 = time.perf_counter()
+        super().commit()
+        if trace is not None:
+            trace.commits += 1
+            trace.commit_ms += (time.perf_counter() - t0) * 1000
+
+
+def begin(label=""):
+    """يبدأ تتبّعاً على الخيط الحالي (طلب HTTP أو أمر قياس)."""
+    _local.trace = RequestTrace(label)
+    return _local.trace
+
+
+def end():
+    trace = current_trace()
+    _local.trace = None
+    return trace
+
+
+# ---------- دورة حياة الطلب ----------
+def start_request():
+    from flask import request
+    begin(f"{request.method} {request.path}")
+
+
+def finish_request(response):
+    trace = end()
+    if trace is None:
+        return response
+    summary = trace.summary()
+    response.headers["X-DB-Queries"] = str(summary["queries"])
+    response.headers["X-DB-Time"] = f"{summary['time_ms']:.1f}"
+    for item in summary["n_plus_one"]:
+        logger.warning("N+1 محتمل في %s: %d× %s", trace.label, item["count"], item["sql"])
+    if summary["queries"] or summary["commits"]:
+        summary["status"] = response.status_code
+        with _lock:
+            _RECENT.append(summary)
+            _TOTALS["requests"] += 1
+            _TOTALS["queries"] += summary["queries"]
+            _TOTALS["time_ms"] += summary["time_ms"]
+            _TOTALS["commits"] += summary["commits"]
+            _TOTALS["n_plus_one"] += len(summary["n_plus_one"])
+    return response
+
+
+def _discard_trace(e=None):
+    # لو فشل الطلب قبل after_request
+    _local.trace = None
+
+
+def stats(limit=50):
+    with _lock:
+        totals = dict(_TOTALS)
+        recent = list(_RECENT)[-limit:] if limit else []
+    totals["time_ms"] = round(totals["time_ms"], 3)
+    return {
+        "settings": dict(_settings),
+        "totals": totals,
+        "recent": list(reversed(recent)),
+    }
+
+
+def init_app(app):
+    _settings["slow_ms"] = float(app.config.get("DB_SLOW_QUERY_MS", _settings["slow_ms"]))
+    _settings["n_plus_one"] = int(app.config.get("DB_N_PLUS_ONE_THRESHOLD", _settings["n_plus_one"]))
+    if not app.config.get("DB_TRACE", True):
+        return
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(_discard_trace)
\ No newline at end of file
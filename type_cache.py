@@ -0,0 +1,99 @@
+"""
+ذاكرة أنواع الإجازات داخل العملية (مشتركة بين service و vacations_api و vacation_types_api
+و telegram_bot).
+
+- لقطة واحدة لكل العملية: القاموس حسب code وحسب name_ar والقائمة بترتيب id.
+- مرتبطة بختم "vacation_types" (msd.database.data_versions، v026): أي إضافة أو تعديل أو
+  حذف لنوع من أي عملية يرفع الختم، والقراءة التالية تعيد التحميل. كلفة القراءة = استعلام
+  مفتاح أساسي واحد بدل قراءة الجدول.
+- قاعدة بلا الختم (قبل v026): إعادة تحميل كل FALLBACK_TTL ثانية.
+- البوت يمرّر اتصاله (conn)؛ مسارات Flask تستخدم get_conn.
+- العناصر نسخ (dict) بأعمدة الجدول والأعلام bool؛ تعديلها لا يمسّ الذاكرة.
+"""
+import sqlite3
+import threading
+import time
+
+from msd.database import data_versions
+from msd.database.connection import get_conn
+
+FALLBACK_TTL = 60.0
+
+COLUMNS = ("id", "code", "name_ar", "fixed_duration", "max_per_request", "requires_relation",
+           "affects_annual_balance", "affects_emergency_balance")
+FLAGS = ("requires_relation", "affects_annual_balance", "affects_emergency_balance")
+
+_lock = threading.Lock()
+_snapshot = None
+_STATS = {"loads": 0, "hits": 0}
+
+
+class Snapshot:
+    def __init__(self, version, rows):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.types = []
+        for r in rows:
+            item = dict(zip(COLUMNS, r))
+            for flag in FLAGS:
+                item[flag] = bool(item[flag])
+            self.types.append(item)
+        self.by_code = {t["code"]: t for t in self.types}
+        self.by_name = {t["name_ar"].strip(): t for t in self.types if t["name_ar"]}
+
+
+def _load(conn, version):
+    try:
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM vacation_types ORDER BY id").fetchall()
+    except sqlite3.OperationalError:
+        # الجدول لم يُنشأ بعد
+        rows = []
+    return Snapshot(version, [tuple(r) for r in rows])
+
+
+def current(conn=None):
+    """اللقطة الحالية؛ يعيد التحميل إن تغيّر الختم (أو انتهت FALLBACK_TTL بلا ختم)."""
+    global _snapshot
+    if conn is None:
+        with get_conn() as c:
+            return current(c)
+    version = data_versions.get("vacation_types", conn)
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        if version is not None or time.monotonic() - snap.loaded_at < FALLBACK_TTL:
+            _STATS["hits"] += 1
+            return snap
+    snap = _load(conn, version)
+    with _lock:
+        _snapshot = snap
+        _STATS["loads"] += 1
+    return snap
+
+
+def get(code, conn=None):
+    """النوع بالكود أو None."""
+    item = current(conn).by_code.get(code)
+    return dict(item) if item else None
+
+
+def by_name_ar(label, conn=None):
+    """النوع بالاسم العربي (كما يظهر في الواجهة / أزرار البوت) أو None."""
+    item = current(conn).by_name.get((label or "").strip())
+    return dict(item) if item else None
+
+
+def all(conn=None):
+    """كل الأنواع بترتيب id."""
+    return [dict(t) for t in current(conn).types]
+
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def stats():
+    snap = _snapshot
+    return {**_STATS, "types": len(snap.types) if snap else None,
+            "version": snap.version if snap else None}
\ No newline at end of file
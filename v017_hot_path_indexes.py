@@ -0,0 +1,57 @@
+"""
+v017: فهارس المسارات الساخنة
+- طلبات الموظف حسب الحالة (التداخل، القوائم، البوت)
+- طابور رئيس القسم (الربط عبر employees.department_id)
+- الغياب حسب الموظف والفترة
+- سجل الطلب (vacation_request_history / vacation_history)
+- البحث بالرقم الوطني والرقم الوظيفي (دخول البوت + الاستيراد)
+- طلبات الخدمة للموظف (البوت)
+"""
+from msd.database.connection import get_conn
+
+# (اسم الفهرس، الجدول، الأعمدة)
+HOT_PATH_INDEXES = [
+    ("idx_vreq_emp_status", "vacation_requests", ("employee_id", "status")),
+    ("idx_vreq_status", "vacation_requests", ("status",)),
+    ("idx_employees_dept", "employees", ("department_id",)),
+    ("idx_absences_emp_range", "absences", ("employee_id", "start_date", "end_date")),
+    ("idx_vac_hist_req", "vacation_request_history", ("vacation_request_id",)),
+    ("idx_vac_history_vac", "vacation_history", ("vacation_id",)),
+    ("idx_employees_national_id", "employees", ("national_id",)),
+    ("idx_employees_serial", "employees", ("serial_number",)),
+    ("idx_service_requests_emp", "service_requests", ("employee_id",)),
+]
+
+# فهارس أصبحت بادئة لفهرس مركّب أعلاه (تكلفة كتابة بلا فائدة قراءة)
+SUPERSEDED_INDEXES = {
+    "idx_vreq_emp": "idx_vreq_emp_status",                   # v002
+    "idx_vac_req_emp": "idx_vreq_emp_status",                # v016
+    "idx_absences_emp": "idx_absences_emp_range",            # v016
+    "idx_absences_employee_start": "idx_absences_emp_range", # v014
+}
+
+
+def apply_indexes(conn):
+    """
+    ينشئ الفهارس على اتصال قائم (يُستخدم أيضاً في قاعدة الفحص التجريبية).
+    يتخطى أي فهرس جدوله أو أحد أعمدته غير موجود (قواعد قديمة).
+    """
+    cur = conn.cursor()
+    created = []
+    for name, table, cols in HOT_PATH_INDEXES:
+        cur.execute(f"PRAGMA table_info({table})")
+        existing = {r[1] for r in cur.fetchall()}
+        if not existing or not set(cols).issubset(existing):
+            continue
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(cols)})")
+        created.append(name)
+    for name, replacement in SUPERSEDED_INDEXES.items():
+        if replacement in created:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+    return created
+
+
+def up():
+    with get_conn() as conn:
+        apply_indexes(conn)
+        conn.commit()
\ No newline at end of file
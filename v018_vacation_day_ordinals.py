@@ -0,0 +1,63 @@
+"""
+v018: أعمدة ترتيب اليوم (start_ord / end_ord) في vacation_requests + فهرس التداخل
+
+- عمودان مولَّدان (VIRTUAL) = رقم اليوم اليولياني لـ start_date / end_date،
+  فتصبح مقارنة التداخل مقارنة أعداد صحيحة على فهرس (employee_id, start_ord, end_ord)
+  بدلاً من date(start_date) التي تمنع استخدام أي فهرس.
+- SQLite أقدم من 3.31 لا يدعم الأعمدة المولَّدة: أعمدة عادية + triggers تحدّثها.
+- apply() آمنة للتكرار؛ تُستدعى من الهجرة ومن init_vacations_api ومن البوت.
+"""
+import sqlite3
+
+from msd.database.connection import get_conn
+
+INDEX_NAME = "idx_vreq_emp_ord"
+
+# نفس الصيغة في msd.vacations.overlap.day_ord
+_ORD_EXPR = "CAST(julianday(date({col})) AS INTEGER)"
+
+
+def _columns(cur):
+    cur.execute("PRAGMA table_xinfo(vacation_requests)")
+    return {r[1] for r in cur.fetchall()}
+
+
+def apply(conn):
+    """يضيف الأعمدة والفهرس إن لم تكن موجودة. يعيد False إن لم يوجد الجدول."""
+    cur = conn.cursor()
+    cols = _columns(cur)
+    if not cols:
+        return False
+    if "start_ord" not in cols:
+        start_expr = _ORD_EXPR.format(col="start_date")
+        end_expr = _ORD_EXPR.format(col="end_date")
+        try:
+            cur.execute(f"ALTER TABLE vacation_requests ADD COLUMN start_ord INTEGER "
+                        f"GENERATED ALWAYS AS ({start_expr}) VIRTUAL")
+            cur.execute(f"ALTER TABLE vacation_requests ADD COLUMN end_ord INTEGER "
+                        f"GENERATED ALWAYS AS ({end_expr}) VIRTUAL")
+        except sqlite3.OperationalError:
+            cur.execute("ALTER TABLE vacation_requests ADD COLUMN start_ord INTEGER")
+            cur.execute("ALTER TABLE vacation_requests ADD COLUMN end_ord INTEGER")
+            for event in ("INSERT", "UPDATE OF start_date, end_date"):
+                name = "trg_vreq_ord_ins" if event == "INSERT" else "trg_vreq_ord_upd"
+                cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {name}
+                    AFTER {event} ON vacation_requests
+                    BEGIN
+                      UPDATE vacation_requests
+                         SET start_ord = {_ORD_EXPR.format(col="NEW.start_date")},
+                             end_ord = {_ORD_EXPR.format(col="NEW.end_date")}
+                       WHERE id = NEW.id;
+                    END
+                """)
+            cur.execute(f"UPDATE vacation_requests SET start_ord={start_expr}, end_ord={end_expr}")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} "
+                f"ON vacation_requests(employee_id, start_ord, end_ord)")
+    return True
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
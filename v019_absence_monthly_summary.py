@@ -0,0 +1,35 @@
+"""
+v019: جدول absence_monthly_summary (ملخص الغياب الشهري) + بناؤه الأولي من absences.
+
+- apply() آمنة للتكرار: تُنشئ الجدول وتبنيه فقط إن لم يكن موجوداً؛
+  تُستدعى من الهجرة ومن init_vacations_api.
+- بعد ذلك تحدّثه service_absences تزايدياً؛ إعادة البناء الكاملة: manage.py rebuild-absence-summary.
+"""
+from msd.absences import monthly_summary
+from msd.database.connection import get_conn
+
+
+def _exists(cur, table):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def apply(conn):
+    """يعيد True إن أُنشئ الجدول الآن، False إن كان موجوداً أو لا يوجد جدول absences."""
+    cur = conn.cursor()
+    if _exists(cur, monthly_summary.TABLE) or not _exists(cur, "absences"):
+        return False
+    cur.execute("PRAGMA table_info(absences)")
+    cols = {r[1] for r in cur.fetchall()}
+    if "start_date" in cols and "end_date" in cols:
+        range_select = "a.start_date, a.end_date"
+    else:
+        range_select = "a.date AS start_date, a.date AS end_date"
+    monthly_summary.rebuild(conn, range_select)
+    return True
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
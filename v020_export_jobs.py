@@ -0,0 +1,34 @@
+"""
+v020: جدول export_jobs لمهام التصدير في الخلفية (msd.utils.export_jobs).
+
+- apply() آمنة للتكرار؛ تُستدعى من الهجرة ومن export_jobs.init_app.
+"""
+from msd.database.connection import get_conn
+
+
+def apply(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS export_jobs(
+          id TEXT PRIMARY KEY,
+          kind TEXT NOT NULL,
+          params TEXT,
+          status TEXT NOT NULL,
+          requested_by INTEGER,
+          filename TEXT,
+          mimetype TEXT,
+          path TEXT,
+          size INTEGER,
+          error TEXT,
+          created_at TEXT NOT NULL,
+          started_at TEXT,
+          finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_created ON export_jobs(created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_user ON export_jobs(requested_by, created_at)")
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+v021: سجل الأرصدة balance_ledger + balance_snapshots (msd.balances.ledger).
+
+- apply() آمنة للتكرار: تُنشئ الجدولين، وعند الإنشاء الأول فقط تسجّل حركة 'opening'
+  بالقيم الحالية لأعمدة الرصيد كي يطابق مجموع السجل الأعمدة من البداية؛
+  تُستدعى من الهجرة ومن init_vacations_api.
+"""
+from msd.balances import ledger
+from msd.database.connection import get_conn
+
+
+def _exists(cur, table):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def apply(conn):
+    """يعيد True إن أُنشئ السجل الآن، False إن كان موجوداً أو لا يوجد جدول employees."""
+    cur = conn.cursor()
+    if _exists(cur, ledger.LEDGER) or not _exists(cur, "employees"):
+        return False
+    ledger.create_tables(conn)
+    cur.execute("PRAGMA table_info(employees)")
+    cols = {r[1] for r in cur.fetchall()}
+    ledger.seed_opening(conn, [c for c in ledger.BALANCE_COLUMNS if c in cols])
+    return True
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
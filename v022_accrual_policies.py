@@ -0,0 +1,82 @@
+"""
+v022: سياسات التراكم (accrual_policies) وسجل تشغيلها (accrual_policy_runs) لمحرك msd.balances.accrual.
+
+- apply() آمنة للتكرار؛ عند الإنشاء الأول فقط:
+  * سياستان بقواعد التنفيذين السابقين: annual (annual_balance، 20 سنة، كل الموظفين)
+    و vacation (vacation_balance، 25 سنة، النشطون فقط)؛ كلاهما 30/45 يوماً في السنة.
+  * أشهر accrual_runs / accrual_log السابقة تُنسخ كتشغيلات منتهية كي لا تُراكَم مرة ثانية.
+- تُستدعى من الهجرة ومن init_vacations_api.
+"""
+from msd.database.connection import get_conn
+
+DEFAULT_POLICIES = [
+    # code, target_column, senior_years, junior_cap, senior_cap, prorate_hire_month, active_only
+    ("annual", "annual_balance", 20, 30, 45, 0, 0),
+    ("vacation", "vacation_balance", 25, 30, 45, 0, 1),
+]
+
+# الجدول القديم لكل سياسة
+LEGACY_RUNS = {"annual": "accrual_runs", "vacation": "accrual_log"}
+
+
+def _exists(cur, table):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def apply(conn):
+    """يعيد True إن أُنشئت الجداول الآن."""
+    cur = conn.cursor()
+    if _exists(cur, "accrual_policies"):
+        return False
+    cur.execute("""
+        CREATE TABLE accrual_policies(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          code TEXT UNIQUE NOT NULL,
+          target_column TEXT NOT NULL,
+          senior_years INTEGER NOT NULL,
+          junior_cap REAL NOT NULL,
+          senior_cap REAL NOT NULL,
+          prorate_hire_month INTEGER NOT NULL DEFAULT 0,
+          active_only INTEGER NOT NULL DEFAULT 0,
+          enabled INTEGER NOT NULL DEFAULT 1,
+          updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS accrual_policy_runs(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          policy_id INTEGER NOT NULL,
+          year INTEGER NOT NULL,
+          month INTEGER NOT NULL,
+          status TEXT NOT NULL,
+          last_employee_id INTEGER NOT NULL DEFAULT 0,
+          employees INTEGER NOT NULL DEFAULT 0,
+          days REAL NOT NULL DEFAULT 0,
+          started_at TEXT,
+          finished_at TEXT,
+          duration_ms REAL,
+          UNIQUE(policy_id, year, month)
+        )
+    """)
+    cur.executemany("""
+        INSERT INTO accrual_policies(code, target_column, senior_years, junior_cap, senior_cap,
+                                     prorate_hire_month, active_only)
+        VALUES (?,?,?,?,?,?,?)
+    """, DEFAULT_POLICIES)
+    for code, table in LEGACY_RUNS.items():
+        if not _exists(cur, table):
+            continue
+        cur.execute(f"""
+            INSERT OR IGNORE INTO accrual_policy_runs(policy_id, year, month, status)
+            SELECT p.id, r.year, r.month, 'done'
+              FROM {table} r, accrual_policies p
+             WHERE p.code = ? AND r.year IS NOT NULL AND r.month IS NOT NULL
+        """, (code,))
+    return True
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+v023: جداول المجدول الداخلي (msd.utils.scheduler) وسجل إعادة ضبط الأرصدة السنوية.
+
+- scheduler_jobs: المهام المسجّلة (الجدول الزمني، التذبذب، موعد التشغيل القادم، الحجز).
+- scheduler_runs: سجل التشغيلات بمدتها وحالتها ونتيجتها.
+- scheduler_leases: قفل القائد (عملية واحدة من العمّال تشغّل المهام).
+- balance_resets: (عمود، سنة) أُعيد ضبطه (msd.balances.reset)؛ عند الإنشاء الأول
+  تُنسخ سنوات emergency_reset_log القديمة، وتُسجَّل السنة الحالية كمنفّذة كي لا
+  يصفّر أول تشغيل للمجدول الأرصدة في منتصف السنة (--force للتنفيذ يدوياً).
+- apply() آمنة للتكرار؛ تُستدعى من الهجرة ومن scheduler.init_app.
+"""
+from datetime import date
+
+from msd.database.connection import get_conn
+
+RESET_COLUMNS = ("emergency_balance", "emergency_vacation_balance")
+
+
+def _exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                        (table,)).fetchone() is not None
+
+
+def apply(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_jobs(
+          name TEXT PRIMARY KEY,
+          schedule TEXT NOT NULL,
+          jitter_seconds INTEGER NOT NULL DEFAULT 0,
+          enabled INTEGER NOT NULL DEFAULT 1,
+          next_run_at TEXT NOT NULL,
+          claimed_by TEXT,
+          claimed_at TEXT,
+          last_run_at TEXT,
+          last_status TEXT,
+          last_duration_ms REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_runs(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          job TEXT NOT NULL,
+          trigger TEXT NOT NULL,
+          scheduled_for TEXT,
+          owner TEXT,
+          status TEXT NOT NULL,
+          started_at TEXT NOT NULL,
+          finished_at TEXT,
+          duration_ms REAL,
+          result TEXT,
+          error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scheduler_runs_job ON scheduler_runs(job, started_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_leases(
+          name TEXT PRIMARY KEY,
+          owner TEXT NOT NULL,
+          acquired_at REAL NOT NULL,
+          expires_at REAL NOT NULL
+        )
+    """)
+    if not _exists(conn, "balance_resets"):
+        conn.execute("""
+            CREATE TABLE balance_resets(
+              balance TEXT NOT NULL,
+              year INTEGER NOT NULL,
+              employees INTEGER,
+              reset_at TEXT,
+              PRIMARY KEY(balance, year)
+            )
+        """)
+        if _exists(conn, "emergency_reset_log"):
+            conn.execute("""
+                INSERT OR IGNORE INTO balance_resets(balance, year)
+                SELECT 'emergency_vacation_balance', year FROM emergency_reset_log
+                 WHERE year IS NOT NULL
+            """)
+        conn.executemany("INSERT OR IGNORE INTO balance_resets(balance, year) VALUES (?,?)",
+                         [(c, date.today().year) for c in RESET_COLUMNS])
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
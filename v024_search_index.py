@@ -0,0 +1,33 @@
+"""
+v024: فهارس البحث النصي (FTS5) للموظفين والطلبات والغياب (msd.utils.search).
+
+- apply() آمنة للتكرار: تنشئ {table}_fts ومشغّلات المزامنة وتملؤه عند الإنشاء الأول
+  فقط؛ تُستدعى من الهجرة ومن init_vacations_api.
+- SQLite بلا FTS5: تحذير فقط، والبحث يبقى LIKE.
+"""
+import logging
+import sqlite3
+
+from msd.database.connection import get_conn
+from msd.utils import search
+
+logger = logging.getLogger(__name__)
+
+
+def apply(conn):
+    """يعيد الجداول التي أُنشئ فهرسها الآن."""
+    created = []
+    for table in search.INDEXES:
+        try:
+            if search.create_index(conn, table):
+                created.append(table)
+        except sqlite3.OperationalError as e:
+            logger.warning("فهرس البحث %s غير متاح: %s", table, e)
+            break
+    return created
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
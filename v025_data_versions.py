@@ -0,0 +1,25 @@
+"""
+v025: أختام إصدار البيانات (msd.database.data_versions) لمجموعة الموظفين.
+
+- "employees": يُرفع عند إضافة موظف أو حذفه أو تغيّر الاسم / الرقم الوظيفي / الحالة /
+  القسم؛ فهرس البحث الفوري (msd.employees.lookup) يعيد البناء عند تغيّره.
+- apply() آمنة للتكرار؛ تُستدعى من الهجرة ومن init_vacations_api.
+"""
+from msd.database.connection import get_conn
+from msd.database import data_versions
+
+EMPLOYEE_COLUMNS = ("name", "serial_number", "status", "department_id")
+
+
+def apply(conn):
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(employees)").fetchall()}
+    if not existing:
+        return
+    data_versions.ensure(conn, "employees", "employees",
+                         [c for c in EMPLOYEE_COLUMNS if c in existing])
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
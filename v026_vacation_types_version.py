@@ -0,0 +1,21 @@
+"""
+v026: ختم إصدار أنواع الإجازات (msd.database.data_versions) لذاكرة msd.vacations.type_cache.
+
+- "vacation_types": يُرفع عند أي إضافة أو تعديل أو حذف في vacation_types، من أي عملية
+  (الواجهة، البوت، manage.py seed-vacation-types، السكربتات).
+- apply() آمنة للتكرار وتتخطى القاعدة التي لم يُنشأ فيها الجدول بعد؛ تُستدعى من الهجرة
+  ومن init_vacations_api ومن البوت.
+"""
+from msd.database.connection import get_conn
+from msd.database import data_versions
+
+
+def apply(conn):
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='vacation_types'").fetchone():
+        data_versions.ensure(conn, "vacation_types", "vacation_types")
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+v027: ختم إصدار دليل الأقسام (msd.database.data_versions) لذاكرة msd.departments.directory.
+
+- "departments": يُرفع عند أي تغيير في departments، وعند تغيّر اسم موظف رئيس قسم أو حذفه،
+  وعند إضافة أو حذف أو تعديل (username / role / department_id) مستخدم بدور department_head.
+- إضافة الموظفين وتعديل غير الرؤساء لا ترفعه: استيراد مئات الصفوف لا يفرغ الدليل صفاً صفاً.
+- apply() آمنة للتكرار وتتخطى الجداول غير الموجودة بعد؛ تحذف مشغّلات النسخة الأولى غير
+  المشروطة وتُنشئ المشروطة. تُستدعى من الهجرة ومن init_vacations_api.
+"""
+from msd.database.connection import get_conn
+from msd.database import data_versions
+
+# أعمدة رئيس القسم في departments التي تشير إلى employees.id
+HEAD_COLUMNS = ("department_head_id", "department_head_employee_id")
+
+IS_HEAD_USER = "{row}.role = 'department_head'"
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _drop_unconditional(conn, table):
+    """مشغّلات النسخة الأولى (كل صف يرفع الختم) لا تُستبدل بـ IF NOT EXISTS: تُحذف أولاً."""
+    for trigger, sql in conn.execute("""
+        SELECT name, sql FROM sqlite_master
+         WHERE type='trigger' AND tbl_name=? AND name IN (?, ?, ?)
+    """, (table, *(f"{table}_ver_departments_{s}" for s in ("ai", "ad", "au")))).fetchall():
+        if "department_head" not in (sql or ""):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def _head_employee(dept_cols, ref):
+    cols = [c for c in HEAD_COLUMNS if c in dept_cols]
+    if not cols:
+        return None
+    return ("EXISTS (SELECT 1 FROM departments WHERE "
+            + " OR ".join(f"{c} = {ref}" for c in cols) + ")")
+
+
+def apply(conn):
+    dept_cols = _columns(conn, "departments")
+    if dept_cols:
+        data_versions.ensure(conn, "departments", "departments")
+
+    if "name" in _columns(conn, "employees"):
+        _drop_unconditional(conn, "employees")
+        deleted, renamed = _head_employee(dept_cols, "old.id"), _head_employee(dept_cols, "new.id")
+        if deleted:
+            data_versions.ensure(conn, "departments", "employees", ("name",),
+                                 when={"delete": deleted, "update": renamed})
+
+    user_cols = _columns(conn, "users")
+    if user_cols:
+        _drop_unconditional(conn, "users")
+        watched = [c for c in ("username", "role", "department_id") if c in user_cols]
+        if "role" in user_cols:
+            when = {"insert": IS_HEAD_USER.format(row="new"),
+                    "delete": IS_HEAD_USER.format(row="old"),
+                    "update": f"{IS_HEAD_USER.format(row='old')} OR {IS_HEAD_USER.format(row='new')}"}
+        else:
+            when = None
+        data_versions.ensure(conn, "departments", "users", watched, when=when)
+
+
+def up():
+    with get_conn() as conn:
+        apply(conn)
+        conn.commit()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required
 from msd.database.connection import get_conn
+from msd.vacations import type_cache
 
 vacation_types_api_bp = Blueprint("vacation_types_api_bp", __name__, url_prefix="/api/v1")
 
@@ -30,23 +31,15 @@ def seed_if_empty(conn):
 @vacation_types_api_bp.get("/vacation-types")
 @login_required
 def list_vacation_types():
-    with get_conn() as conn:
-        seed_if_empty(conn)
-        rows = conn.execute("""
-          SELECT code,name_ar,fixed_duration,max_per_request,
-                 requires_relation,affects_annual_balance,affects_emergency_balance
-            FROM vacation_types
-            ORDER BY name_ar
-        """).fetchall()
+    types = type_cache.all()
+    if not types:
+        # الزرع فقط حين يكون الجدول فارغاً (لا COUNT مع كل طلب)
+        with get_conn() as conn:
+            seed_if_empty(conn)
+        types = type_cache.all()
     out=[]
-    for r in rows:
-        out.append({
-            "code": r[0],
-            "name_ar": r[1],
-            "fixed_duration": r[2],
-            "max_per_request": r[3],
-            "requires_relation": bool(r[4]),
-            "affects_annual_balance": bool(r[5]),
-            "affects_emergency_balance": bool(r[6])
-        })
+    for t in sorted(types, key=lambda t: t["name_ar"] or ""):
+        out.append({k: t[k] for k in ("code", "name_ar", "fixed_duration", "max_per_request",
+                                      "requires_relation", "affects_annual_balance",
+                                      "affects_emergency_balance")})
     return jsonify(out)
\ No newline at end of file
@@ -1,416 +1,505 @@
-import sqlite3
-from datetime import datetime, date
-from flask import Blueprint, request, jsonify, current_app
-from flask_login import login_required, current_user
-from msd.database.connection import get_conn
-
-# Blueprint الرئيسي للإجازات
-vacations_api_bp = Blueprint("vacations_api_bp", __name__, url_prefix="/api/v1/vacations")
-
-# الحالات
-S_PENDING_DEPT = "pending_dept"
-S_PENDING_MANAGER = "pending_manager"
-S_APPROVED = "approved"
-S_REJECTED_DEPT = "rejected_dept"
-S_REJECTED_MANAGER = "rejected_manager"
-S_CANCELLED = "cancelled"
-PENDING_SET = {S_PENDING_DEPT, S_PENDING_MANAGER}
-
-# التحويل العربي → الأكواد
-AR_TO_CODE = {
-    "سنوية": "annual",
-    "طارئة": "emergency",
-    "وفاة الزوج": "death_spouse",
-    "وفاة درجة أولى": "death1",
-    "وفاة درجة ثانية": "death2",
-    "حج": "hajj",
-    "زواج": "marriage",
-    "وضع": "birth_single",
-    "وضع (عادي)": "birth_single",
-    "وضع (توأم)": "birth_twins",
-    "مرضية": "sick",
-}
-
-DEATH1_RELATIONS = {"أب","أم","ابن","ابنة","جد","جدة"}
-
-def user_is_manager():
-    return current_user.is_authenticated and current_user.role in ("manager","admin")
-
-def user_is_dept_head():
-    return current_user.is_authenticated and current_user.role == "department_head"
-
-def ensure_history(vac_id, action, from_status, to_status, note=""):
-    with get_conn() as conn:
-        conn.execute("""
-          INSERT INTO vacation_history
-            (vacation_id, action, from_status, to_status, actor_id, actor_role, note, created_at)
-          VALUES (?,?,?,?,?,?,?,?)
-        """,(vac_id, action, from_status, to_status,
-             getattr(current_user,"employee_id",None),
-             getattr(current_user,"role",None),
-             note, datetime.utcnow().isoformat(timespec="seconds")))
-        conn.commit()
-
-def fetch_vacation(vac_id:int):
-    with get_conn() as conn:
-        return conn.execute("""
-          SELECT vr.*, e.name AS employee_name,
-                 e.vacation_balance,
-                 COALESCE(e.emergency_vacation_balance, e.emergency_balance,0) AS emergency_balance
-            FROM vacation_requests vr
-            JOIN employees e ON e.id=vr.employee_id
-           WHERE vr.id=?""",(vac_id,)).fetchone()
-
-def overlap_exists(emp_id,start,end, exclude_id=None):
-    sql = """
-      SELECT 1 FROM vacation_requests
-       WHERE employee_id=?
-         AND status NOT IN (?, ?, ?)
-         AND NOT (date(end_date)<date(?) OR date(start_date)>date(?))
-    """
-    params = [emp_id,S_CANCELLED,S_REJECTED_DEPT,S_REJECTED_MANAGER,start,end]
-    if exclude_id:
-        sql += " AND id != ?"
-        params.append(exclude_id)
-    with get_conn() as conn:
-        return conn.execute(sql, params).fetchone() is not None
-
-def compute_days(start,end):
-    d1=date.fromisoformat(start); d2=date.fromisoformat(end)
-    return (d2-d1).days+1
-
-def load_type(code):
-    with get_conn() as conn:
-        return conn.execute("""
-          SELECT code,name_ar,fixed_duration,max_per_request,requires_relation,
-                 affects_annual_balance,affects_emergency_balance
-            FROM vacation_types WHERE code=?""",(code,)).fetchone()
-
-def adjust_balances_on_approve(vac_row):
-    code = vac_row["type_code"]
-    days = vac_row["requested_days"]
-    with get_conn() as conn:
-        cols = {r[1] for r in conn.execute("PRAGMA table_info(employees)")}
-        if code=="annual":
-            conn.execute("UPDATE employees SET vacation_balance = vacation_balance - ? WHERE id=?",
-                         (days, vac_row["employee_id"]))
-        elif code=="emergency":
-            if "emergency_vacation_balance" in cols:
-                conn.execute("UPDATE employees SET emergency_vacation_balance=COALESCE(emergency_vacation_balance,0)-? WHERE id=?",
-                             (days, vac_row["employee_id"]))
-            elif "emergency_balance" in cols:
-                conn.execute("UPDATE employees SET emergency_balance=COALESCE(emergency_balance,0)-? WHERE id=?",
-                             (days, vac_row["employee_id"]))
-        conn.commit()
-
-def normalize_type(label: str):
-    if not label: return None
-    return AR_TO_CODE.get(label.strip(), label.strip())
-
-@vacations_api_bp.get("")
-@login_required
-def list_vacations():
-    args=request.args
-    page=max(int(args.get("page",1)),1)
-    limit=min(max(int(args.get("limit",10)),1),200)
-    off=(page-1)*limit
-    filters=[]; params=[]
-    if not user_is_manager() and not user_is_dept_head():
-        filters.append("vr.employee_id=?"); params.append(current_user.employee_id)
-    else:
-        if args.get("employee_id"):
-            filters.append("vr.employee_id=?"); params.append(args.get("employee_id"))
-    if args.get("status"):
-        filters.append("vr.status=?"); params.append(args.get("status"))
-    if args.get("type_code") or args.get("type"):
-        tt = args.get("type_code") or args.get("type")
-        filters.append("vr.type_code=?"); params.append(tt)
-    if args.get("q"):
-        filters.append("(vr.notes LIKE ? OR e.name LIKE ? OR vr.type_code LIKE ?)")
-        q=f"%{args.get('q')}%"; params.extend([q,q,q])
-    where="WHERE "+" AND ".join(filters) if filters else ""
-    base = "FROM vacation_requests vr JOIN employees e ON e.id=vr.employee_id"
-    sql_count="SELECT COUNT(*) "+base+" "+where
-    sql_data=f"""
-      SELECT vr.id, vr.employee_id, e.name, vr.type_code,
-             vr.start_date, vr.end_date, vr.requested_days,
-             vr.status, vr.rejection_reason, vr.notes, vr.created_at
-        {base} {where}
-       ORDER BY vr.id DESC
-       LIMIT ? OFFSET ?
-    """
-    with get_conn() as conn:
-        total=conn.execute(sql_count,params).fetchone()[0]
-        rows=conn.execute(sql_data,params+[limit,off]).fetchall()
-    def rdict(r):
-        return {
-            "id":r[0],"employee_id":r[1],"employee_name":r[2],"type_code":r[3],
-            "start_date":r[4],"end_date":r[5],"requested_days":r[6],
-            "status":r[7],"rejection_reason":r[8],"notes":r[9],"created_at":r[10]
-        }
-    return jsonify(total=total,page=page,limit=limit,pages=(total+limit-1)//limit,
-                   items=[rdict(r) for r in rows])
-
-@vacations_api_bp.post("")
-@login_required
-def create_vacation():
-    data = request.get_json(force=True)
-    emp_id = data.get("employee_id") or getattr(current_user,"employee_id",None)
-    if not emp_id:
-        return jsonify(error="employee_id مطلوب"),400
-
-    raw_type = data.get("type") or data.get("type_code")
-    if not raw_type:
-        return jsonify(error="نوع الإجازة مطلوب"),400
-    type_code = normalize_type(raw_type)
-
-    relation = (data.get("relation") or "").strip() or None
-    notes = (data.get("notes") or "").strip()
-    start_date = data.get("start_date")
-    end_date = data.get("end_date")
-    if not (start_date and end_date):
-        return jsonify(error="تواريخ ناقصة"),400
-
-    meta = load_type(type_code)
-    if not meta:
-        return jsonify(error="نوع غير موجود"),400
-
-    # وفاة الزوج (ثابت 130)
-    if type_code=="death_spouse":
-        relation = "زوج"
-        start = date.fromisoformat(start_date)
-        end_date = date.fromordinal(start.toordinal()+130-1).isoformat()
-        requested_days = 130
-    else:
-        if meta["fixed_duration"]:
-            fd=meta["fixed_duration"]
-            s=date.fromisoformat(start_date)
-            end_date = date.fromordinal(s.toordinal()+fd-1).isoformat()
-        requested_days = compute_days(start_date,end_date)
-
-    if type_code=="death1":
-        if not relation or relation not in DEATH1_RELATIONS:
-            return jsonify(error="العلاقة مطلوبة وصحيحة (وفاة درجة أولى)"),400
-    if type_code=="death2" and not relation:
-        relation="أقارب آخرون"
-
-    if meta["max_per_request"] and requested_days>meta["max_per_request"]:
-        return jsonify(error=f"الحد الأقصى {meta['max_per_request']}"),400
-
-    if overlap_exists(emp_id,start_date,end_date):
-        return jsonify(error="تداخل مع إجازة أخرى"),400
-
-    # تحقق الرصيد
-    with get_conn() as conn:
-        erow = conn.execute("""
-          SELECT vacation_balance,
-                 COALESCE(emergency_vacation_balance, emergency_balance,0) AS emer
-            FROM employees WHERE id=?""",(emp_id,)).fetchone()
-        if not erow:
-            return jsonify(error="الموظف غير موجود"),404
-        annual_bal = erow[0] or 0
-        emer_bal = erow[1] or 0
-        if type_code=="annual" and requested_days>annual_bal:
-            return jsonify(error="رصيد السنوية غير كافٍ"),400
-        if type_code=="emergency" and requested_days>emer_bal:
-            return jsonify(error="رصيد الطارئة غير كافٍ"),400
-
-    if not user_is_manager() and not user_is_dept_head():
-        if emp_id != getattr(current_user,"employee_id",None):
-            return jsonify(error="غير مسموح"),403
-
-    with get_conn() as conn:
-        cur=conn.cursor()
-        cur.execute("""
-          INSERT INTO vacation_requests
-            (employee_id,type_code,relation,start_date,end_date,requested_days,status,notes,created_at)
-          VALUES (?,?,?,?,?,?,?,?,?)
-        """,(emp_id,type_code,relation,start_date,end_date,requested_days,
-             S_PENDING_DEPT,notes,datetime.utcnow().isoformat(timespec="seconds")))
-        vid=cur.lastrowid
-        conn.commit()
-    ensure_history(vid,"create",None,S_PENDING_DEPT,"")
-    return jsonify(id=vid,type_code=type_code,status=S_PENDING_DEPT,
-                   requested_days=requested_days,start_date=start_date,end_date=end_date)
-
-@vacations_api_bp.post("/<int:vac_id>/approve")
-@login_required
-def approve(vac_id):
-    r=fetch_vacation(vac_id)
-    if not r: return jsonify(error="غير موجود"),404
-    st=r["status"]
-    if user_is_dept_head() and st==S_PENDING_DEPT:
-        with get_conn() as conn:
-            conn.execute("UPDATE vacation_requests SET status=? WHERE id=?",(S_PENDING_MANAGER,vac_id))
-            conn.commit()
-        ensure_history(vac_id,"approve_dept",st,S_PENDING_MANAGER,"")
-        return jsonify(success=True,status=S_PENDING_MANAGER)
-    if user_is_manager() and st==S_PENDING_MANAGER:
-        with get_conn() as conn:
-            conn.execute("UPDATE vacation_requests SET status=? WHERE id=?",(S_APPROVED,vac_id))
-            conn.commit()
-        adjust_balances_on_approve(r)
-        ensure_history(vac_id,"approve_manager",st,S_APPROVED,"")
-        return jsonify(success=True,status=S_APPROVED)
-    return jsonify(error="حالة/صلاحية غير صالحة"),400
-
-@vacations_api_bp.post("/<int:vac_id>/reject")
-@login_required
-def reject(vac_id):
-    r=fetch_vacation(vac_id)
-    if not r: return jsonify(error="غير موجود"),404
-    st=r["status"]
-    body=request.get_json(force=True)
-    reason=(body.get("reason") or "").strip()
-    if not reason: return jsonify(error="سبب مطلوب"),400
-    if user_is_dept_head() and st==S_PENDING_DEPT:
-        new=S_REJECTED_DEPT
-    elif user_is_manager() and st==S_PENDING_MANAGER:
-        new=S_REJECTED_MANAGER
-    else:
-        return jsonify(error="غير مصرح"),403
-    with get_conn() as conn:
-        conn.execute("UPDATE vacation_requests SET status=?, rejection_reason=? WHERE id=?",
-                     (new,reason,vac_id))
-        conn.commit()
-    ensure_history(vac_id,"reject",st,new,reason)
-    return jsonify(success=True,status=new)
-
-@vacations_api_bp.post("/<int:vac_id>/cancel")
-@login_required
-def cancel(vac_id):
-    r=fetch_vacation(vac_id)
-    if not r: return jsonify(error="غير موجود"),404
-    if r["status"] not in PENDING_SET and r["status"]!=S_APPROVED:
-        return jsonify(error="لا يمكن الإلغاء"),400
-    if r["employee_id"]!=getattr(current_user,"employee_id",None) and not (user_is_manager() or user_is_dept_head()):
-        return jsonify(error="غير مصرح"),403
-    with get_conn() as conn:
-        conn.execute("UPDATE vacation_requests SET status=? WHERE id=?",(S_CANCELLED,vac_id))
-        conn.commit()
-    ensure_history(vac_id,"cancel",r["status"],S_CANCELLED,"")
-    return jsonify(success=True,status=S_CANCELLED)
-
-@vacations_api_bp.get("/<int:vac_id>/history")
-@login_required
-def history(vac_id):
-    r=fetch_vacation(vac_id)
-    if not r: return jsonify(error="غير موجود"),404
-    with get_conn() as conn:
-        rows=conn.execute("""
-          SELECT action,from_status,to_status,actor_id,actor_role,note,created_at
-            FROM vacation_history WHERE vacation_id=? ORDER BY id
-        """,(vac_id,)).fetchall()
-    out=[]
-    for h in rows:
-        out.append({
-            "action":h[0],"from_status":h[1],"to_status":h[2],
-            "actor_id":h[3],"actor_role":h[4],"note":h[5],"created_at":h[6]
-        })
-    return jsonify(out)
-
-# ===================== قسم رئيس القسم: API قائمة طلبات قسمه =====================
-
-@login_required
-def dept_vacations():
-    """
-    قائمة طلبات الإجازة لموظفي قسم رئيس القسم الحالي.
-    تُرجع Array من العناصر (وليس كائن paginated) لتوافق واجهة dept_head.
-    يسمح باختيار status اختياريًا.
-    """
-    if getattr(current_user, "role", "") != "department_head":
-        return jsonify({"error":"forbidden"}), 403
-
-    dept_id = getattr(current_user, "department_id", None)
-    if not dept_id:
-        return jsonify([])
-
-    status = request.args.get("status")
-    limit = request.args.get("limit", 500, type=int)
-    limit = min(max(limit, 1), 1000)
-
-    where = "WHERE e.department_id=?"
-    params = [dept_id]
-    if status:
-        where += " AND vr.status=?"
-        params.append(status)
-
-    sql = f"""
-      SELECT vr.id, vr.employee_id, e.name AS employee_name, vr.type_code,
-             vr.start_date, vr.end_date, vr.requested_days,
-             vr.status, vr.rejection_reason, vr.notes, vr.created_at
-        FROM vacation_requests vr
-        JOIN employees e ON e.id=vr.employee_id
-        {where}
-       ORDER BY vr.id DESC
-       LIMIT ?
-    """
-    params.append(limit)
-
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
-
-    items = []
-    for r in rows:
-        items.append({
-            "id": r[0],
-            "employee_id": r[1],
-            "employee_name": r[2],
-            "type_code": r[3],
-            "start_date": r[4],
-            "end_date": r[5],
-            "requested_days": r[6],
-            "status": r[7],
-            "rejection_reason": r[8],
-            "notes": r[9],
-            "created_at": r[10],
-        })
-    return jsonify(items)
-
-# ===================== تهيئة =====================
-
-def init_vacations_api(app):
-    """
-    تهيئة جداول أساسية + تسجيل مسار رئيس القسم دون الحاجة لتعديل __init__.py
-    """
-    with app.app_context():
-        # جداول
-        with get_conn() as conn:
-            conn.execute("""
-              CREATE TABLE IF NOT EXISTS vacation_requests(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                type_code TEXT NOT NULL,
-                relation TEXT,
-                start_date TEXT NOT NULL,
-                end_date TEXT NOT NULL,
-                requested_days INTEGER NOT NULL,
-                status TEXT NOT NULL,
-                rejection_reason TEXT,
-                notes TEXT,
-                created_at TEXT NOT NULL
-              )
-            """)
-            conn.execute("""
-              CREATE TABLE IF NOT EXISTS vacation_history(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                vacation_id INTEGER NOT NULL,
-                action TEXT,
-                from_status TEXT,
-                to_status TEXT,
-                actor_id INTEGER,
-                actor_role TEXT,
-                note TEXT,
-                created_at TEXT NOT NULL
-              )
-            """)
-            conn.commit()
-
-        # تسجيل مسار واجهة رئيس القسم: GET /api/v1/dept/vacations
-        # يُسجَّل هنا كي لا نحتاج Blueprints إضافية أو تعديل التسجيل المركزي.
-        app.add_url_rule(
-            "/api/v1/dept/vacations",
-            endpoint="dept_vacations_list",
-            view_func=dept_vacations,
-            methods=["GET"]
-        )
\ No newline at end of file
+import sqlite3
+from datetime import datetime, date, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+from msd.database.connection import get_conn, readonly_route, transaction
+from msd.database import tracing, schema_registry
+from msd.absences import report_cache
+from msd.balances import ledger
+from msd.database.migrations import (v018_vacation_day_ordinals, v019_absence_monthly_summary,
+                                     v021_balance_ledger, v022_accrual_policies, v024_search_index,
+                                     v025_data_versions, v026_vacation_types_version,
+                                     v027_departments_version)
+from msd.vacations import overlap, occupancy, type_cache
+from msd.api.db_stats_api import db_stats_api_bp
+from msd.api.export_jobs_api import export_jobs_api_bp
+from msd.utils import export_jobs, scheduler, pagination, search
+from msd.employees import lookup
+
+# Blueprint الرئيسي للإجازات
+vacations_api_bp = Blueprint("vacations_api_bp", __name__, url_prefix="/api/v1/vacations")
+
+# الحالات
+S_PENDING_DEPT = "pending_dept"
+S_PENDING_MANAGER = "pending_manager"
+S_APPROVED = "approved"
+S_REJECTED_DEPT = "rejected_dept"
+S_REJECTED_MANAGER = "rejected_manager"
+S_CANCELLED = "cancelled"
+PENDING_SET = {S_PENDING_DEPT, S_PENDING_MANAGER}
+
+# التحويل العربي → الأكواد
+AR_TO_CODE = {
+    "سنوية": "annual",
+    "طارئة": "emergency",
+    "وفاة الزوج": "death_spouse",
+    "وفاة درجة أولى": "death1",
+    "وفاة درجة ثانية": "death2",
+    "حج": "hajj",
+    "زواج": "marriage",
+    "وضع": "birth_single",
+    "وضع (عادي)": "birth_single",
+    "وضع (توأم)": "birth_twins",
+    "مرضية": "sick",
+}
+
+DEATH1_RELATIONS = {"أب","أم","ابن","ابنة","جد","جدة"}
+
+def user_is_manager():
+    return current_user.is_authenticated and current_user.role in ("manager","admin")
+
+def user_is_dept_head():
+    return current_user.is_authenticated and current_user.role == "department_head"
+
+def ensure_history(vac_id, action, from_status, to_status, note=""):
+    with get_conn() as conn:
+        conn.execute("""
+          INSERT INTO vacation_history
+            (vacation_id, action, from_status, to_status, actor_id, actor_role, note, created_at)
+          VALUES (?,?,?,?,?,?,?,?)
+        """,(vac_id, action, from_status, to_status,
+             getattr(current_user,"employee_id",None),
+             getattr(current_user,"role",None),
+             note, datetime.utcnow().isoformat(timespec="seconds")))
+        conn.commit()
+
+def fetch_vacation(vac_id:int):
+    with get_conn() as conn:
+        return conn.execute("""
+          SELECT vr.*, e.name AS employee_name,
+                 e.vacation_balance,
+                 COALESCE(e.emergency_vacation_balance, e.emergency_balance,0) AS emergency_balance
+            FROM vacation_requests vr
+            JOIN employees e ON e.id=vr.employee_id
+           WHERE vr.id=?""",(vac_id,)).fetchone()
+
+def overlap_exists(emp_id,start,end, exclude_id=None):
+    with get_conn() as conn:
+        return overlap.has_conflict(conn, emp_id, start, end, exclude_id)
+
+def compute_days(start,end):
+    d1=date.fromisoformat(start); d2=date.fromisoformat(end)
+    return (d2-d1).days+1
+
+def load_type(code):
+    return type_cache.get(code)
+
+def adjust_balances_on_approve(conn, vac_row):
+    """خصم الرصيد عبر سجل الأرصدة؛ داخل وحدة عمل تغيير الحالة نفسها."""
+    code = vac_row["type_code"]
+    days = vac_row["requested_days"]
+    if code=="annual":
+        column = "vacation_balance"
+    elif code=="emergency":
+        column = schema_registry.get().emp_emergency_col
+    else:
+        return
+    if column:
+        ledger.post(conn, vac_row["employee_id"], column, -days, "vacation_approve",
+                    ref=f"vacation:{vac_row['id']}", actor_id=getattr(current_user, "id", None))
+
+def normalize_type(label: str):
+    if not label: return None
+    meta = type_cache.by_name_ar(label)
+    if meta:
+        return meta["code"]
+    return AR_TO_CODE.get(label.strip(), label.strip())
+
+@vacations_api_bp.get("")
+@login_required
+@readonly_route
+def list_vacations():
+    args=request.args
+    page=max(int(args.get("page",1)),1)
+    limit=min(max(int(args.get("limit",10)),1),200)
+    filters=[]; params=[]
+    if not user_is_manager() and not user_is_dept_head():
+        filters.append("vr.employee_id=?"); params.append(current_user.employee_id)
+    else:
+        if args.get("employee_id"):
+            filters.append("vr.employee_id=?"); params.append(args.get("employee_id"))
+    if args.get("status"):
+        filters.append("vr.status=?"); params.append(args.get("status"))
+    if args.get("type_code") or args.get("type"):
+        tt = args.get("type_code") or args.get("type")
+        filters.append("vr.type_code=?"); params.append(tt)
+    found = search.any_of(
+        search.match_clause("vacation_requests", args.get("q"), "vr.id", ("vr.notes", "vr.type_code")),
+        search.match_clause("employees", args.get("q"), "vr.employee_id", ("e.name",)))
+    if found:
+        filters.append(found[0]); params.extend(found[1])
+    base = "FROM vacation_requests vr JOIN employees e ON e.id=vr.employee_id"
+    columns = """vr.id, vr.employee_id, e.name, vr.type_code,
+             vr.start_date, vr.end_date, vr.requested_days,
+             vr.status, vr.rejection_reason, vr.notes, vr.created_at"""
+    # cursor: الصفحة التالية بالمفتاح؛ with_total=1: العدد في وضع المؤشر أيضاً
+    with_total = args.get("with_total") in ("1", "true") or None
+    try:
+        with get_conn() as conn:
+            rows, meta = pagination.fetch_page(conn, columns, base, filters, params, "vr.id", limit,
+                                               page=page, cursor=args.get("cursor"),
+                                               with_total=with_total)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    def rdict(r):
+        return {
+            "id":r[0],"employee_id":r[1],"employee_name":r[2],"type_code":r[3],
+            "start_date":r[4],"end_date":r[5],"requested_days":r[6],
+            "status":r[7],"rejection_reason":r[8],"notes":r[9],"created_at":r[10]
+        }
+    return jsonify(items=[rdict(r) for r in rows], **meta)
+
+@vacations_api_bp.post("")
+@login_required
+def create_vacation():
+    data = request.get_json(force=True)
+    emp_id = data.get("employee_id") or getattr(current_user,"employee_id",None)
+    if not emp_id:
+        return jsonify(error="employee_id مطلوب"),400
+
+    raw_type = data.get("type") or data.get("type_code")
+    if not raw_type:
+        return jsonify(error="نوع الإجازة مطلوب"),400
+    type_code = normalize_type(raw_type)
+
+    relation = (data.get("relation") or "").strip() or None
+    notes = (data.get("notes") or "").strip()
+    start_date = data.get("start_date")
+    end_date = data.get("end_date")
+    if not (start_date and end_date):
+        return jsonify(error="تواريخ ناقصة"),400
+
+    meta = load_type(type_code)
+    if not meta:
+        return jsonify(error="نوع غير موجود"),400
+
+    # وفاة الزوج (ثابت 130)
+    if type_code=="death_spouse":
+        relation = "زوج"
+        start = date.fromisoformat(start_date)
+        end_date = date.fromordinal(start.toordinal()+130-1).isoformat()
+        requested_days = 130
+    else:
+        if meta["fixed_duration"]:
+            fd=meta["fixed_duration"]
+            s=date.fromisoformat(start_date)
+            end_date = date.fromordinal(s.toordinal()+fd-1).isoformat()
+        requested_days = compute_days(start_date,end_date)
+
+    if type_code=="death1":
+        if not relation or relation not in DEATH1_RELATIONS:
+            return jsonify(error="العلاقة مطلوبة وصحيحة (وفاة درجة أولى)"),400
+    if type_code=="death2" and not relation:
+        relation="أقارب آخرون"
+
+    if meta["max_per_request"] and requested_days>meta["max_per_request"]:
+        return jsonify(error=f"الحد الأقصى {meta['max_per_request']}"),400
+
+    if overlap_exists(emp_id,start_date,end_date):
+        return jsonify(error="تداخل مع إجازة أخرى"),400
+
+    # تحقق الرصيد
+    emer_expr = schema_registry.get().emp_emergency_expr
+    with get_conn() as conn:
+        erow = conn.execute(f"""
+          SELECT vacation_balance,
+                 {emer_expr} AS emer
+            FROM employees WHERE id=?""",(emp_id,)).fetchone()
+        if not erow:
+            return jsonify(error="الموظف غير موجود"),404
+        annual_bal = erow[0] or 0
+        emer_bal = erow[1] or 0
+        if type_code=="annual" and requested_days>annual_bal:
+            return jsonify(error="رصيد السنوية غير كافٍ"),400
+        if type_code=="emergency" and requested_days>emer_bal:
+            return jsonify(error="رصيد الطارئة غير كافٍ"),400
+
+    if not user_is_manager() and not user_is_dept_head():
+        if emp_id != getattr(current_user,"employee_id",None):
+            return jsonify(error="غير مسموح"),403
+
+    with get_conn() as conn:
+        cur=conn.cursor()
+        cur.execute("""
+          INSERT INTO vacation_requests
+            (employee_id,type_code,relation,start_date,end_date,requested_days,status,notes,created_at)
+          VALUES (?,?,?,?,?,?,?,?,?)
+        """,(emp_id,type_code,relation,start_date,end_date,requested_days,
+             S_PENDING_DEPT,notes,datetime.utcnow().isoformat(timespec="seconds")))
+        vid=cur.lastrowid
+        conn.commit()
+    pagination.invalidate()
+    ensure_history(vid,"create",None,S_PENDING_DEPT,"")
+    return jsonify(id=vid,type_code=type_code,status=S_PENDING_DEPT,
+                   requested_days=requested_days,start_date=start_date,end_date=end_date)
+
+@vacations_api_bp.post("/<int:vac_id>/approve")
+@login_required
+def approve(vac_id):
+    r=fetch_vacation(vac_id)
+    if not r: return jsonify(error="غير موجود"),404
+    st=r["status"]
+    if user_is_dept_head() and st==S_PENDING_DEPT:
+        with get_conn() as conn:
+            moved = conn.execute("UPDATE vacation_requests SET status=? WHERE id=? AND status=?",
+                                 (S_PENDING_MANAGER,vac_id,st)).rowcount
+            conn.commit()
+        if not moved:
+            return jsonify(error="حالة/صلاحية غير صالحة"),400
+        pagination.invalidate()
+        ensure_history(vac_id,"approve_dept",st,S_PENDING_MANAGER,"")
+        return jsonify(success=True,status=S_PENDING_MANAGER)
+    if user_is_manager() and st==S_PENDING_MANAGER:
+        # الحالة تُفحص مع الكتابة تحت BEGIN IMMEDIATE: موافقتان متزامنتان (نقرة مزدوجة / إعادة
+        # محاولة) لا تخصمان الرصيد مرتين، والخصم بقيم الطلب وقت الموافقة لا وقت fetch_vacation
+        with get_conn() as conn, transaction(conn):
+            moved = conn.execute("UPDATE vacation_requests SET status=? WHERE id=? AND status=?",
+                                 (S_APPROVED,vac_id,st)).rowcount
+            if moved:
+                adjust_balances_on_approve(conn, conn.execute("""
+                  SELECT id, employee_id, type_code, requested_days FROM vacation_requests WHERE id=?
+                """,(vac_id,)).fetchone())
+        if not moved:
+            return jsonify(error="حالة/صلاحية غير صالحة"),400
+        pagination.invalidate()
+        ensure_history(vac_id,"approve_manager",st,S_APPROVED,"")
+        return jsonify(success=True,status=S_APPROVED)
+    return jsonify(error="حالة/صلاحية غير صالحة"),400
+
+@vacations_api_bp.post("/<int:vac_id>/reject")
+@login_required
+def reject(vac_id):
+    r=fetch_vacation(vac_id)
+    if not r: return jsonify(error="غير موجود"),404
+    st=r["status"]
+    body=request.get_json(force=True)
+    reason=(body.get("reason") or "").strip()
+    if not reason: return jsonify(error="سبب مطلوب"),400
+    if user_is_dept_head() and st==S_PENDING_DEPT:
+        new=S_REJECTED_DEPT
+    elif user_is_manager() and st==S_PENDING_MANAGER:
+        new=S_REJECTED_MANAGER
+    else:
+        return jsonify(error="غير مصرح"),403
+    with get_conn() as conn:
+        conn.execute("UPDATE vacation_requests SET status=?, rejection_reason=? WHERE id=?",
+                     (new,reason,vac_id))
+        conn.commit()
+    pagination.invalidate()
+    ensure_history(vac_id,"reject",st,new,reason)
+    return jsonify(success=True,status=new)
+
+@vacations_api_bp.post("/<int:vac_id>/cancel")
+@login_required
+def cancel(vac_id):
+    r=fetch_vacation(vac_id)
+    if not r: return jsonify(error="غير موجود"),404
+    if r["status"] not in PENDING_SET and r["status"]!=S_APPROVED:
+        return jsonify(error="لا يمكن الإلغاء"),400
+    if r["employee_id"]!=getattr(current_user,"employee_id",None) and not (user_is_manager() or user_is_dept_head()):
+        return jsonify(error="غير مصرح"),403
+    with get_conn() as conn:
+        conn.execute("UPDATE vacation_requests SET status=? WHERE id=?",(S_CANCELLED,vac_id))
+        conn.commit()
+    pagination.invalidate()
+    ensure_history(vac_id,"cancel",r["status"],S_CANCELLED,"")
+    return jsonify(success=True,status=S_CANCELLED)
+
+@vacations_api_bp.get("/<int:vac_id>/history")
+@login_required
+def history(vac_id):
+    r=fetch_vacation(vac_id)
+    if not r: return jsonify(error="غير موجود"),404
+    with get_conn() as conn:
+        rows=conn.execute("""
+          SELECT action,from_status,to_status,actor_id,actor_role,note,created_at
+            FROM vacation_history WHERE vacation_id=? ORDER BY id
+        """,(vac_id,)).fetchall()
+    out=[]
+    for h in rows:
+        out.append({
+            "action":h[0],"from_status":h[1],"to_status":h[2],
+            "actor_id":h[3],"actor_role":h[4],"note":h[5],"created_at":h[6]
+        })
+    return jsonify(out)
+
+# ===================== قسم رئيس القسم: API قائمة طلبات قسمه =====================
+
+@login_required
+@readonly_route
+def dept_vacations():
+    """
+    قائمة طلبات الإجازة لموظفي قسم رئيس القسم الحالي.
+    تُرجع Array من العناصر (وليس كائن paginated) لتوافق واجهة dept_head.
+    يسمح باختيار status اختياريًا.
+    """
+    if getattr(current_user, "role", "") != "department_head":
+        return jsonify({"error":"forbidden"}), 403
+
+    dept_id = getattr(current_user, "department_id", None)
+    if not dept_id:
+        return jsonify([])
+
+    status = request.args.get("status")
+    limit = request.args.get("limit", 500, type=int)
+    limit = min(max(limit, 1), 1000)
+
+    where = "WHERE e.department_id=?"
+    params = [dept_id]
+    if status:
+        where += " AND vr.status=?"
+        params.append(status)
+
+    sql = f"""
+      SELECT vr.id, vr.employee_id, e.name AS employee_name, vr.type_code,
+             vr.start_date, vr.end_date, vr.requested_days,
+             vr.status, vr.rejection_reason, vr.notes, vr.created_at
+        FROM vacation_requests vr
+        JOIN employees e ON e.id=vr.employee_id
+        {where}
+       ORDER BY vr.id DESC
+       LIMIT ?
+    """
+    params.append(limit)
+
+    with get_conn() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    items = []
+    for r in rows:
+        items.append({
+            "id": r[0],
+            "employee_id": r[1],
+            "employee_name": r[2],
+            "type_code": r[3],
+            "start_date": r[4],
+            "end_date": r[5],
+            "requested_days": r[6],
+            "status": r[7],
+            "rejection_reason": r[8],
+            "notes": r[9],
+            "created_at": r[10],
+        })
+    return jsonify(items)
+
+@login_required
+@readonly_route
+def dept_occupancy():
+    """
+    عدد الغائبين يومياً لكل قسم (خريطة حرارية):
+      GET /api/v1/dept/occupancy?start=2025-10-01&end=2025-10-31&include_pending=1
+    رئيس القسم: قسمه فقط. المدير: كل الأقسام أو department_id محدد.
+    بدون start/end: الشهر القادم.
+    """
+    if user_is_dept_head():
+        dept_id = getattr(current_user, "department_id", None)
+        if not dept_id:
+            return jsonify({"error":"لا يوجد قسم مرتبط بالمستخدم"}), 400
+    elif user_is_manager():
+        dept_id = request.args.get("department_id", type=int)
+    else:
+        return jsonify({"error":"forbidden"}), 403
+
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if not (start and end):
+        first = (date.today().replace(day=1) + timedelta(days=32)).replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        start, end = first.isoformat(), last.isoformat()
+    include_pending = request.args.get("include_pending") in ("1", "true", "yes")
+    try:
+        data = occupancy.department_occupancy(start, end, dept_id, include_pending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data)
+
+# ===================== تهيئة =====================
+
+def init_vacations_api(app):
+    """
+    تهيئة جداول أساسية + تسجيل مسار رئيس القسم دون الحاجة لتعديل __init__.py
+    """
+    with app.app_context():
+        # جداول
+        with get_conn() as conn:
+            conn.execute("""
+              CREATE TABLE IF NOT EXISTS vacation_requests(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                employee_id INTEGER NOT NULL,
+                type_code TEXT NOT NULL,
+                relation TEXT,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                requested_days INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                rejection_reason TEXT,
+                notes TEXT,
+                created_at TEXT NOT NULL
+              )
+            """)
+            conn.execute("""
+              CREATE TABLE IF NOT EXISTS vacation_history(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                vacation_id INTEGER NOT NULL,
+                action TEXT,
+                from_status TEXT,
+                to_status TEXT,
+                actor_id INTEGER,
+                actor_role TEXT,
+                note TEXT,
+                created_at TEXT NOT NULL
+              )
+            """)
+            # أعمدة start_ord/end_ord وفهرس التداخل (v018) حتى قبل تشغيل الهجرات
+            v018_vacation_day_ordinals.apply(conn)
+            # ملخص الغياب الشهري (v019): يُنشأ ويُبنى مرة واحدة قبل أي كتابة على absences
+            v019_absence_monthly_summary.apply(conn)
+            # سجل الأرصدة (v021): يُنشأ مع حركات الافتتاح قبل أي خصم/تراكم
+            v021_balance_ledger.apply(conn)
+            # سياسات التراكم (v022) لمحرك msd.balances.accrual
+            v022_accrual_policies.apply(conn)
+            # فهارس البحث النصي (v024) للموظفين والطلبات والغياب
+            v024_search_index.apply(conn)
+            # أختام إصدار البيانات (v025) لفهرس البحث الفوري عن الموظفين
+            v025_data_versions.apply(conn)
+            # ختم أنواع الإجازات (v026) لذاكرة msd.vacations.type_cache
+            v026_vacation_types_version.apply(conn)
+            # ختم دليل الأقسام (v027) لذاكرة msd.departments.directory
+            v027_departments_version.apply(conn)
+            conn.commit()
+
+        # تسجيل مسار واجهة رئيس القسم: GET /api/v1/dept/vacations
+        # يُسجَّل هنا كي لا نحتاج Blueprints إضافية أو تعديل التسجيل المركزي.
+        app.add_url_rule(
+            "/api/v1/dept/vacations",
+            endpoint="dept_vacations_list",
+            view_func=dept_vacations,
+            methods=["GET"]
+        )
+        # خريطة إشغال الأقسام اليومية: GET /api/v1/dept/occupancy
+        app.add_url_rule(
+            "/api/v1/dept/occupancy",
+            endpoint="dept_occupancy",
+            view_func=dept_occupancy,
+            methods=["GET"]
+        )
+
+    # تتبّع الاستعلامات لكل طلب + مسار إحصاءاته للمدير (بنفس الأسلوب: دون تعديل __init__.py)
+    tracing.init_app(app)
+    app.register_blueprint(db_stats_api_bp)
+
+    # سجل المخطط: قراءة الأعمدة الاختيارية مرة واحدة بعد إنشاء الجداول أعلاه
+    schema_registry.init_app(app)
+
+    # ذاكرة تقارير الغياب (الحجم والصلاحية من الإعدادات)
+    report_cache.init_app(app)
+
+    # مهام التصدير في الخلفية: /api/v1/exports (جدول v020 + مجلد الملفات)
+    export_jobs.init_app(app)
+    app.register_blueprint(export_jobs_api_bp)
+
+    # المجدول الداخلي (جداول v023 + خيط الخلفية ما لم يُعطَّل SCHEDULER_ENABLED)
+    scheduler.init_app(app)
+
+    # فهرس البحث الفوري عن الموظفين (/api/v1/employees/lookup): يُبنى في الذاكرة عند البدء
+    lookup.init_app(app)
\ No newline at end of file